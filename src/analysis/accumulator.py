@@ -0,0 +1,161 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from instrumentation.core import instrumented
+from metrics.base import Metric
+
+
+class TradeWindow:
+    """
+    Accumulator states of every metric over one group's trades, in the order they were added.
+    Trades are added at the end and expired from the front. Invertible metrics take an expired trade out of their
+    state directly. The others keep a two-stack queue: the trades added since the last flip are folded into one
+    back state, and after a flip every front trade holds the state of itself and the newer front trades, so the
+    window's state is one merge and expiring a trade is a pop. Both are O(1) per trade, amortized over the flips.
+    """
+
+    def __init__(self, metrics: Dict[str, Metric]):
+        self.metrics = metrics
+        self._reset()
+
+    def _reset(self):
+        self.trades: Deque[Tuple[int, float]] = deque()
+        self.states = {name: metric.init() for name, metric in self.metrics.items() if metric.invertible}
+        self.back = {name: metric.init() for name, metric in self.metrics.items() if not metric.invertible}
+        self.front: Dict[str, List[Any]] = {name: [] for name in self.back}
+        # Whether the trades were added in date order, so the oldest ones are always at the front
+        self.ordered = True
+
+    def __len__(self) -> int:
+        return len(self.trades)
+
+    def add(self, date: int, pl: float):
+        if self.trades and date < self.trades[-1][0]:
+            self.ordered = False
+        self.trades.append((date, pl))
+        for name, state in self.states.items():
+            self.states[name] = self.metrics[name].update(state, pl)
+        for name, state in self.back.items():
+            self.back[name] = self.metrics[name].update(state, pl)
+
+    def expire(self, cutoff: int):
+        """Drop the trades dated before cutoff (dates as nanosecond timestamps)."""
+        if not self.ordered:
+            # Old trades can be anywhere, so the window is rebuilt from the trades it keeps
+            if any(date < cutoff for date, _ in self.trades):
+                kept = [(date, pl) for date, pl in self.trades if date >= cutoff]
+                self._reset()
+                for date, pl in kept:
+                    self.add(date, pl)
+            return
+        while self.trades and self.trades[0][0] < cutoff:
+            self._pop()
+
+    def merge(self, other: 'TradeWindow'):
+        """Append other's trades, which come after this window's. States combine in O(1) per metric."""
+        if other.trades and self.trades and other.trades[0][0] < self.trades[-1][0]:
+            self.ordered = False
+        self.ordered &= other.ordered
+        self.trades.extend(other.trades)
+        for name, state in self.states.items():
+            self.states[name] = self.metrics[name].merge(state, other.states[name])
+        for name, state in self.back.items():
+            self.back[name] = self.metrics[name].merge(state, other.state(name))
+
+    def state(self, name: str) -> Any:
+        if name in self.states:
+            return self.states[name]
+        front = self.front[name]
+        return self.metrics[name].merge(front[-1], self.back[name]) if front else self.back[name]
+
+    def result(self) -> Dict[str, float]:
+        return {name: metric.result(self.state(name)) for name, metric in self.metrics.items()}
+
+    def _pop(self):
+        if self.back and not next(iter(self.front.values())):
+            self._flip()
+        _, pl = self.trades.popleft()
+        for name, state in self.states.items():
+            self.states[name] = self.metrics[name].remove(state, pl)
+        for front in self.front.values():
+            front.pop()
+
+    def _flip(self):
+        """Move every trade into the front stacks, newest at the bottom; only called when the front is empty."""
+        for name, metric in self.metrics.items():
+            if name not in self.back:
+                continue
+            suffix, front = metric.init(), []
+            for _, pl in reversed(self.trades):
+                suffix = metric.merge(metric.update(metric.init(), pl), suffix)
+                front.append(suffix)
+            self.front[name] = front
+            self.back[name] = metric.init()
+
+
+class GroupAccumulator:
+    """
+    Streaming metrics of every group of trades, optionally over a lookback window of the last days days.
+    add() folds new trades into their groups' TradeWindows and expires the ones that fell out of the window,
+    so keeping the metrics up to date costs O(new trades) instead of a full recompute. Within a group, trades
+    are taken in the order they are added, like calculate_grouped_metrics takes them in row order.
+    Accumulators of consecutive parts of the data (e.g. built by parallel workers) combine with merge().
+    """
+
+    def __init__(self, metrics: Dict[str, Metric], group_columns: List[str], days: Optional[int] = None):
+        unsupported = [name for name, metric in metrics.items() if not metric.streaming]
+        if unsupported:
+            raise ValueError(f"Metrics {unsupported} don't support streaming updates.")
+        self.metrics = metrics
+        self.group_columns = list(group_columns)
+        self.days = days
+        self.latest_date = None
+        self.windows: Dict[Tuple, TradeWindow] = {}
+
+    @instrumented
+    def add(self, data: pd.DataFrame):
+        """Add data's trades to their groups, in row order."""
+        if self.days is not None:
+            # Undated trades are never inside a lookback window
+            data = data[data['Entry Date'].notna()]
+        if data.empty:
+            return
+
+        for key, rows in data.groupby(self.group_columns, observed=True, sort=False):
+            window = self.windows.setdefault(key, TradeWindow(self.metrics))
+            # Plain ints (nanoseconds) and floats are much cheaper to compare and add than numpy scalars
+            for date, pl in zip(rows['Entry Date'].to_numpy(dtype='datetime64[ns]').view(np.int64).tolist(), rows['P/L'].to_numpy(dtype=float).tolist()):
+                window.add(date, pl)
+
+        latest_date = data['Entry Date'].max()
+        if pd.notna(latest_date) and (self.latest_date is None or latest_date > self.latest_date):
+            self.latest_date = latest_date
+        self._expire()
+
+    def merge(self, other: 'GroupAccumulator'):
+        """Add the trades of other, an accumulator over the data that comes after this one's."""
+        for key, window in other.windows.items():
+            if key in self.windows:
+                self.windows[key].merge(window)
+            else:
+                self.windows[key] = window
+        if other.latest_date is not None and (self.latest_date is None or other.latest_date > self.latest_date):
+            self.latest_date = other.latest_date
+        self._expire()
+
+    def metrics_frame(self) -> pd.DataFrame:
+        """Every metric of every group that has trades, indexed by the sorted group keys like calculate_grouped_metrics."""
+        keys = sorted(key for key, window in self.windows.items() if len(window))
+        index = pd.MultiIndex.from_tuples(keys, names=self.group_columns)
+        results = [self.windows[key].result() for key in keys]
+        return pd.DataFrame({name: np.array([result[name] for result in results], dtype=float) for name in self.metrics}, index=index)
+
+    def _expire(self):
+        if self.days is None or self.latest_date is None:
+            return
+        cutoff = (self.latest_date - pd.Timedelta(days=self.days)).value
+        for key in list(self.windows):
+            self.windows[key].expire(cutoff)
+            if not len(self.windows[key]):
+                del self.windows[key]
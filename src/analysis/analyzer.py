@@ -1,124 +1,442 @@
+import itertools
+import numpy as np
 import pandas as pd
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from instrumentation.core import instrumented
 from data.loader import DataLoader
+from data.cache import DataCache
 from data.processor import DataProcessor
+from data.index import DataIndex
+from data.matrix import PnLMatrix
+from data.grid import ParameterGrid
+from data.store import PartitionedStore
+from data.shared import SharedDataset
+from analysis.accumulator import GroupAccumulator
 from analysis.calculator import MetricsCalculator
 from analysis.optimizer import Optimizer
+from analysis.pareto import ParetoOptimizer
+from analysis.plotting import Plotter
+from analysis.portfolio import PortfolioOptimizer
+from analysis.result_cache import ResultCache, cached_query
+from analysis.rollup import PeriodRollup
+from analysis.walkforward import WalkForward
 import os
 
 
 class BacktestAnalyzer:
-    def __init__(self, file_paths: List[str], metrics: Optional[List[str]] = None):
-        """Initialize the BacktestAnalyzer with file paths and essential components."""
+    DIMENSION_COLUMNS = ['Day of Week', 'Stop Loss %', 'Strategy Type', 'Strategy Entry', 'Strategy Exit']
+    # Backtest parameters taken from report file names; the ones after stop loss and strategy type can be added to analyses as dimensions
+    GRID_COLUMNS = ['Stop Loss %', 'Strategy Type', 'Strategy Entry', 'Strategy Exit']
+    _instance_ids = itertools.count()
+
+    def __init__(self, file_paths: List[str], metrics: Optional[List[str]] = None, cache: Optional[DataCache] = None, compact: bool = False, result_cache: Optional[ResultCache] = None, chunksize: Optional[int] = None, store: Optional[PartitionedStore] = None):
+        """Initialize the BacktestAnalyzer with file paths and essential components.
+
+        Pass a DataCache to reuse parsed report files across runs.
+        Set compact to keep all_data small: only the columns the metrics need are loaded,
+        dimension columns are dictionary encoded and the per-strike Type column is dropped.
+        Metrics added later with add_metric must only need columns that were loaded.
+        Pass a ResultCache to memoize analyze, generate_pivot_table and generate_summary results.
+        Set chunksize to stream each report file that many rows at a time, for files too large to parse at once.
+        Pass a PartitionedStore to query it lazily: until load_and_process_data() is called, analyze, pivot, summary,
+        time breakdown and optimize read only the partitions and row groups their filters select
+        (with no file_paths, load_and_process_data() loads the whole store)."""
         self.file_paths = file_paths
+        self.cache = cache
+        self.store = store
+        self.compact = compact
+        self.result_cache = result_cache
+        # Tells apart the results of analyzers sharing one result cache; unlike id() it is never reused
+        self.instance_id = next(self._instance_ids)
+        self.chunksize = chunksize
+        # Bumped whenever all_data changes so cached results from older data are never served
+        self.data_version = 0
         self.all_data = pd.DataFrame()
         self.metrics_calculator = MetricsCalculator(metrics)
         self.optimizer = None
+        self.data_index = None
+        self.pnl_matrix: Optional[PnLMatrix] = None
+        self._walk_forward = None
+        self._parameter_grid = None
         self.total_days = None
-
-    def load_and_process_data(self):
-        """Load and process data from the specified file paths, then store it in the analyzer."""
-        data_frames = []
-        for file_path in self.file_paths:
-            # Extract strategy details (e.g., type and stop loss percentage) from the file name
-            strategy_type, stop_loss = self._extract_strategy_details(file_path)
-            
-            # Load the CSV and add strategy-related columns
-            df = self._load_and_prepare_dataframe(file_path, strategy_type, stop_loss)
-            data_frames.append(df)
+        self.load_errors: Dict[str, Exception] = {}
+        # Byte offset up to which each loaded report file has been read, used by refresh()
+        self._file_offsets: Dict[str, int] = {}
+        self._entry_dates = None
+        # Filtered slices shared between queries while a shared_slices() block is active
+        self._slices: Optional[Dict[Tuple, pd.DataFrame]] = None
+        # Streaming summaries by lookback, updated in place by append()
+        self._live_summaries: Dict[Optional[int], GroupAccumulator] = {}
+        # all_data exported for process pool workers, created on first use
+        self._shared_data: Optional[SharedDataset] = None
+
+    @instrumented
+    def load_and_process_data(self, refresh_cache: bool = False, executor: Optional[str] = None, max_workers: Optional[int] = None):
+        """Load and process data from the specified file paths, then store it in the analyzer.
+
+        Set refresh_cache to re-parse every CSV and overwrite its cache entry.
+        Set executor to 'thread' or 'process' to load files in parallel with max_workers workers;
+        in that mode files that fail to load are reported in load_errors instead of aborting the load."""
+        # Parse each file only up to its last complete line now, so rows appended during the load are read once, by refresh()
+        file_offsets = {file_path: DataLoader.complete_size(file_path) for file_path in self.file_paths if os.path.exists(file_path)}
+
+        if self.store is not None and not self.file_paths:
+            data_frames = [self.store.read(columns=self._store_columns())]
+            if self.compact:
+                data_frames = [DataProcessor.compact(data_frames[0], self.DIMENSION_COLUMNS, drop_columns=['Type'])]
+            self.load_errors = {}
+        elif executor is None:
+            data_frames = [self._load_report(file_path, self.cache, refresh_cache, self._load_columns(), self.compact, self.chunksize, file_offsets.get(file_path)) for file_path in self.file_paths]
+            self.load_errors = {}
+        else:
+            data_frames, self.load_errors = self._load_reports_parallel(refresh_cache, executor, max_workers, file_offsets)
+
+        if not data_frames:
+            raise ValueError(f"No report files could be loaded: {self.load_errors}")
 
         # Combine all loaded data into a single DataFrame
-        self.all_data = pd.concat(data_frames, ignore_index=True)
+        self.all_data = DataProcessor.concat_frames(data_frames)
+        self._file_offsets = {file_path: offset for file_path, offset in file_offsets.items() if file_path not in self.load_errors}
+
+        # Build the date order and filter bitmaps once for all later queries
+        self.data_index = DataIndex(self.all_data, tuple(self.DIMENSION_COLUMNS))
+        # And the daily P/L of every setup, shared by the path-dependent metrics, Pareto search and walk-forward
+        self.pnl_matrix = PnLMatrix.from_data(self.all_data)
         
         # Initialize the optimizer with the loaded data
-        self.optimizer = Optimizer(self.all_data)
+        self.optimizer = Optimizer(self.all_data, self.data_index)
+        self._invalidate_results()
+        self._live_summaries = {}
         
         # Calculate the total number of unique days in the data
-        self.total_days = len(self.all_data["Entry Date"].unique())
+        self._entry_dates = self.all_data["Entry Date"].unique()
+        self.total_days = len(self._entry_dates)
+
+    @instrumented
+    def refresh(self) -> int:
+        """Parse only the rows appended to each loaded report file since it was last read and append them.
+
+        Returns the number of new rows."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+
+        new_frames = []
+        for file_path, offset in self._file_offsets.items():
+            if os.path.getsize(file_path) < offset:
+                raise ValueError(f"{file_path} was truncated since it was loaded. Call load_and_process_data() to reload it.")
+
+            df, self._file_offsets[file_path] = DataLoader.load_csv_tail(file_path, offset, self._load_columns())
+            if df.empty:
+                continue
+            new_frames.append(df.assign(**self._extract_parameters(file_path)))
+
+        if not new_frames:
+            return 0
+        return self.append(DataProcessor.concat_frames(new_frames))
+
+    @instrumented
+    def append(self, new_data: pd.DataFrame) -> int:
+        """Append prepared rows (including 'Strategy Type' and 'Stop Loss %') and update derived state incrementally.
+
+        'Strategy Entry' and 'Strategy Exit' may be left out when a single loaded report has the rows' strategy type
+        and stop loss; they are then taken from that report. Returns the number of new rows."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        if new_data.empty:
+            return 0
+        missing = [col for col in ('Strategy Entry', 'Strategy Exit') if col in self.all_data.columns and col not in new_data.columns]
+        if missing:
+            new_data = self._fill_report_parameters(new_data, missing)
+        if self.compact:
+            new_data = DataProcessor.compact(new_data, self.DIMENSION_COLUMNS, drop_columns=['Type'])
+
+        new_data = new_data[self.all_data.columns]
+        # Copying all_data and the index arrays is still O(history), but only the new rows are sorted and aggregated
+        self.all_data = DataProcessor.concat_frames([self.all_data, new_data])
+        self.data_index = self.data_index.append(new_data)
+        self.pnl_matrix = self.pnl_matrix.append(new_data)
+        self.optimizer = Optimizer(self.all_data, self.data_index)
+        self._invalidate_results()
+        for accumulator in self._live_summaries.values():
+            accumulator.add(new_data)
+
+        # Only the dates of the new rows need to be merged into the known trading days
+        self._entry_dates = pd.unique(np.concatenate([self._entry_dates, new_data["Entry Date"].unique()]))
+        self.total_days = len(self._entry_dates)
+
+        return len(new_data)
+
+    def _fill_report_parameters(self, new_data: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """new_data with columns taken from the loaded report of each row's strategy type and stop loss."""
+        keys = ['Strategy Type', 'Stop Loss %']
+        reports = self.all_data[keys + columns].drop_duplicates().astype(object)
+        reports[keys] = reports[keys].astype(str)
+        setups = new_data[keys].astype(str)
+
+        counts = reports.groupby(keys).size()
+        for strategy_type, stop_loss in setups.drop_duplicates().itertuples(index=False):
+            matches = counts.get((strategy_type, stop_loss), 0)
+            if matches != 1:
+                raise ValueError(f"Rows of strategy type '{strategy_type}' and stop loss '{stop_loss}' have no {columns} and match {matches} loaded reports. Include the columns.")
+
+        # A left merge keeps the order of new_data's rows
+        filled = setups.merge(reports, on=keys, how='left')
+        return new_data.assign(**{col: filled[col].to_numpy() for col in columns})
+
+    def _load_reports_parallel(self, refresh_cache: bool, executor: str, max_workers: Optional[int], file_offsets: Dict[str, int]) -> Tuple[List[pd.DataFrame], Dict[str, Exception]]:
+        """Load every report file on a thread or process pool, keeping the order of file_paths."""
+        pools = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+        if executor not in pools:
+            raise ValueError(f"Invalid executor '{executor}'. Use 'thread' or 'process'.")
+
+        data_frames = []
+        load_errors = {}
+        with pools[executor](max_workers=max_workers) as pool:
+            futures = [pool.submit(self._load_report, file_path, self.cache, refresh_cache, self._load_columns(), self.compact, self.chunksize, file_offsets.get(file_path)) for file_path in self.file_paths]
+            for file_path, future in zip(self.file_paths, futures):
+                try:
+                    data_frames.append(future.result())
+                except Exception as e:
+                    load_errors[file_path] = e
+
+        return data_frames, load_errors
+
+    @staticmethod
+    def _load_report(file_path: str, cache: Optional[DataCache], refresh_cache: bool = False, columns: Optional[List[str]] = None, compact: bool = False, chunksize: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Load the first end bytes of one report file with its strategy details. Static so it can run in a worker process."""
+        # Extract strategy details (e.g., type, entry and exit times and stop loss percentage) from the file name
+        parameters = BacktestAnalyzer._extract_parameters(file_path)
+
+        # Load the CSV and add strategy-related columns
+        df = BacktestAnalyzer._load_and_prepare_dataframe(file_path, parameters, cache, refresh_cache, columns, chunksize, end)
+        if compact:
+            df = DataProcessor.compact(df, BacktestAnalyzer.DIMENSION_COLUMNS, drop_columns=['Type'])
+        return df
+
+    def _load_columns(self) -> Optional[List[str]]:
+        """CSV columns to parse: everything, or in compact mode only what the metrics need."""
+        return self.metrics_calculator.required_columns() if self.compact else None
 
-    def analyze(self, days: int, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, metric_name: str = 'Total Profit') -> pd.DataFrame:
-        """Analyze and determine the optimal stop loss based on the given metric."""
+    def shared_data(self) -> SharedDataset:
+        """all_data in shared memory for process pool workers: the numeric and date columns and the dimension codes by default.
+
+        The export is reused until the data changes, when its files are deleted."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        if self._shared_data is None or self._shared_data.closed:
+            dimensions = [col for col in self.DIMENSION_COLUMNS if col in self.all_data.columns]
+            numeric = [col for col in self.all_data.columns if col not in dimensions and (pd.api.types.is_numeric_dtype(self.all_data[col]) or pd.api.types.is_datetime64_any_dtype(self.all_data[col]))]
+            self._shared_data = SharedDataset.create(self.all_data, numeric + dimensions)
+        return self._shared_data
+
+    def process_map(self, function: Callable, tasks: Iterable[tuple], max_workers: Optional[int] = None) -> List[Any]:
+        """Run function(data, *task) for every task on a process pool whose workers read shared_data() without copying it.
+
+        function must be defined at module level and must not modify data, which is read-only."""
+        return self.shared_data().map(function, tasks, max_workers)
+
+    def memory_report(self) -> pd.DataFrame:
+        """Memory used by each column of all_data, in bytes."""
+        return DataProcessor.memory_report(self.all_data)
+
+    def _invalidate_results(self):
+        """Drop cached analysis results after all_data changes."""
+        # Changes result_version(), so result_cache entries of the old data are no longer hit and age out of its LRU
+        self.data_version += 1
+        self._walk_forward = None
+        self._parameter_grid = None
+        if self._shared_data is not None:
+            self._shared_data.close()
+            self._shared_data = None
+
+    @instrumented
+    @cached_query
+    def analyze(self, days: int, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, metric_name: str = 'Total Profit', confidence_interval: Optional[float] = None, num_resamples: int = 1000, seed: Optional[int] = None, dimensions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Analyze and determine the optimal stop loss based on the given metric.
+
+        Set confidence_interval (e.g. 0.95) to bootstrap num_resamples resamples of every group's trades and add
+        interval bounds for each metric, the runner-up setup of each day and the probability that the chosen
+        setup beats it on metric_name.
+        dimensions adds grid columns such as 'Strategy Entry' and 'Strategy Exit' to the setups compared."""
+        self._check_dimensions(dimensions)
         # Filter data for the last X days and apply exclusions (e.g., certain days or stop losses)
         filtered_data = self._filter_data_for_analysis(days, exclude_include_days, stoploss, include_days, include_stoploss)
         
+        if confidence_interval is not None:
+            return self._get_optimal_stop_loss_with_confidence(filtered_data, metric_name, confidence_interval, num_resamples, seed, dimensions)
+
         # Return the optimal stop loss for the given metric
-        return self._get_optimal_stop_loss_by_metric(filtered_data, metric_name)
+        return self._get_optimal_stop_loss_by_metric(filtered_data, metric_name, dimensions)
 
-    def generate_pivot_table(self, days: Optional[int] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True) -> pd.DataFrame:
-        """Generate a pivot table summarizing by the provided metric (P/L) by strategy type and day of the week."""
+    @instrumented
+    @cached_query
+    def generate_pivot_table(self, days: Optional[int] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, dimensions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Generate a pivot table summarizing by the provided metric (P/L) by strategy type and day of the week.
+
+        dimensions adds grid columns such as 'Strategy Entry' to the pivot table's column levels."""
+        self._check_dimensions(dimensions)
         # Create a pivot table grouped by day of the week and stop loss percentage
         # Filter data for the last X days if specified
         data = self._filter_data_for_analysis(days, exclude_include_days, stoploss, include_days, include_stoploss)
-        pivot_table = self._create_pivot_table(data)
+        pivot_table = self._create_pivot_table(data, dimensions)
         
         # Add a column indicating the best stop loss for each day
         pivot_table['Best Stop Loss %'] = pivot_table.idxmax(axis=1)
         return pivot_table
 
-    def optimize(self, days: int) -> pd.DataFrame:
-        """Optimize and summarize the strategy setup."""
+    @instrumented
+    def optimize(self, days: int, top_k: Optional[int] = None, dimensions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Optimize and summarize the strategy setup, or rank the top K setups if top_k is given.
+
+        dimensions adds grid columns such as 'Strategy Entry' to the cell chosen for each day."""
+        self._check_dimensions(dimensions)
+        optimizer = self.optimizer
+        if self._reads_store():
+            # The store already applies the lookback, so the optimizer sees only the window
+            optimizer, days = Optimizer(self._filter_data_for_analysis(days, None, None), dimensions=dimensions), None
+        elif not optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        elif dimensions:
+            optimizer = Optimizer(self.all_data, self.data_index, dimensions)
+        if top_k is not None:
+            return optimizer.get_top_setups_summary(days, top_k)
+        return optimizer.get_optimal_setup_summary(days)
+
+    @instrumented
+    def optimize_pareto(self, days: Optional[int] = None, objectives: Optional[List[str]] = None, constraints: Optional[Dict[str, float]] = None, beam_width: int = 200) -> pd.DataFrame:
+        """Pareto front of weekday setups on objectives such as Total Profit, Max Drawdown, Sharpe Ratio and Calmar Ratio.
+
+        constraints maps a metric to the worst value an accepted setup may have, e.g. {'Max Drawdown': 20000}."""
+        if self._reads_store():
+            matrix = PnLMatrix.from_data(self._filter_data_for_analysis(days, None, None))
+            return ParetoOptimizer(matrix, self.metrics_calculator.metrics).find_front(None, objectives, constraints, beam_width)
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        return ParetoOptimizer(self.pnl_matrix, self.metrics_calculator.metrics).find_front(days, objectives, constraints, beam_width)
+
+    @instrumented
+    def optimize_portfolio(self, k: int, days: Optional[int] = None, objective: str = 'Total Profit', constraints: Optional[Dict[str, float]] = None, top: int = 10, beam_width: int = 100) -> pd.DataFrame:
+        """Best portfolios of k reports run side by side, one row per (portfolio, report).
+
+        objective and constraints use Total Profit, Max Drawdown, Profit to Drawdown, Average Correlation and Volatility
+        of the portfolio's combined daily P/L, e.g. constraints={'Average Correlation': 0.3}."""
+        return self._get_portfolio_optimizer(days).find_portfolios(k, objective, constraints, top, beam_width)
+
+    @instrumented
+    def report_correlations(self, days: Optional[int] = None) -> pd.DataFrame:
+        """Correlation of daily P/L between every pair of loaded reports over the last days days."""
+        return self._get_portfolio_optimizer(days).correlation_frame()
+
+    def _get_portfolio_optimizer(self, days: Optional[int]) -> PortfolioOptimizer:
+        if self._reads_store():
+            data, days = self._filter_data_for_analysis(days, None, None), None
+        elif not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        else:
+            data = self.all_data
+        # Every report is its own column, including reports that differ only in entry or exit time. A parameter
+        # missing on some rows would split their report into a second column, so it is left out of the key
+        matrix = PnLMatrix.from_data(data, [col for col in self.GRID_COLUMNS if col in data.columns and data[col].notna().all()])
+        return PortfolioOptimizer(matrix.window(days))
+
+    @instrumented
+    def risk_summary(self, days: Optional[int] = None) -> pd.DataFrame:
+        """Every metric of every (stop loss, strategy type) setup over the last days days, on its daily P/L."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        matrix = self.pnl_matrix.window(days).active()
+        setups = pd.DataFrame(matrix.setups, columns=['Stop Loss %', 'Strategy Type'])
+        return pd.concat([setups, self.metrics_calculator.calculate_array_metrics(matrix.values)], axis=1)
+
+    @instrumented
+    def parameter_grid(self) -> ParameterGrid:
+        """Precomputed aggregates over the loaded parameter grid, built on first use and rebuilt after the data changes."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        if self._parameter_grid is None:
+            self._parameter_grid = ParameterGrid(self.all_data, self.GRID_COLUMNS)
+        return self._parameter_grid
+
+    @instrumented
+    def lookback_sweep(self, lookbacks: List[int], as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Optimal setup per weekday for each lookback window ending at as_of (the latest date by default)."""
+        return self._get_walk_forward().lookback_sweep(lookbacks, as_of)
+
+    @instrumented
+    def walk_forward(self, lookbacks: List[int], test_days: int = 30, step_days: Optional[int] = None, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """Re-optimize on each lookback every step_days and report in-sample and out-of-sample profit of the chosen setups."""
+        return self._get_walk_forward().walk_forward(lookbacks, test_days, step_days, max_workers)
+
+    def _get_walk_forward(self) -> WalkForward:
         if not self.optimizer:
             raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
-        return self.optimizer.get_optimal_setup_summary(days)
+        # Cumulative sums are built on first use and dropped whenever the data changes
+        if self._walk_forward is None:
+            self._walk_forward = WalkForward(self.pnl_matrix)
+        return self._walk_forward
+
+    @instrumented
+    @cached_query
+    def generate_summary(self, days: Optional[int] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, confidence_interval: Optional[float] = None, num_resamples: int = 1000, seed: Optional[int] = None) -> pd.DataFrame:
+        """Generate a summary of metrics grouped by day of the week and stop loss percentage.
 
-    def generate_summary(self, days: Optional[int] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True) -> pd.DataFrame:
-        """Generate a summary of metrics grouped by day of the week and stop loss percentage."""
+        Set confidence_interval (e.g. 0.95) to add bootstrap interval bounds for every metric."""
         # Filter data for the last X days if specified
         data = self._filter_data_for_analysis(days, exclude_include_days, stoploss, include_days, include_stoploss)
         
         # Calculate metrics grouped by day of the week and stop loss percentage
-        summary = self._calculate_grouped_metrics(data, stoploss)
+        summary = self._calculate_grouped_metrics(data)
+        if confidence_interval is not None:
+            summary = self._add_confidence_intervals(summary, self._bootstrap_metrics(data, num_resamples, seed), confidence_interval)
 
         return pd.DataFrame(summary)
+
+    @instrumented
+    def live_summary(self, days: Optional[int] = None) -> pd.DataFrame:
+        """generate_summary(days) without filters, kept up to date as data is appended.
+
+        The first call per lookback builds streaming metrics per group; append() and refresh() then only fold in
+        the new trades and expire the ones that left the lookback window instead of recomputing every group."""
+        if not self.optimizer:
+            raise ValueError("Data has not been loaded. Call load_and_process_data() first.")
+        # Summaries built before add_metric changed the metrics are rebuilt
+        if days not in self._live_summaries or self._live_summaries[days].metrics != self.metrics_calculator.metrics:
+            accumulator = self.metrics_calculator.accumulator(['Day of Week', 'Stop Loss %', 'Strategy Type'], days)
+            accumulator.add(self._filter_data_for_analysis(days, None, None))
+            self._live_summaries[days] = accumulator
+
+        metrics = self._live_summaries[days].metrics_frame()
+        return metrics.reset_index()[list(metrics.columns) + list(metrics.index.names)]
     
-    def time_based_performance_breakdown(self, days: int, period: str, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, plot: bool = False) -> pd.DataFrame:
+    @instrumented
+    def time_based_performance_breakdown(self, days: int, period: str, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, plot: bool = False, plot_file: Optional[str] = None) -> pd.DataFrame:
         """Analyze performance by time period. 
         
-        Valid Time Periods: Use 'M' for monthly, 'Q' for quarterly, or 'Y' for yearly."""
-        self.period = period
+        Valid Time Periods: Use 'M' for monthly, 'Q' for quarterly, or 'Y' for yearly.
+        Set plot to show a chart of the results, or plot_file to write it to an .html or .png file instead."""
         # Filter data for the last X days and apply exclusions (e.g., certain days or stop losses)
         filtered_data = self._filter_data_for_analysis(days, exclude_include_days, stoploss, include_days, include_stoploss)
 
-        metrics_calculated = self._calculate_grouped_metrics(filtered_data, columns=['Period'])
+        metrics_calculated = PeriodRollup(filtered_data, self.metrics_calculator).breakdown(period)
         
-        if plot:
-            self._plot_time_based_performance(metrics_calculated)
+        if plot or plot_file:
+            self._plot_time_based_performance(metrics_calculated, plot_file)
 
         return metrics_calculated
-    
-    def _plot_time_based_performance(self, df: pd.DataFrame):
-        import matplotlib.pyplot as plt
-        import plotly.graph_objects as go
-        
-        df = df.groupby(['Period', 'Strategy Type', 'Stop Loss %'])['Total Profit'].sum().reset_index()
-        pivot_table = df.pivot_table(values='Total Profit', index='Period', columns=['Strategy Type', 'Stop Loss %'], aggfunc='sum')
-        
-        # Convert Period index to strings
-        pivot_table.index = pivot_table.index.astype(str)
-
-        fig = go.Figure()
-
-        for column in pivot_table.columns:
-            strategy_type, stop_loss = column
-            fig.add_trace(go.Scatter(
-                x=pivot_table.index,
-                y=pivot_table[column],
-                mode='lines+markers',
-                name=f'{strategy_type} - {stop_loss}',
-                hovertemplate='Period: %{x}<br>Total Profit: %{y:.2f}'
-            ))
-
-        fig.update_layout(
-            title='Profit/Loss Trends Over Time by Strategy Type',
-            xaxis_title='Period',
-            yaxis_title='Total Profit/Loss',
-            legend_title='Strategy Type - Stop Loss %',
-            hovermode='x unified'
-        )
-
-        fig.show()
 
+    @instrumented
+    def time_based_performance_rollup(self, days: Optional[int] = None, periods: Optional[List[str]] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True) -> pd.DataFrame:
+        """Performance at several time resolutions in one call (weekly, monthly, quarterly and yearly by default).
 
+        Returns one frame indexed by (Resolution, Period, Day of Week, Stop Loss %, Strategy Type); the rows of each
+        resolution equal time_based_performance_breakdown for that period."""
+        filtered_data = self._filter_data_for_analysis(days, exclude_include_days, stoploss, include_days, include_stoploss)
+        return PeriodRollup(filtered_data, self.metrics_calculator).rollup(periods or ['W', 'M', 'Q', 'Y'])
+    
+    def _plot_time_based_performance(self, df: pd.DataFrame, plot_file: Optional[str] = None):
+        Plotter.show_or_write(Plotter.time_performance_figure(df), plot_file)
 
     def _group_by(self, df: pd.DataFrame, columns: Optional[list[str]]) -> pd.DataFrame:
         """
@@ -128,78 +446,158 @@ class BacktestAnalyzer:
 
         if columns:
             default_col_list += columns
-        
-        if 'Period' in default_col_list:
-            df['Period'] = df['Entry Date'].dt.to_period(self.period)
 
-        return df.groupby(default_col_list)
+        return df.groupby(default_col_list, observed=True)
 
-    def _extract_strategy_details(self, file_path: str):
-        """Extract strategy type and stop loss from the file name."""
+    @staticmethod
+    def _extract_parameters(file_path: str) -> Dict[str, str]:
+        """Extract strategy type, entry and exit times and stop loss from the file name."""
         file_name = os.path.basename(file_path)
-        return DataLoader.extract_details(file_name)
+        return DataLoader.extract_parameters(file_name)
 
-    def _load_and_prepare_dataframe(self, file_path: str, strategy_type: str, stop_loss: float) -> pd.DataFrame:
+    @staticmethod
+    def _load_and_prepare_dataframe(file_path: str, parameters: Dict[str, str], cache: Optional[DataCache] = None, refresh_cache: bool = False, columns: Optional[List[str]] = None, chunksize: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
         """Load the CSV file and add strategy-related columns."""
-        df = DataLoader.load_csv(file_path)
-        df['Strategy Type'] = strategy_type
-        df['Stop Loss %'] = stop_loss
+        df = DataLoader.load_csv(file_path, cache, refresh_cache, columns, chunksize, end)
+        for col, value in parameters.items():
+            df[col] = value
         return df
 
     def _filter_data_for_analysis(self, days: int, exclude_include_days: Optional[List[str]], stoploss: Optional[List[str]], include_days: bool = True, include_stoploss: bool = True) -> pd.DataFrame:
         """Filter the data for analysis based on the last X days and exclude criteria."""
-        # Filter the data to include only the last X days
-        last_x_days_data = DataProcessor.filter_last_x_days(self.all_data, days)
-
-        # Apply exclusions or inclusion for specific days or stop losses
-        filtered_data = DataProcessor.filter_days_and_stoploss(last_x_days_data, exclude_include_days, stoploss, include_days, include_stoploss)
-        
-        return filtered_data
-
-    def _get_optimal_stop_loss_by_metric(self, df: pd.DataFrame, metric_name: str) -> pd.DataFrame:
+        if self._slices is not None:
+            key = ResultCache.make_key('slice', self.result_version(), {
+                'days': days, 'exclude_include_days': exclude_include_days, 'stoploss': stoploss,
+                'include_days': include_days, 'include_stoploss': include_stoploss,
+            })
+            if key not in self._slices:
+                self._slices[key] = self._select_rows(days, exclude_include_days, stoploss, include_days, include_stoploss)
+            return self._slices[key]
+
+        return self._select_rows(days, exclude_include_days, stoploss, include_days, include_stoploss)
+
+    def _select_rows(self, days: int, exclude_include_days: Optional[List[str]], stoploss: Optional[List[str]], include_days: bool, include_stoploss: bool) -> pd.DataFrame:
+        if self._reads_store():
+            # Filters are pushed down into the partitioned scan instead of loading all_data
+            return self.store.read(days, exclude_include_days, stoploss, include_days, include_stoploss, columns=self._store_columns())
+
+        # Select the last X days and apply exclusions or inclusion for specific days or stop losses in one index query
+        return DataProcessor.filter_for_analysis(self.all_data, days, exclude_include_days, stoploss, include_days, include_stoploss, self.data_index)
+
+    def _reads_store(self) -> bool:
+        """Whether queries read the store directly, i.e. a store is attached and all_data has not been loaded."""
+        return self.store is not None and self.optimizer is None
+
+    def _store_columns(self) -> Optional[List[str]]:
+        columns = self._load_columns()
+        return None if columns is None else columns + ['Entry Date', 'Day of Week'] + self.GRID_COLUMNS
+
+    def result_version(self):
+        """Version of the analyzer, data and metrics queries run on, used to key cached results."""
+        version = (self.instance_id, self.data_version, self.metrics_calculator.version)
+        if self._reads_store():
+            return version + (self.store.version,)
+        return version
+
+    @contextmanager
+    def shared_slices(self):
+        """Within the block, queries with the same lookback and filters reuse one filtered slice of all_data."""
+        self._slices = {}
+        try:
+            yield self
+        finally:
+            self._slices = None
+
+    @instrumented
+    def _get_optimal_stop_loss_by_metric(self, df: pd.DataFrame, metric_name: str, dimensions: Optional[List[str]] = None) -> pd.DataFrame:
         """Determine the optimal stop loss based on the specified metric."""
         # Calculate metrics for each group and store them in a DataFrame
-        metrics_df = self._calculate_grouped_metrics(df)
+        metrics_df = self._calculate_grouped_metrics(df, dimensions)
         
+        # Retrieve the rows corresponding to the optimal stop loss for each day
+        return metrics_df.loc[self._best_rows(metrics_df, metric_name)]
+
+    @instrumented
+    def _get_optimal_stop_loss_with_confidence(self, df: pd.DataFrame, metric_name: str, confidence_interval: float, num_resamples: int, seed: Optional[int], dimensions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Optimal setup per day with bootstrap intervals and the probability that it beats the day's runner-up."""
+        metrics_df = self._calculate_grouped_metrics(df, dimensions)
+        samples = self._bootstrap_metrics(df, num_resamples, seed, dimensions)
+        metrics_df = self._add_confidence_intervals(metrics_df, samples, confidence_interval)
+
+        best = self._best_rows(metrics_df, metric_name)
+        runner_up = self._best_rows(metrics_df.drop(index=best), metric_name).reindex(best.index)
+
+        # Rows of metrics_df are groups in order, so their labels are also the sample columns
+        sign = 1 if self.metrics_calculator.is_higher_better(metric_name) else -1
+        probabilities = []
+        for best_row, runner_up_row in zip(best, runner_up):
+            if pd.isna(runner_up_row):
+                probabilities.append(np.nan)
+                continue
+            with np.errstate(invalid='ignore'):
+                difference = sign * (samples[metric_name][:, best_row] - samples[metric_name][:, int(runner_up_row)])
+            probabilities.append(float(np.mean(difference > 0)))
+
+        result = metrics_df.loc[best]
+        result['Runner-Up Stop Loss %'] = metrics_df['Stop Loss %'].reindex(runner_up).to_numpy()
+        result['Runner-Up Strategy Type'] = metrics_df['Strategy Type'].reindex(runner_up).to_numpy()
+        result['Prob. Beats Runner-Up'] = probabilities
+        return result
+
+    def _best_rows(self, metrics_df: pd.DataFrame, metric_name: str) -> pd.Series:
+        """Label of the row with the best metric value for each day."""
         # Determine whether higher values of the metric are better or not
         is_higher_better = self.metrics_calculator.is_higher_better(metric_name)
 
         # Get the index of the row with the best metric value for each day
-        idx = metrics_df.groupby('Day of Week')[metric_name].idxmax() if is_higher_better else metrics_df.groupby('Day of Week')[metric_name].idxmin()
-        
-        # Retrieve the rows corresponding to the optimal stop loss for each day
-        return metrics_df.loc[idx]
-
+        return metrics_df.groupby('Day of Week', observed=True)[metric_name].idxmax() if is_higher_better else metrics_df.groupby('Day of Week', observed=True)[metric_name].idxmin()
+
+    def _bootstrap_metrics(self, df: pd.DataFrame, num_resamples: int, seed: Optional[int], dimensions: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Bootstrap samples of every metric for the day/stop loss/strategy (and dimensions) groups of df."""
+        return self.metrics_calculator.bootstrap_grouped_metrics(self._group_by(df, dimensions), num_resamples, seed)
+
+    @staticmethod
+    def _add_confidence_intervals(metrics: pd.DataFrame, samples: Dict[str, np.ndarray], confidence_interval: float) -> pd.DataFrame:
+        """Add lower and upper interval columns after the metric columns of a per-group metrics frame."""
+        intervals = {}
+        for name, (lower, upper) in MetricsCalculator.confidence_intervals(samples, confidence_interval).items():
+            intervals[f'{name} {confidence_interval*100}% CI Lower'] = lower
+            intervals[f'{name} {confidence_interval*100}% CI Upper'] = upper
+        metric_columns = list(samples)
+        return pd.concat([metrics[metric_columns], pd.DataFrame(intervals, index=metrics.index), metrics.drop(columns=metric_columns)], axis=1)
+
+    @instrumented
     def _calculate_grouped_metrics(self, df: pd.DataFrame, columns: Optional[list[str]] = None, stop_loss: Optional[List[str]] = None) -> pd.DataFrame:
         """Calculate metrics grouped by day of the week, stop loss, and strategy type (and additional columns if given)"""
         grouped = self._group_by(df, columns)
         
-        # Calculate metrics for each group and store the results in a list
-        # Extract group keys dynamically
-        metrics = [
-            self._generate_group_metrics(group, dict(zip(grouped.grouper.names, keys)))
-            for keys, group in grouped
-        ]
-        
-        return pd.DataFrame(self._filter_metrics_by_stop_loss(metrics, stop_loss))
+        # Calculate every metric for all groups in one batched pass
+        metrics = self.metrics_calculator.calculate_grouped_metrics(grouped)
 
-    def _generate_group_metrics(self, group: pd.DataFrame, group_keys: dict) -> dict:
-        """Generate metrics for a specific group of data."""
-        metrics = self.metrics_calculator.calculate_metrics(group)
-        metrics.update(group_keys)
+        # One row per group: metric columns followed by the group keys
+        metrics = metrics.reset_index()[list(metrics.columns) + list(metrics.index.names)]
 
-        return metrics
-    
-    def _filter_metrics_by_stop_loss(self, metrics: List[Dict[str, Any]], stop_loss: Optional[str]) -> List[Dict[str, Any]]:
+        return self._filter_metrics_by_stop_loss(metrics, stop_loss)
+
+    def _check_dimensions(self, dimensions: Optional[List[str]]):
+        """Only the grid columns beyond stop loss and strategy type can be added as dimensions."""
+        allowed = self.GRID_COLUMNS[2:]
+        unknown = [dim for dim in dimensions or [] if dim not in allowed]
+        if unknown:
+            raise ValueError(f"Invalid dimensions {unknown}. Use any of {allowed}.")
+
+    def _filter_metrics_by_stop_loss(self, metrics: pd.DataFrame, stop_loss: Optional[List[str]]) -> pd.DataFrame:
         """Filter metrics by stop loss if specified."""
         if stop_loss is not None:
-            return [entry for entry in metrics if entry.get('Stop Loss %') in stop_loss]
+            return metrics[metrics['Stop Loss %'].isin(stop_loss)].reset_index(drop=True)
         return metrics
 
-    def _create_pivot_table(self, data: pd.DataFrame) -> pd.DataFrame:
-        """Create a pivot table for average P/L grouped by strategy, stop loss, and day."""
+    @instrumented
+    def _create_pivot_table(self, data: pd.DataFrame, dimensions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Create a pivot table for average P/L grouped by strategy, stop loss (and dimensions), and day."""
+        setup_columns = ['Strategy Type', 'Stop Loss %'] + list(dimensions or [])
         # Group by Strategy Type, Stop Loss %, and Day of Week, and calculate mean P/L
-        grouped_data = data.groupby(['Strategy Type', 'Stop Loss %', 'Day of Week'])['P/L'].mean().reset_index()
+        grouped_data = data.groupby(setup_columns + ['Day of Week'], observed=True)['P/L'].mean().reset_index()
         # print(grouped_data.apply(print))
         # exit()
         # Define the order of days
@@ -209,7 +607,8 @@ class BacktestAnalyzer:
         pivot_table = grouped_data.pivot_table(
             values='P/L',
             index='Day of Week',
-            columns=['Strategy Type', 'Stop Loss %']
+            columns=setup_columns,
+            observed=True
         )
 
         # Reindex the days to ensure they are in the desired order and fill missing values with 0
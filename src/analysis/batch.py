@@ -0,0 +1,184 @@
+import inspect
+import json
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from instrumentation.core import instrumented
+from analysis.analyzer import BacktestAnalyzer
+from analysis.montecarlosim import MonteCarloSimulator
+from analysis.result_cache import ResultCache
+
+
+class BatchRunner:
+    """
+    Run many analyses against one loaded BacktestAnalyzer.
+    Queries that share a lookback and filters form a group whose filtered slice is computed once;
+    groups run concurrently on max_workers threads when given.
+    """
+
+    # Query type in a spec -> BacktestAnalyzer method (Monte Carlo runs through the runner itself)
+    QUERY_TYPES = {
+        'analyze': 'analyze',
+        'pivot': 'generate_pivot_table',
+        'summary': 'generate_summary',
+        'time_breakdown': 'time_based_performance_breakdown',
+        'time_rollup': 'time_based_performance_rollup',
+        'optimize': 'optimize',
+        'portfolio': 'optimize_portfolio',
+        'monte_carlo': '_run_monte_carlo',
+    }
+    FILTER_ARGUMENTS = ('days', 'exclude_include_days', 'stoploss', 'include_days', 'include_stoploss')
+
+    def __init__(self, analyzer: BacktestAnalyzer, max_workers: Optional[int] = None):
+        self.analyzer = analyzer
+        self.max_workers = max_workers
+
+    @staticmethod
+    def read_spec(path: str) -> Dict[str, Any]:
+        """
+        Read a JSON spec: {"files": [...], "metrics": [...], "compact": false, "chunksize": null, "queries": [...]}.
+        Each query is {"type": <one of QUERY_TYPES>, "name": <optional>, ...arguments of the analysis}.
+        """
+        with open(path) as f:
+            spec = json.load(f)
+        if not spec.get('files'):
+            raise ValueError(f"Spec {path} does not list any report files.")
+        return spec
+
+    @staticmethod
+    def from_spec(spec: Dict[str, Any], max_workers: Optional[int] = None, result_cache: Optional[ResultCache] = None) -> 'BatchRunner':
+        """Create the analyzer described by spec, load its data and wrap it in a runner."""
+        analyzer = BacktestAnalyzer(spec['files'], spec.get('metrics'), compact=spec.get('compact', False), chunksize=spec.get('chunksize'), result_cache=result_cache)
+        analyzer.load_and_process_data()
+        return BatchRunner(analyzer, max_workers)
+
+    @instrumented
+    def run(self, queries: List[Dict[str, Any]]) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Exception]]:
+        """
+        Run every query and return its result by name, in spec order.
+        A query that fails is reported in the returned errors instead of aborting the batch.
+        """
+        parsed = self._parse(queries)
+        groups = self._plan(parsed)
+
+        with self.analyzer.shared_slices():
+            if self.max_workers is None:
+                outcomes = [self._run_group(group) for group in groups]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    outcomes = list(pool.map(self._run_group, groups))
+
+        finished = {}
+        for outcome in outcomes:
+            finished.update(outcome)
+        results = {}
+        errors = {}
+        for name, _, _ in parsed:
+            if isinstance(finished[name], Exception):
+                errors[name] = finished[name]
+            else:
+                results[name] = finished[name]
+        return results, errors
+
+    @instrumented
+    def run_query(self, query: Dict[str, Any]) -> pd.DataFrame:
+        """Run a single query, raising its error instead of collecting it."""
+        _, query_type, arguments = self.parse_query(query)
+        return self._execute(query_type, arguments)
+
+    def parse_query(self, query: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """Name, type and bound arguments (defaults filled in) of a single query."""
+        return self._parse([query])[0]
+
+    def _plan(self, parsed: List[Tuple[str, str, Dict[str, Any]]]) -> List[List[Tuple[str, str, Dict[str, Any]]]]:
+        """Group queries by the filtered slice they read; queries without one run on their own."""
+        groups: Dict[Any, List[Tuple[str, str, Dict[str, Any]]]] = {}
+        for position, (name, query_type, arguments) in enumerate(parsed):
+            if all(arg in arguments for arg in self.FILTER_ARGUMENTS):
+                key = ResultCache.make_key('slice', 0, {arg: arguments[arg] for arg in self.FILTER_ARGUMENTS})
+            else:
+                key = position
+            groups.setdefault(key, []).append((name, query_type, arguments))
+        return list(groups.values())
+
+    def _parse(self, queries: List[Dict[str, Any]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Validate queries and bind their arguments, with defaults filled in."""
+        parsed = []
+        names = set()
+        for position, query in enumerate(queries):
+            query = dict(query)
+            query_type = query.pop('type', None)
+            if query_type not in self.QUERY_TYPES:
+                raise ValueError(f"Invalid query type '{query_type}' in query {position}. Use one of {list(self.QUERY_TYPES)}.")
+            name = query.pop('name', f'{query_type}_{position}')
+            if name in names:
+                raise ValueError(f"Duplicate query name '{name}'.")
+            names.add(name)
+
+            try:
+                bound = inspect.signature(self._method(query_type)).bind(**query)
+            except TypeError as e:
+                raise ValueError(f"Invalid arguments for query '{name}': {e}") from e
+            bound.apply_defaults()
+            parsed.append((name, query_type, dict(bound.arguments)))
+        return parsed
+
+    def _method(self, query_type: str):
+        if query_type == 'monte_carlo':
+            return self._run_monte_carlo
+        return getattr(self.analyzer, self.QUERY_TYPES[query_type])
+
+    def _run_group(self, group: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, Any]:
+        outcome = {}
+        for name, query_type, arguments in group:
+            try:
+                outcome[name] = self._execute(query_type, arguments)
+            except Exception as e:
+                outcome[name] = e
+        return outcome
+
+    def _execute(self, query_type: str, arguments: Dict[str, Any]) -> pd.DataFrame:
+        return self._method(query_type)(**arguments)
+
+    def _run_monte_carlo(self, days: int, confidence_interval: float = 0.95, num_simulations: int = 1000, seed: Optional[int] = None, grouped: bool = False) -> pd.DataFrame:
+        """Summary statistics of a Monte Carlo simulation, one row per group when grouped."""
+        simulator = MonteCarloSimulator(self.analyzer, num_simulations, seed=seed)
+        if grouped:
+            return simulator.run_grouped_simulation(days, confidence_interval)[1]
+        return pd.DataFrame([simulator.run_simulation(days, confidence_interval)[1]])
+
+    @staticmethod
+    @instrumented
+    def write_results(results: Dict[str, pd.DataFrame], path: str):
+        """
+        Write all results to one Parquet (or, for a .feather path, Feather) file.
+        Results are stacked with 'Query' naming the query each row belongs to; columns a result does not have are null.
+        """
+        frames = [BatchRunner.flatten(result).assign(Query=name) for name, result in results.items()]
+        combined = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Query'])
+        combined = combined[['Query'] + [col for col in combined.columns if col != 'Query']]
+
+        if path.endswith('.feather'):
+            combined.to_feather(path)
+        else:
+            combined.to_parquet(path, index=False)
+
+    @staticmethod
+    def flatten(result: pd.DataFrame) -> pd.DataFrame:
+        """Flat string columns, index as columns and periods as strings, so results of any query stack together."""
+        # Positional indexes carry no information, named ones (e.g. the pivot's Day of Week) become columns
+        result = result.reset_index(drop=all(name is None for name in result.index.names))
+        result.columns = [BatchRunner._label(col) for col in result.columns]
+        for col in result.columns:
+            if isinstance(result[col].dtype, (pd.PeriodDtype, pd.CategoricalDtype)):
+                result[col] = result[col].astype(str)
+            elif result[col].dtype == object:
+                result[col] = result[col].map(BatchRunner._label)
+        return result
+
+    @staticmethod
+    def _label(value: Any) -> Any:
+        # Pivot columns and their idxmax values are (strategy type, stop loss) tuples
+        if isinstance(value, tuple):
+            return ' - '.join(str(part) for part in value if part != '')
+        return value
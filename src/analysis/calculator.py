@@ -1,6 +1,11 @@
-from typing import Dict, Optional, List
+import warnings
+from typing import Dict, Optional, List, Tuple
+import numpy as np
 import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy
+from instrumentation.core import instrumented, stage
 from metrics.base import Metric
+from analysis.accumulator import GroupAccumulator
 from metrics.profit_loss import AverageProfitOnWinningTrades, AverageLossOnLosingTrades, MaxProfitInSingleTrade, MaxLossInSingleTrade, TotalProfit, WinPercentage, AverageProfit
 from metrics.risk import RewardToRiskRatio, MaxDrawdown, SharpeRatio, SortinoRatio, CalmarRatio
 
@@ -24,12 +29,95 @@ class MetricsCalculator:
 
         if metrics:
             self.metrics = {name: metric for name, metric in self.metrics.items() if name in metrics}
+        # Bumped by add_metric so results cached with the previous metrics are never served
+        self.version = 0
 
+    @instrumented
     def calculate_metrics(self, df: pd.DataFrame) -> Dict[str, float]:
-        return {name: metric.calculate(df) for name, metric in self.metrics.items()}
+        return {name: self._timed(name, metric.calculate, df) for name, metric in self.metrics.items()}
+
+    @instrumented
+    def calculate_grouped_metrics(self, grouped: DataFrameGroupBy) -> pd.DataFrame:
+        """Calculate every metric for all groups at once, indexed by the group keys."""
+        group_index = grouped.size().index
+        return pd.DataFrame(
+            {name: np.asarray(self._timed(name, metric.calculate_grouped, grouped), dtype=float) for name, metric in self.metrics.items()},
+            index=group_index
+        )
+
+    @instrumented
+    def calculate_array_metrics(self, values: np.ndarray) -> pd.DataFrame:
+        """Calculate every metric for each column of a dates x setups P/L matrix, one row per column."""
+        return pd.DataFrame({name: np.asarray(self._timed(name, metric.calculate_array, values), dtype=float) for name, metric in self.metrics.items()})
+
+    def accumulator(self, group_columns: List[str], days: Optional[int] = None) -> GroupAccumulator:
+        """Streaming version of calculate_grouped_metrics: the metrics per group, kept up to date as trades are added."""
+        return GroupAccumulator(dict(self.metrics), group_columns, days)
+
+    @instrumented
+    def bootstrap_grouped_metrics(self, grouped: DataFrameGroupBy, num_resamples: int = 1000, seed: Optional[int] = None, max_rows: int = 2_000_000) -> Dict[str, np.ndarray]:
+        """
+        Bootstrap distribution of every metric for every group, as arrays of shape (num_resamples, groups) in group order.
+        Each resample draws a group's trades with replacement and keeps them in trade order. Resamples are
+        batched into frames of up to max_rows rows with one group per (resample, group), so every metric runs
+        once per batch through calculate_grouped instead of once per resample.
+        """
+        codes = grouped.ngroup().to_numpy()
+        rows = np.flatnonzero(~np.isnan(codes))
+        # Trades sorted by group, keeping their order within a group, so every group is one contiguous block
+        order = rows[np.argsort(codes[rows], kind='stable')]
+        num_groups = grouped.ngroups
+        sizes = np.bincount(codes[order].astype(np.int64), minlength=num_groups)
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        row_group = np.repeat(np.arange(num_groups), sizes)
+        values = {col: grouped.obj[col].to_numpy()[order] for col in self.required_columns()}
+
+        rng = np.random.default_rng(seed)
+        batch_size = max(1, max_rows // max(len(order), 1))
+        samples = {name: np.empty((num_resamples, num_groups)) for name in self.metrics}
+        for first in range(0, num_resamples, batch_size):
+            count = min(batch_size, num_resamples - first)
+            # A random position inside its own group for every row of every resample; blocks don't overlap,
+            # so sorting a resample puts each group's draws back in trade order without mixing groups
+            draws = starts[row_group] + (rng.random((count, len(order))) * sizes[row_group]).astype(np.int64)
+            draws.sort(axis=1)
+
+            labels = (np.arange(count)[:, None] * num_groups + row_group).ravel()
+            resampled = pd.DataFrame({col: column[draws.ravel()] for col, column in values.items()})
+            metrics = self.calculate_grouped_metrics(resampled.groupby(labels))
+            for name in self.metrics:
+                samples[name][first:first + count] = metrics[name].to_numpy().reshape(count, num_groups)
+
+        return samples
+
+    @staticmethod
+    def confidence_intervals(samples: Dict[str, np.ndarray], confidence_interval: float = 0.95) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Percentile interval bounds per group for each metric's bootstrap samples.
+        Bounds are taken from the samples themselves rather than interpolated, so ratios that are infinite
+        in some resamples still get a defined interval; a group whose samples are all NaN gets NaN bounds.
+        """
+        lower_percentile = (1 - confidence_interval) / 2
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return {
+                name: (np.nanquantile(values, lower_percentile, axis=0, method='lower'), np.nanquantile(values, 1 - lower_percentile, axis=0, method='higher'))
+                for name, values in samples.items()
+            }
+
+    @staticmethod
+    def _timed(name: str, calculate, data):
+        """Run one metric calculation as its own instrumentation stage."""
+        with stage(f'Metric: {name}', len(data.obj) if isinstance(data, DataFrameGroupBy) else len(data)):
+            return calculate(data)
+
+    def required_columns(self) -> List[str]:
+        """Report columns needed by the configured metrics."""
+        return list(dict.fromkeys(col for metric in self.metrics.values() for col in metric.required_columns))
 
     def add_metric(self, name: str, metric: Metric):
         self.metrics[name] = metric
+        self.version += 1
 
     def is_higher_better(self, metric: str) -> bool:
         return self.metrics[metric].is_higher_better()
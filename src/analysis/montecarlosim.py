@@ -1,40 +1,111 @@
 import numpy as np
+from instrumentation.core import instrumented
 from analysis.analyzer import BacktestAnalyzer
+from analysis.plotting import Plotter
+from data.shared import SharedDataset
 import pandas as pd
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _simulate_chunk(returns: np.ndarray, days: int, num_simulations: int, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate a chunk of equity curves at once; module level so it can run in a worker process."""
+    rng = np.random.default_rng(seed)
+    simulated_returns = returns[rng.integers(0, len(returns), size=(num_simulations, days))]
+    cumulative_returns = np.cumsum(simulated_returns, axis=1)
+    peak = np.maximum.accumulate(cumulative_returns, axis=1)
+    max_drawdown = np.max(peak - cumulative_returns, axis=1)
+    return cumulative_returns[:, -1], max_drawdown
+
+
+def _simulate_shared_chunk(data: pd.DataFrame, start: int, stop: int, days: int, num_simulations: int, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate a chunk in a process pool worker, resampling the rows start:stop of the shared P/L."""
+    return _simulate_chunk(data['P/L'].to_numpy(dtype=float)[start:stop], days, num_simulations, seed)
 
 
 class MonteCarloSimulator:
-    def __init__(self, backtest_analyzer: BacktestAnalyzer, num_simulations: int = 1000):
+    GROUP_COLUMNS = ['Day of Week', 'Stop Loss %', 'Strategy Type']
+
+    def __init__(self, backtest_analyzer: BacktestAnalyzer, num_simulations: int = 1000, chunk_size: int = 10000, seed: Optional[int] = None):
+        """
+        Simulations are drawn in chunks of chunk_size x days to bound memory.
+        Every chunk gets its own child stream of seed, so results for a given seed are
+        reproducible however the chunks are spread across workers.
+        """
         self.backtest_analyzer = backtest_analyzer
         self.num_simulations = num_simulations
+        self.chunk_size = chunk_size
+        self.seed = seed
+
+    @instrumented
+    def run_simulation(self, days: int, confidence_interval: float = 0.95, executor: Optional[str] = None, max_workers: Optional[int] = None) -> Tuple[pd.DataFrame, dict]:
+        """Resample the pooled P/L of all loaded trades. Set executor to 'thread' or 'process' to run chunks in parallel."""
+        original_data = self.backtest_analyzer.all_data['P/L'].to_numpy(dtype=float)
+
+        results_df, = self._simulate([(original_data, None, np.random.SeedSequence(self.seed))], days, executor, max_workers)
 
-    def run_simulation(self, days: int, confidence_interval: float = 0.95) -> Tuple[pd.DataFrame, dict]:
-        results = []
-        original_data = self.backtest_analyzer.all_data['P/L']
-        
-        for _ in range(self.num_simulations):
-            simulated_returns = np.random.choice(original_data, size=days, replace=True)
-            cumulative_returns = np.cumsum(simulated_returns)
-            max_drawdown = self._calculate_max_drawdown(cumulative_returns)
-            total_profit = cumulative_returns[-1]
-            
-            results.append({
-                'Total Profit': total_profit,
-                'Max Drawdown': max_drawdown,
-                'Final Equity': cumulative_returns[-1]
-            })
-        
-        results_df = pd.DataFrame(results)
-        
         summary_stats = self._calculate_summary_stats(results_df, confidence_interval)
-        
+
         return results_df, summary_stats
 
-    def _calculate_max_drawdown(self, cumulative_returns: np.array) -> float:
-        peak = np.maximum.accumulate(cumulative_returns)
-        drawdown = peak - cumulative_returns
-        return np.max(drawdown)
+    @instrumented
+    def run_grouped_simulation(self, days: int, confidence_interval: float = 0.95, executor: Optional[str] = None, max_workers: Optional[int] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Resample the P/L of each (day of week, stop loss, strategy type) group separately.
+        Returns the simulation results with the group columns and one row of summary statistics per group.
+        """
+        grouped = self.backtest_analyzer.all_data.groupby(self.GROUP_COLUMNS, observed=True)['P/L']
+        group_seeds = np.random.SeedSequence(self.seed).spawn(grouped.ngroups)
+
+        samples = [(group.to_numpy(dtype=float), dict(zip(self.GROUP_COLUMNS, keys)), seed) for (keys, group), seed in zip(grouped, group_seeds)]
+        group_results = self._simulate(samples, days, executor, max_workers)
+
+        results = []
+        summaries = []
+        for (_, group_keys, _), results_df in zip(samples, group_results):
+            summary = self._calculate_summary_stats(results_df, confidence_interval)
+            summary.update(group_keys)
+            summaries.append(summary)
+
+            results.append(results_df.assign(**group_keys))
+
+        results_df = pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+        return results_df, pd.DataFrame(summaries)
+
+    @instrumented
+    def _simulate(self, samples: List[Tuple[np.ndarray, Optional[Dict[str, Any]], np.random.SeedSequence]], days: int, executor: Optional[str], max_workers: Optional[int]) -> List[pd.DataFrame]:
+        """
+        Simulate every (returns, group keys, seed) sample in chunks, all on one pool. For process workers the
+        samples' returns are written one after another to shared memory once, and every chunk only carries the
+        (start, stop) slice of its sample instead of a pickled copy of the returns.
+        """
+        chunk_sizes = [min(self.chunk_size, self.num_simulations - start) for start in range(0, self.num_simulations, self.chunk_size)]
+        tasks = [(position, days, size, chunk_seed) for position, (_, _, seed) in enumerate(samples) for size, chunk_seed in zip(chunk_sizes, seed.spawn(len(chunk_sizes)))]
+
+        if executor is None:
+            chunks = [_simulate_chunk(samples[position][0], *task) for position, *task in tasks]
+        elif executor == 'process':
+            offsets = np.concatenate([[0], np.cumsum([len(returns) for returns, _, _ in samples])])
+            returns = pd.DataFrame({'P/L': np.concatenate([returns for returns, _, _ in samples]) if samples else np.empty(0)})
+            with SharedDataset.create(returns) as shared:
+                chunks = shared.map(_simulate_shared_chunk, [(int(offsets[position]), int(offsets[position + 1]), *task) for position, *task in tasks], max_workers)
+        elif executor == 'thread':
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                chunks = list(pool.map(lambda task: _simulate_chunk(samples[task[0]][0], *task[1:]), tasks))
+        else:
+            raise ValueError(f"Invalid executor '{executor}'. Use 'thread' or 'process'.")
+
+        results = []
+        for position in range(len(samples)):
+            sample_chunks = chunks[position * len(chunk_sizes):(position + 1) * len(chunk_sizes)]
+            total_profit = np.concatenate([chunk[0] for chunk in sample_chunks]) if sample_chunks else np.empty(0)
+            max_drawdown = np.concatenate([chunk[1] for chunk in sample_chunks]) if sample_chunks else np.empty(0)
+            results.append(pd.DataFrame({
+                'Total Profit': total_profit,
+                'Max Drawdown': max_drawdown,
+                'Final Equity': total_profit
+            }))
+        return results
 
     def _calculate_summary_stats(self, results_df: pd.DataFrame, confidence_interval: float) -> dict:
         lower_percentile = (1 - confidence_interval) / 2
@@ -49,17 +120,30 @@ class MonteCarloSimulator:
             'Mean Final Equity': results_df['Final Equity'].mean(),
         }
 
-    def plot_results(self, results_df: pd.DataFrame, summary_stats: dict):
-        import matplotlib.pyplot as plt
+    def plot_results(self, results_df: pd.DataFrame, summary_stats: dict, output: Optional[str] = None, bins: int = 50):
+        """Histogram of the simulated total profits, shown or written to output (any image format matplotlib saves)."""
+        counts, edges = Plotter.histogram(results_df['Total Profit'].to_numpy(), bins)
+
+        if output is None:
+            import matplotlib.pyplot as plt
+            fig = plt.figure(figsize=(12, 6))
+        else:
+            from matplotlib.figure import Figure
+            # Not managed by pyplot, so it renders without a display
+            fig = Figure(figsize=(12, 6))
+
+        # The bins are drawn as bars, so the chart is the same size however many simulations there are
+        ax = fig.add_subplot()
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', edgecolor='black')
+        ax.set_title('Distribution of Total Profit in Monte Carlo Simulations')
+        ax.set_xlabel('Total Profit')
+        ax.set_ylabel('Frequency')
 
-        plt.figure(figsize=(12, 6))
-        plt.hist(results_df['Total Profit'], bins=50, edgecolor='black')
-        plt.title('Distribution of Total Profit in Monte Carlo Simulations')
-        plt.xlabel('Total Profit')
-        plt.ylabel('Frequency')
-        
         stats_text = "\n".join([f"{k}: {v:.2f}" for k, v in summary_stats.items()])
-        plt.text(0.05, 0.95, stats_text, transform=plt.gca().transAxes, verticalalignment='top', 
-                 bbox=dict(boxstyle='round', facecolor='white', alpha=0.5))
-        
-        plt.show()
\ No newline at end of file
+        ax.text(0.05, 0.95, stats_text, transform=ax.transAxes, verticalalignment='top',
+                bbox=dict(boxstyle='round', facecolor='white', alpha=0.5))
+
+        if output is None:
+            plt.show()
+        else:
+            fig.savefig(output)
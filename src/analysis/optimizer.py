@@ -1,74 +1,123 @@
+import heapq
+import itertools
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
+from instrumentation.core import instrumented
+from data.index import DataIndex
 from data.processor import DataProcessor
 
 class Optimizer:
-    def __init__(self, data: pd.DataFrame):
+    EXCLUDE = ('Exclude', 'Exclude')
+
+    def __init__(self, data: pd.DataFrame, index: Optional[DataIndex] = None, dimensions: Optional[List[str]] = None):
+        """A setup picks a (stop loss, strategy type) cell per weekday; dimensions adds grid columns such as 'Strategy Entry' to the cell."""
         self.data = data
+        self.index = index
+        self.days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+        self.cell_columns = ['Stop Loss %', 'Strategy Type'] + list(dimensions or [])
+        self.exclude = self.EXCLUDE + ('Exclude',) * (len(self.cell_columns) - len(self.EXCLUDE))
 
+    @instrumented
     def find_optimal_setup(self, x: int = None) -> Dict[str, Any]:
-        # Filter for the last x days
-        last_x_days_data = self.data if x is None else DataProcessor.filter_last_x_days(self.data, x)
+        profit_table, cells = self._build_profit_table(x)
+        if not cells:
+            # Nothing traded in the window, so every day is excluded
+            return {'total_profit': 0, 'setup': {day: self.exclude for day in reversed(self.days_of_week)}}
 
-        days_of_week = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
-        stop_loss_options = last_x_days_data['Stop Loss %'].unique()
-        strategy_types = last_x_days_data['Strategy Type'].unique()
+        # Total profit is additive per weekday, so the best setup is the best cell of each day.
+        # argmax keeps the first cell on ties, matching the order of a full enumeration.
+        best_cells = profit_table.argmax(axis=1)
 
-        best_setup = {
-            'total_profit': float('-inf'),
-            'setup': {}
+        setup = {}
+        total_profit = 0
+        # Days are listed last to first, the order the previous exhaustive search produced
+        for day_idx in reversed(range(len(self.days_of_week))):
+            day = self.days_of_week[day_idx]
+            profit = profit_table[day_idx, best_cells[day_idx]]
+            if profit < 0:
+                # Excluding the day improves the result
+                setup[day] = self.exclude
+            else:
+                setup[day] = cells[best_cells[day_idx]]
+                total_profit += profit
+
+        return {
+            'total_profit': total_profit,
+            'setup': setup
         }
 
-        # Try all combinations of stop loss and strategy type for each day
-        for setup in self._generate_setups(days_of_week, stop_loss_options, strategy_types):
-            profit = self._calculate_profit(last_x_days_data, setup)
-            if profit > best_setup['total_profit']:
-                best_setup['total_profit'] = profit
-                best_setup['setup'] = setup
-
-        # Check if excluding any day improves the result
-        for day in days_of_week:
-            setup_without_day = best_setup['setup'].copy()
-            setup_without_day[day] = ('Exclude', 'Exclude')  # Exclude both stop loss and strategy type
-            profit_without_day = self._calculate_profit(last_x_days_data, setup_without_day)
-            if profit_without_day > best_setup['total_profit']:
-                best_setup['total_profit'] = profit_without_day
-                best_setup['setup'] = setup_without_day
-
-        return best_setup
-
-    def _generate_setups(self, days: List[str], stop_loss_options: List[str], strategy_types: List[str]) -> List[Dict[str, Tuple[str, str]]]:
-        # Base case: If no more days, return a list with an empty dictionary
-        if not days:
-            return [{}]
-        
-        setups = []
-        # Iterate over all combinations of stop_loss and strategy_type
-        for stop_loss in stop_loss_options:
-            for strategy_type in strategy_types:
-                # Recursive call with remaining days
-                sub_setups = self._generate_setups(days[1:], stop_loss_options, strategy_types)
-                # For each sub-setup, add current day's setup and append to results
-                for setup in sub_setups:
-                    setup[days[0]] = (stop_loss, strategy_type)
-                    setups.append(setup)
-        return setups
-
-    def _calculate_profit(self, data: pd.DataFrame, setup: Dict[str, Tuple[str, str]]) -> float:
-        profit = 0
-        for day, (stop_loss, strategy_type) in setup.items():
-            if stop_loss == 'Exclude' or strategy_type == 'Exclude':
-                continue
-            day_data = data[(data['Day of Week'] == day) &
-                            (data['Stop Loss %'] == stop_loss) &
-                            (data['Strategy Type'] == strategy_type)]
-            profit += day_data['P/L'].sum()
-        return profit
+    @instrumented
+    def find_top_setups(self, x: int = None, k: int = 10) -> List[Dict[str, Any]]:
+        """Rank the k most profitable full setups without enumerating every combination."""
+        profit_table, cells = self._build_profit_table(x)
+
+        # Every day may pick any cell or be excluded (worth 0); sort each day's options best first
+        options = np.hstack([profit_table, np.zeros((len(self.days_of_week), 1))])
+        choices = list(cells) + [self.exclude]
+        order = np.argsort(-options, axis=1, kind='stable')
+        ranked = np.take_along_axis(options, order, axis=1)
+
+        # Best-first search over per-day ranks: each popped state spawns its successors by
+        # moving a single day one option down, so only O(k * days) states are ever visited.
+        start = (0,) * len(self.days_of_week)
+        heap = [(-ranked[:, 0].sum(), start)]
+        seen = {start}
+        top_setups = []
+        while heap and len(top_setups) < k:
+            neg_profit, ranks = heapq.heappop(heap)
+            setup = {
+                day: choices[order[day_idx, ranks[day_idx]]]
+                for day_idx, day in enumerate(self.days_of_week)
+            }
+            top_setups.append({'total_profit': -neg_profit, 'setup': setup})
+
+            for day_idx in range(len(self.days_of_week)):
+                if ranks[day_idx] + 1 >= options.shape[1]:
+                    continue
+                successor = ranks[:day_idx] + (ranks[day_idx] + 1,) + ranks[day_idx + 1:]
+                if successor in seen:
+                    continue
+                seen.add(successor)
+                profit = ranked[np.arange(len(self.days_of_week)), list(successor)].sum()
+                heapq.heappush(heap, (-profit, successor))
+
+        return top_setups
+
+    @instrumented
+    def _build_profit_table(self, x: int = None) -> Tuple[np.ndarray, List[Tuple]]:
+        """Aggregate P/L once into a (day of week) x (stop loss, strategy type, dimensions...) table."""
+        # Filter for the last x days
+        last_x_days_data = self.data if x is None else DataProcessor.filter_last_x_days(self.data, x, self.index)
+
+        cells = list(itertools.product(*[last_x_days_data[col].unique() for col in self.cell_columns]))
+
+        totals = last_x_days_data.groupby(['Day of Week'] + self.cell_columns, observed=True)['P/L'].sum()
+        full_index = pd.MultiIndex.from_tuples(
+            [(day,) + cell for day in self.days_of_week for cell in cells],
+            names=totals.index.names
+        )
+        # Combinations that never traded on a day contribute nothing
+        profit_table = totals.reindex(full_index, fill_value=0).to_numpy(dtype=float)
+
+        return profit_table.reshape(len(self.days_of_week), len(cells)), cells
 
     def get_optimal_setup_summary(self, x: int) -> pd.DataFrame:
         optimal_setup = self.find_optimal_setup(x)
+        return self._setup_to_summary(optimal_setup)
+
+    def get_top_setups_summary(self, x: int, k: int = 10) -> pd.DataFrame:
+        summaries = []
+        for rank, setup in enumerate(self.find_top_setups(x, k), start=1):
+            summary = self._setup_to_summary(setup)
+            summary.insert(0, 'Rank', rank)
+            summaries.append(summary)
+        return pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame()
+
+    def _setup_to_summary(self, optimal_setup: Dict[str, Any]) -> pd.DataFrame:
         summary = pd.DataFrame(list(optimal_setup['setup'].items()), columns=['Day', 'Optimal Setup'])
-        summary[['Optimal Stop Loss', 'Optimal Strategy Type']] = pd.DataFrame(summary['Optimal Setup'].tolist(), index=summary.index)
+        optimal_columns = ['Optimal Stop Loss', 'Optimal Strategy Type'] + [f'Optimal {col}' for col in self.cell_columns[2:]]
+        summary[optimal_columns] = pd.DataFrame(summary['Optimal Setup'].tolist(), index=summary.index)
         summary = summary.drop(columns=['Optimal Setup'])
         summary['Total Profit'] = optimal_setup['total_profit']
         return summary
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from instrumentation.core import instrumented
+from data.matrix import PnLMatrix
+from metrics.base import Metric
+from metrics.profit_loss import TotalProfit
+from metrics.risk import MaxDrawdown, SharpeRatio, CalmarRatio
+
+
+class ParetoOptimizer:
+    """
+    Multi-objective search for weekday setups on path-dependent metrics.
+    A setup picks one (stop loss, strategy type) cell, or 'Exclude', for every weekday. Its equity curve is the
+    date-ordered P/L of the chosen cells on their own weekdays, so candidate curves are assembled from the columns
+    of a PnLMatrix and every metric of a block of candidates is one Metric.calculate_array call.
+    Weekdays are added one at a time and only the best non-dominated partial setups (at most beam_width) are
+    extended, so the search takes seconds where enumerating every setup would take hours. The pruning works
+    on partial curves, so the returned front is the Pareto front of the setups the search reached.
+    """
+    EXCLUDE = ('Exclude', 'Exclude')
+
+    def __init__(self, matrix: PnLMatrix, metrics: Optional[Dict[str, Metric]] = None):
+        """Objectives and constraints may name Total Profit, Max Drawdown, Sharpe Ratio, Calmar Ratio or any of metrics."""
+        self.matrix = matrix
+        self.days_of_week = PnLMatrix.DAYS_OF_WEEK
+        self.metrics: Dict[str, Metric] = {
+            'Total Profit': TotalProfit(),
+            'Max Drawdown': MaxDrawdown(),
+            'Sharpe Ratio': SharpeRatio(),
+            'Calmar Ratio': CalmarRatio(),
+            **(metrics or {}),
+        }
+
+    @instrumented
+    def find_front(self, x: Optional[int] = None, objectives: Optional[List[str]] = None, constraints: Optional[Dict[str, float]] = None, beam_width: int = 200, max_rounds: int = 20, max_cells: int = 5_000_000) -> pd.DataFrame:
+        """
+        Pareto front of setups over the last x days on objectives (default Total Profit and Max Drawdown).
+        constraints maps a metric to the worst value a setup may have, e.g. {'Max Drawdown': 20000}.
+        The beam's front is then refined by up to max_rounds rounds of single-weekday changes.
+        Candidate curves are evaluated in blocks of at most max_cells matrix cells to bound memory.
+        """
+        objectives = list(objectives or ['Total Profit', 'Max Drawdown'])
+        constraints = constraints or {}
+        unknown = [name for name in objectives + list(constraints) if name not in self.metrics]
+        if unknown:
+            raise ValueError(f"Unsupported metrics {unknown}. Use any of {list(self.metrics)}.")
+
+        matrix = self.matrix.window(x).active()
+        pl, cells, weekdays = matrix.values, matrix.setups, matrix.weekdays
+        exclude = len(cells)
+        block = max(1, max_cells // max(len(pl), 1))
+
+        # Partial setups: the cell chosen for each weekday handled so far (exclude for 'Exclude')
+        choices = np.empty((1, 0), dtype=np.int64)
+        for day_idx, day in enumerate(self.days_of_week):
+            parents = np.repeat(np.arange(len(choices)), exclude + 1)
+            options = np.tile(np.arange(exclude + 1), len(choices))
+            choices = np.hstack([choices[parents], options[:, None]])
+
+            scores = self._score_blocks(pl, weekdays, choices, objectives, block)
+            if day_idx == len(self.days_of_week) - 1:
+                break
+            choices = choices[self._select(scores, beam_width)]
+
+        choices, values = self._admissible(pl, weekdays, choices, constraints, block)
+        front = self._front(self._oriented(values, objectives))
+        choices, values = self._polish(pl, weekdays, choices[front], {name: metric[front] for name, metric in values.items()}, objectives, constraints, block, max_rounds)
+        return self._summary(choices, values, cells, objectives[0])
+
+    def _admissible(self, pl: np.ndarray, weekdays: np.ndarray, choices: np.ndarray, constraints: Dict[str, float], block: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """All metrics of the full setups in choices, keeping only the setups that meet constraints."""
+        values = self._evaluate_blocks(pl, weekdays, choices, list(self.metrics), block)
+        allowed = np.ones(len(choices), dtype=bool)
+        for name, bound in constraints.items():
+            with np.errstate(invalid='ignore'):
+                allowed &= values[name] >= bound if self.metrics[name].is_higher_better() else values[name] <= bound
+        return choices[allowed], {name: metric[allowed] for name, metric in values.items()}
+
+    def _polish(self, pl: np.ndarray, weekdays: np.ndarray, choices: np.ndarray, values: Dict[str, np.ndarray], objectives: List[str], constraints: Dict[str, float], block: int, max_rounds: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Pareto local search: try every single-weekday change of the front's setups and keep the new front,
+        until it stops changing. This recovers front members whose partial setups were pruned by the beam.
+        """
+        num_options = pl.shape[1] + 1
+        # Setups tried so far as unique rows of choices; packing a row into one integer overflows int64 with a few thousand cells
+        seen = np.unique(choices, axis=0)
+        for _ in range(max_rounds):
+            neighbors = np.repeat(choices, choices.shape[1] * num_options, axis=0)
+            days = np.tile(np.repeat(np.arange(choices.shape[1]), num_options), len(choices))
+            neighbors[np.arange(len(neighbors)), days] = np.tile(np.arange(num_options), len(choices) * choices.shape[1])
+
+            # return_index points at first occurrences, so setups seen before point into the leading seen rows
+            num_seen = len(seen)
+            seen, first = np.unique(np.vstack([seen, neighbors]), axis=0, return_index=True)
+            fresh = np.sort(first[first >= num_seen]) - num_seen
+            if not len(fresh):
+                break
+
+            candidates, candidate_values = self._admissible(pl, weekdays, neighbors[fresh], constraints, block)
+            choices = np.vstack([choices, candidates])
+            values = {name: np.concatenate([values[name], candidate_values[name]]) for name in values}
+            front = self._front(self._oriented(values, objectives))
+            improved = np.any(front >= len(choices) - len(candidates))
+            choices, values = choices[front], {name: metric[front] for name, metric in values.items()}
+            if not improved:
+                break
+
+        return choices, values
+
+    def _curves(self, pl: np.ndarray, weekdays: np.ndarray, choices: np.ndarray) -> np.ndarray:
+        """Equity curve columns of the given (partial) setups; weekdays not chosen yet don't trade."""
+        # An extra all-NaN column stands for 'Exclude'
+        padded = np.hstack([pl, np.full((len(pl), 1), np.nan)])
+        curves = np.full((len(pl), len(choices)), np.nan)
+        for day_idx in range(choices.shape[1]):
+            on_day = weekdays == day_idx
+            curves[on_day] = padded[on_day][:, choices[:, day_idx]]
+        return curves
+
+    def _evaluate_blocks(self, pl: np.ndarray, weekdays: np.ndarray, choices: np.ndarray, names: List[str], block: int) -> Dict[str, np.ndarray]:
+        parts = [self._evaluate(self._curves(pl, weekdays, choices[start:start + block]), names) for start in range(0, len(choices), block)]
+        return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+    def _score_blocks(self, pl: np.ndarray, weekdays: np.ndarray, choices: np.ndarray, objectives: List[str], block: int) -> np.ndarray:
+        return self._oriented(self._evaluate_blocks(pl, weekdays, choices, objectives, block), objectives)
+
+    def _evaluate(self, curves: np.ndarray, names: List[str]) -> Dict[str, np.ndarray]:
+        """Metrics of every curve column, each in one array pass."""
+        trades = (~np.isnan(curves)).sum(axis=0)
+        # A setup that never trades has no metrics
+        return {name: np.where(trades > 0, self.metrics[name].calculate_array(curves), np.nan) for name in names}
+
+    def _oriented(self, values: Dict[str, np.ndarray], objectives: List[str]) -> np.ndarray:
+        """Objective scores as columns where higher is always better and missing values are worst."""
+        scores = np.column_stack([values[name] if self.metrics[name].is_higher_better() else -values[name] for name in objectives])
+        return np.where(np.isnan(scores), -np.inf, scores)
+
+    @staticmethod
+    def _front(scores: np.ndarray, block: int = 1024) -> np.ndarray:
+        """Positions of the non-dominated rows of scores, best first in lexicographic order."""
+        # In descending lexicographic order no row can be dominated by a later one,
+        # so each block only needs checking against the front so far and against itself
+        order = np.lexsort(scores.T[::-1])[::-1]
+        front = np.empty(0, dtype=np.int64)
+        for start in range(0, len(order), block):
+            candidates = order[start:start + block]
+            kept = scores[front]
+            if len(kept):
+                dominated = ((kept[None] >= scores[candidates, None]).all(axis=2) & (kept[None] > scores[candidates, None]).any(axis=2)).any(axis=1)
+                candidates = candidates[~dominated]
+            own = scores[candidates]
+            dominated = ((own[None] >= own[:, None]).all(axis=2) & (own[None] > own[:, None]).any(axis=2)).any(axis=1)
+            front = np.concatenate([front, candidates[~dominated]])
+        return front
+
+    def _select(self, scores: np.ndarray, beam_width: int) -> np.ndarray:
+        """Up to beam_width candidates taken front by front; the last front used is thinned evenly."""
+        remaining = np.arange(len(scores))
+        selected = []
+        while len(remaining) and sum(len(part) for part in selected) < beam_width:
+            front = remaining[self._front(scores[remaining])]
+            room = beam_width - sum(len(part) for part in selected)
+            if len(front) > room:
+                front = front[np.unique(np.linspace(0, len(front) - 1, room).round().astype(np.int64))]
+            selected.append(front)
+            remaining = np.setdiff1d(remaining, front, assume_unique=True)
+        return np.concatenate(selected) if selected else remaining
+
+    def _summary(self, choices: np.ndarray, values: Dict[str, np.ndarray], cells: List[Tuple[str, str]], sort_by: str) -> pd.DataFrame:
+        """One row per (setup, weekday), setups ordered best first on sort_by."""
+        options = cells + [self.EXCLUDE]
+        order = np.argsort(-values[sort_by] if self.metrics[sort_by].is_higher_better() else values[sort_by], kind='stable')
+        rows = []
+        for rank, setup in enumerate(order, start=1):
+            for day_idx, day in enumerate(self.days_of_week):
+                stop_loss, strategy_type = options[choices[setup, day_idx]]
+                row = {'Setup': rank, 'Day': day, 'Optimal Stop Loss': stop_loss, 'Optimal Strategy Type': strategy_type}
+                row.update({name: metric[setup] for name, metric in values.items()})
+                rows.append(row)
+        return pd.DataFrame(rows, columns=['Setup', 'Day', 'Optimal Stop Loss', 'Optimal Strategy Type'] + list(values))
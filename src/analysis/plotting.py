@@ -0,0 +1,108 @@
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+class Plotter:
+    """
+    Chart building that stays cheap however much data there is. Series are thinned to the minimum and maximum of
+    equal-width buckets and distributions are binned with NumPy before anything reaches the plotting library, so
+    a chart holds at most a fixed number of points. Plotly figures use WebGL traces, built in one batch.
+    """
+
+    # Traces in a time chart; the setups past the largest ones are summed into one 'Other' trace
+    MAX_TRACES = 20
+
+    @staticmethod
+    def minmax_indices(values: np.ndarray, max_points: int) -> np.ndarray:
+        """
+        Positions of at most max_points values to draw, in order: the first and last value plus the minimum and
+        maximum of each of (max_points - 2) // 2 buckets in between, so spikes survive the thinning.
+        Below 4 points there is no room for a bucket, and evenly spaced positions are kept instead.
+        """
+        num_values = len(values)
+        if num_values <= max_points:
+            return np.arange(num_values)
+        if max_points < 4:
+            return np.unique(np.linspace(0, num_values - 1, max(max_points, 0)).astype(np.int64))
+
+        num_buckets = max(1, (max_points - 2) // 2)
+        edges = np.linspace(1, num_values - 1, num_buckets + 1).astype(np.int64)
+        bucket = np.repeat(np.arange(num_buckets), np.diff(edges))
+        inner = np.asarray(values[1:-1], dtype=float)
+
+        keep = [np.array([0, num_values - 1])]
+        # Missing values never win a bucket unless the whole bucket is missing
+        for candidates, reduce in ((np.where(np.isnan(inner), np.inf, inner), np.minimum), (np.where(np.isnan(inner), -np.inf, inner), np.maximum)):
+            extremes = reduce.reduceat(candidates, edges[:-1] - 1)
+            hits = np.flatnonzero(candidates == extremes[bucket])
+            _, first = np.unique(bucket[hits], return_index=True)
+            keep.append(hits[first] + 1)
+        return np.unique(np.concatenate(keep))
+
+    @staticmethod
+    def histogram(values: np.ndarray, bins: int = 50) -> Tuple[np.ndarray, np.ndarray]:
+        """Counts and bin edges of the finite values, for drawing as bars instead of handing the raw values to the plot."""
+        values = np.asarray(values, dtype=float)
+        return np.histogram(values[np.isfinite(values)], bins=bins)
+
+    @staticmethod
+    def performance_traces(df: pd.DataFrame, max_points: int = 20_000, max_traces: int = MAX_TRACES) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+        """
+        (name, periods, total profit) of every trace of time_performance_figure, at most max_points points in all.
+        The max_traces - 1 (strategy type, stop loss) pairs with the largest absolute total profit get a trace
+        each and the rest are summed per period into 'Other'. Only series longer than their share of max_points,
+        like daily totals over years, are thinned; short ones such as monthly totals keep every period.
+        """
+        df = df.groupby(['Period', 'Strategy Type', 'Stop Loss %'], observed=True)['Total Profit'].sum().reset_index()
+        pivot_table = df.pivot_table(values='Total Profit', index='Period', columns=['Strategy Type', 'Stop Loss %'], aggfunc='sum', observed=True)
+        periods = pivot_table.index.astype(str).to_numpy()
+        series = {f'{strategy_type} - {stop_loss}': pivot_table[(strategy_type, stop_loss)].to_numpy(dtype=float) for strategy_type, stop_loss in pivot_table.columns}
+
+        # Every trace needs at least one point
+        max_traces = max(1, min(max_traces, max_points))
+        if len(series) > max_traces:
+            ranked = sorted(series, key=lambda name: -abs(np.nansum(series[name])))
+            rest = np.vstack([series.pop(name) for name in ranked[max_traces - 1:]])
+            # Periods where none of the remaining setups traded stay missing
+            series['Other'] = np.where(np.isnan(rest).all(axis=0), np.nan, np.nansum(rest, axis=0))
+
+        points_per_trace = max(1, max_points // max(len(series), 1))
+        traces = []
+        for name, total_profit in series.items():
+            keep = Plotter.minmax_indices(total_profit, points_per_trace)
+            traces.append((name, periods[keep], total_profit[keep]))
+        return traces
+
+    @staticmethod
+    def time_performance_figure(df: pd.DataFrame, max_points: int = 20_000, max_traces: int = MAX_TRACES):
+        """Total profit per period of the largest (strategy type, stop loss) pairs, at most max_points points in all."""
+        import plotly.graph_objects as go
+
+        traces = [go.Scattergl(
+            x=periods,
+            y=total_profit,
+            mode='lines+markers',
+            name=name,
+            hovertemplate='Period: %{x}<br>Total Profit: %{y:.2f}'
+        ) for name, periods, total_profit in Plotter.performance_traces(df, max_points, max_traces)]
+
+        # Adding every trace at once validates the figure once instead of once per trace
+        return go.Figure(data=traces, layout=go.Layout(
+            title='Profit/Loss Trends Over Time by Strategy Type',
+            xaxis_title='Period',
+            yaxis_title='Total Profit/Loss',
+            legend_title='Strategy Type - Stop Loss %',
+            # A unified hover label lists every trace, which doesn't scale past a few dozen
+            hovermode='x unified' if len(traces) <= Plotter.MAX_TRACES else 'closest'
+        ))
+
+    @staticmethod
+    def show_or_write(fig, output: Optional[str] = None):
+        """Show a Plotly figure, or write it to output: '.html' loads plotly.js from its CDN, image formats need kaleido."""
+        if output is None:
+            fig.show()
+        elif output.lower().endswith(('.html', '.htm')):
+            fig.write_html(output, include_plotlyjs='cdn')
+        else:
+            fig.write_image(output)
@@ -0,0 +1,185 @@
+import itertools
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, Optional, Tuple
+from instrumentation.core import instrumented
+from data.matrix import PnLMatrix
+from metrics.risk import MaxDrawdown
+
+
+class PortfolioOptimizer:
+    """
+    Search for the best k-of-n portfolio of reports run side by side.
+    Reports are the columns of a date-aligned PnLMatrix; a portfolio's daily P/L is a weighted sum of its members'
+    columns, so a block of candidates is one matrix product. Totals and the covariance and correlation matrices are
+    computed once, which makes total P/L, volatility and average pairwise correlation of any candidate a few dot
+    products; only the drawdown needs the candidate's equity curve.
+    When there are at most max_candidates combinations all are evaluated, otherwise portfolios are grown one report
+    at a time keeping the beam_width best (beam_width=1 is a greedy search).
+    """
+
+    # Objective -> whether higher values are better
+    OBJECTIVES = {
+        'Total Profit': True,
+        'Max Drawdown': False,
+        'Profit to Drawdown': True,
+        'Average Correlation': False,
+        'Volatility': False,
+    }
+
+    def __init__(self, matrix: PnLMatrix):
+        self.matrix = matrix.active()
+        self.reports = self.matrix.setups
+        self.traded = self.matrix.traded
+        # Days a report didn't trade add nothing to a portfolio
+        self.pl = np.nan_to_num(self.matrix.values)
+        self.totals = self.pl.sum(axis=0)
+
+        num_reports = len(self.reports)
+        self.covariance = np.cov(self.pl, rowvar=False).reshape(num_reports, num_reports) if len(self.pl) > 1 else np.zeros((num_reports, num_reports))
+        std = np.sqrt(np.diag(self.covariance))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Reports with constant P/L are uncorrelated with everything
+            self.correlation = np.nan_to_num(self.covariance / np.outer(std, std))
+        np.fill_diagonal(self.correlation, 1.0)
+
+    def correlation_frame(self) -> pd.DataFrame:
+        """Correlation of daily P/L between every pair of reports."""
+        labels = pd.MultiIndex.from_tuples(self.reports, names=self.matrix.setup_columns)
+        return pd.DataFrame(self.correlation, index=labels, columns=labels)
+
+    def evaluate(self, weights: np.ndarray, max_cells: int = 5_000_000) -> Dict[str, np.ndarray]:
+        """
+        Every objective of the portfolios in the rows of weights (one column per report, 0 for non-members),
+        in blocks of at most max_cells equity curve cells.
+        """
+        weights = np.atleast_2d(np.asarray(weights, dtype=float))
+        members = weights != 0
+        num_members = members.sum(axis=1)
+
+        total_profit = weights @ self.totals
+        volatility = np.sqrt(np.maximum(np.einsum('ij,jk,ik->i', weights, self.covariance, weights), 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pairs = np.einsum('ij,jk,ik->i', members.astype(float), self.correlation, members.astype(float)) - num_members
+            average_correlation = np.where(num_members > 1, pairs / (num_members * (num_members - 1)), np.nan)
+
+        max_drawdown = np.empty(len(weights))
+        block = max(1, max_cells // max(len(self.pl), 1))
+        for start in range(0, len(weights), block):
+            stop = start + block
+            curves = self.pl @ weights[start:stop].T
+            # A date no member traded is not on the portfolio's equity curve
+            curves[(self.traded.astype(float) @ members[start:stop].T) == 0] = np.nan
+            max_drawdown[start:stop] = MaxDrawdown().calculate_array(curves)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit_to_drawdown = np.where(max_drawdown > 0, total_profit / max_drawdown, np.inf)
+
+        return {
+            'Total Profit': total_profit,
+            'Max Drawdown': max_drawdown,
+            'Profit to Drawdown': profit_to_drawdown,
+            'Average Correlation': average_correlation,
+            'Volatility': volatility,
+        }
+
+    @instrumented
+    def find_portfolios(self, k: int, objective: str = 'Total Profit', constraints: Optional[Dict[str, float]] = None, top: int = 10,
+                        beam_width: int = 100, max_candidates: int = 200_000, chunk_size: int = 20_000) -> pd.DataFrame:
+        """
+        The top portfolios of k equally weighted reports by objective. constraints maps an objective to the worst
+        value a portfolio may have, e.g. {'Max Drawdown': 20000, 'Average Correlation': 0.5}.
+        """
+        constraints = constraints or {}
+        unknown = [name for name in [objective] + list(constraints) if name not in self.OBJECTIVES]
+        if unknown:
+            raise ValueError(f"Unsupported objectives {unknown}. Use any of {list(self.OBJECTIVES)}.")
+        if not 1 <= k <= len(self.reports):
+            raise ValueError(f"k must be between 1 and the number of reports ({len(self.reports)}).")
+
+        if math.comb(len(self.reports), k) <= max_candidates:
+            chosen, values = self._exhaustive(k, objective, constraints, top, chunk_size)
+        else:
+            chosen, values = self._beam(k, objective, constraints, top, beam_width)
+        return self._summary(chosen, values)
+
+    def _exhaustive(self, k: int, objective: str, constraints: Dict[str, float], top: int, chunk_size: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Evaluate every combination, chunk by chunk, keeping the best top admissible ones."""
+        chosen = np.empty((0, k), dtype=np.int64)
+        values = {name: np.empty(0) for name in self.OBJECTIVES}
+        for combinations in self._chunks(itertools.combinations(range(len(self.reports)), k), chunk_size):
+            candidate_values = self.evaluate(self._weights(combinations))
+            allowed = self._admissible(candidate_values, constraints)
+            chosen = np.vstack([chosen, combinations[allowed]])
+            values = {name: np.concatenate([values[name], candidate_values[name][allowed]]) for name in values}
+            best = self._best(values[objective], objective, top)
+            chosen, values = chosen[best], {name: metric[best] for name, metric in values.items()}
+        return chosen, values
+
+    def _beam(self, k: int, objective: str, constraints: Dict[str, float], top: int, beam_width: int) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Grow portfolios one report at a time, keeping the beam_width best partial portfolios of each size."""
+        num_reports = len(self.reports)
+        beam = np.empty((1, 0), dtype=np.int64)
+        for size in range(1, k + 1):
+            parents = np.repeat(beam, num_reports, axis=0)
+            additions = np.tile(np.arange(num_reports), len(beam))
+            fresh = ~(parents == additions[:, None]).any(axis=1)
+            # Sorted members identify a portfolio however it was grown
+            candidates = np.unique(np.sort(np.hstack([parents[fresh], additions[fresh, None]]), axis=1), axis=0)
+
+            values = self.evaluate(self._weights(candidates))
+            allowed = self._admissible(values, constraints)
+            if size == k:
+                best = self._best(np.where(allowed, values[objective], np.nan), objective, top)
+            else:
+                # Partial portfolios that already meet the constraints come first, the rest still may after growing.
+                # Single reports have no average correlation, so partial portfolios whose objective is undefined
+                # stay in the beam, ranked by total profit after the ones with a score
+                best = self._best(values[objective], objective, beam_width, preferred=allowed, fallback=values['Total Profit'])
+            beam, values = candidates[best], {name: metric[best] for name, metric in values.items()}
+        return beam, values
+
+    @staticmethod
+    def _chunks(iterator: Iterator[Tuple[int, ...]], chunk_size: int) -> Iterator[np.ndarray]:
+        while True:
+            chunk = list(itertools.islice(iterator, chunk_size))
+            if not chunk:
+                return
+            yield np.array(chunk, dtype=np.int64)
+
+    def _weights(self, chosen: np.ndarray) -> np.ndarray:
+        weights = np.zeros((len(chosen), len(self.reports)))
+        weights[np.arange(len(chosen))[:, None], chosen] = 1.0
+        return weights
+
+    def _admissible(self, values: Dict[str, np.ndarray], constraints: Dict[str, float]) -> np.ndarray:
+        allowed = np.ones(len(next(iter(values.values()))), dtype=bool)
+        for name, bound in constraints.items():
+            with np.errstate(invalid='ignore'):
+                allowed &= values[name] >= bound if self.OBJECTIVES[name] else values[name] <= bound
+        return allowed
+
+    def _best(self, values: np.ndarray, objective: str, count: int, preferred: Optional[np.ndarray] = None, fallback: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Positions of the count best values, best first (preferred ones before the rest). Missing values are dropped,
+        unless fallback (higher is better) is given to rank them after the others.
+        """
+        scores = values if self.OBJECTIVES[objective] else -values
+        preferred = np.ones(len(values), dtype=bool) if preferred is None else preferred
+        missing = np.isnan(scores)
+        tiebreak = np.zeros(len(values)) if fallback is None else -np.nan_to_num(fallback, nan=np.inf)
+        order = np.lexsort((tiebreak, -np.where(missing, -np.inf, scores), missing, ~preferred))
+        return (order if fallback is not None else order[~missing[order]])[:count]
+
+    def _summary(self, chosen: np.ndarray, values: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """One row per (portfolio, member report), portfolios in the order given (best first)."""
+        columns = ['Rank'] + list(self.matrix.setup_columns) + list(self.OBJECTIVES)
+        rows = []
+        for rank, members in enumerate(chosen, start=1):
+            for member in members:
+                row = {'Rank': rank}
+                row.update(zip(self.matrix.setup_columns, self.reports[member]))
+                row.update({name: metric[rank - 1] for name, metric in values.items()})
+                rows.append(row)
+        return pd.DataFrame(rows, columns=columns)
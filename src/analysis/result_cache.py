@@ -0,0 +1,119 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+class ResultCache:
+    """
+    LRU cache of analysis results keyed by method name, normalized arguments and the analyzer's result version,
+    which tells analyzers sharing the cache apart and changes with their data and metrics.
+    Bounded by max_entries and optionally max_bytes; results are copied on the way in and out so callers
+    can never modify a cached entry.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[Tuple, Tuple[pd.DataFrame, int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, key: Tuple, result: pd.DataFrame):
+        result = result.copy()
+        size = int(result.memory_usage(deep=True).sum())
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Larger than the whole cache, not worth evicting everything for
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    # Day and stop loss lists are membership filters, so their order and duplicates don't matter
+    FILTER_ARGUMENTS = ('exclude_include_days', 'stoploss')
+
+    @staticmethod
+    def make_key(name: str, version: Any, arguments: Dict[str, Any]) -> Tuple:
+        return (name, version) + tuple((arg, ResultCache._normalize(value, arg in ResultCache.FILTER_ARGUMENTS)) for arg, value in arguments.items())
+
+    @staticmethod
+    def _normalize(value: Any, unordered: bool = False) -> Any:
+        # Arrays and pandas objects of filter values key like the list of their values
+        if isinstance(value, (np.ndarray, pd.Index, pd.Series)):
+            value = value.tolist()
+        if isinstance(value, (list, tuple, set, frozenset)):
+            if unordered or isinstance(value, (set, frozenset)):
+                return tuple(sorted(set(value), key=repr))
+            # Other lists such as dimensions or periods shape the result in their order
+            return tuple(ResultCache._normalize(item) for item in value)
+        # Constraint maps such as {'Max Drawdown': 20000}
+        if isinstance(value, dict):
+            return tuple(sorted((key, ResultCache._normalize(item)) for key, item in value.items()))
+        return value
+
+
+def cached_query(method: Callable) -> Callable:
+    """Serve a BacktestAnalyzer method from its result_cache when one is configured."""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.result_cache is None:
+            return method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = {name: value for name, value in bound.arguments.items() if name != 'self'}
+        key = ResultCache.make_key(method.__name__, self.result_version(), arguments)
+        try:
+            hash(key)
+        except TypeError:
+            # An argument the key can't represent, such as a DataFrame: compute without caching
+            return method(self, *args, **kwargs)
+
+        result = self.result_cache.get(key)
+        if result is None:
+            result = method(self, *args, **kwargs)
+            self.result_cache.put(key, result)
+        return result
+
+    return wrapper
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence
+from instrumentation.core import instrumented
+from analysis.calculator import MetricsCalculator
+
+
+class PeriodRollup:
+    """
+    Per-period metrics of every (day of week, stop loss, strategy type) group at several resolutions of a filtered
+    slice. Rows are coded once by group and by trading date; the periods of each resolution are derived from the
+    unique dates only, coarser ones from finer ones (Y from Q from M), and every resolution is then a single integer
+    key per row. The metrics themselves are still one vectorized grouped pass over the rows per resolution: they are
+    per trade, so they can't be rebuilt from daily totals, and merging per-day accumulator states would run in Python.
+    Nothing is stored between calls, so one rollup can serve many threads.
+    """
+
+    GROUP_COLUMNS = ['Day of Week', 'Stop Loss %', 'Strategy Type']
+    # Resolution -> the finer resolution its periods are derived from
+    PARENTS = {'Q': 'M', 'Y': 'Q'}
+
+    def __init__(self, data: pd.DataFrame, metrics_calculator: MetricsCalculator):
+        # Rows without an Entry Date have no period and are left out, like groupby drops missing keys
+        data = data[data['Entry Date'].notna()]
+        grouped = data.groupby(self.GROUP_COLUMNS, observed=True, sort=True)
+        self.data = data
+        self.metrics_calculator = metrics_calculator
+        self.group_codes = grouped.ngroup().to_numpy()
+        self.groups = grouped.size().index
+        self.date_codes, dates = pd.factorize(data['Entry Date'], sort=True)
+        self.dates = pd.DatetimeIndex(dates)
+
+    @instrumented
+    def breakdown(self, period: str) -> pd.DataFrame:
+        """Metrics per group and period, one row each: metric columns, then the group columns and 'Period'."""
+        return self._breakdown(self._periods([period])[period])
+
+    @instrumented
+    def rollup(self, periods: Sequence[str] = ('W', 'M', 'Q', 'Y')) -> pd.DataFrame:
+        """Metrics of every resolution in periods, indexed by (Resolution, Period label, Day of Week, Stop Loss %, Strategy Type)."""
+        frames = []
+        for period, period_index in self._periods(periods).items():
+            result = self._breakdown(period_index)
+            result.insert(0, 'Resolution', period)
+            # Periods of different frequencies can't be compared, so the shared level holds their labels
+            result['Period'] = result['Period'].astype(str)
+            frames.append(result.set_index(['Resolution', 'Period'] + self.GROUP_COLUMNS))
+        return pd.concat(frames) if frames else pd.DataFrame()
+
+    def _periods(self, periods: Sequence[str]) -> Dict[str, pd.PeriodIndex]:
+        """Period of every unique trading date for each resolution."""
+        derived: Dict[str, pd.PeriodIndex] = {}
+
+        def period_index(period: str) -> pd.PeriodIndex:
+            if period not in derived:
+                parent = self.PARENTS.get(period)
+                derived[period] = period_index(parent).asfreq(period) if parent else self.dates.to_period(period)
+            return derived[period]
+
+        return {period: period_index(period) for period in dict.fromkeys(periods)}
+
+    def _breakdown(self, date_periods: pd.PeriodIndex) -> pd.DataFrame:
+        period_codes, periods = pd.factorize(date_periods, sort=True)
+        # One integer key per row, ordered like the (group columns, period) keys it stands for
+        keys = self.group_codes.astype(np.int64) * max(len(periods), 1) + period_codes[self.date_codes]
+        grouped = self.data.groupby(keys, sort=True)
+
+        metrics = self.metrics_calculator.calculate_grouped_metrics(grouped)
+        used = metrics.index.to_numpy(dtype=np.int64)
+        groups = self.groups[used // max(len(periods), 1)]
+        result = metrics.reset_index(drop=True)
+        for position, col in enumerate(self.GROUP_COLUMNS):
+            result[col] = groups.get_level_values(position)
+        result['Period'] = periods[used % max(len(periods), 1)]
+        return result
@@ -0,0 +1,160 @@
+import json
+import os
+import socketserver
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+from instrumentation.core import instrumented
+from analysis.batch import BatchRunner
+from analysis.result_cache import ResultCache
+
+
+class AnalysisService:
+    """
+    One loaded BacktestAnalyzer shared by concurrent clients.
+    Queries use the batch spec format and run on a pool of max_workers threads. Identical queries that arrive
+    while one is still running wait for its result instead of computing it again, and finished results are kept
+    in a ResultCache. reload() loads the new data next to the current one and then swaps it in, so queries keep
+    being answered from the old data until the new data is ready.
+    """
+
+    def __init__(self, spec: Dict[str, Any], max_workers: int = 4, cache_entries: int = 256):
+        self.spec = spec
+        self.cache_entries = cache_entries
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.generation = 0
+        self.runner = self._load(spec)
+        self.coalesced = 0
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+        # Reloads are serialized with each other, never with queries
+        self._reload_lock = threading.Lock()
+
+    @instrumented
+    def query(self, query: Dict[str, Any]) -> pd.DataFrame:
+        """Run a query, sharing the computation with an identical query already in flight."""
+        # Later queries must not join a computation on data that has since been replaced
+        with self._lock:
+            runner, generation = self.runner, self.generation
+        _, query_type, arguments = runner.parse_query(query)
+        key = ResultCache.make_key(query_type, generation, arguments)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            submitted = future is None
+            if submitted:
+                future = self.pool.submit(runner.run_query, query)
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+        if submitted:
+            # A future that is already done runs the callback right here, and _finish takes the lock,
+            # so it is registered only after the lock is released
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return future.result()
+
+    @instrumented
+    def reload(self, files: Optional[List[str]] = None) -> int:
+        """Load the spec's report files (or files) again and swap them in. Returns the new generation."""
+        with self._reload_lock:
+            spec = dict(self.spec, files=files) if files else self.spec
+            runner = self._load(spec)
+            # Replacing the references is atomic; queries already running keep the runner they started with
+            with self._lock:
+                self.spec, self.runner = spec, runner
+                self.generation += 1
+                return self.generation
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            runner, generation, spec = self.runner, self.generation, self.spec
+            in_flight = len(self._in_flight)
+            coalesced = self.coalesced
+        analyzer = runner.analyzer
+        return {
+            'generation': generation,
+            'files': list(spec['files']),
+            'rows': len(analyzer.all_data),
+            'load_errors': {file_path: str(error) for file_path, error in analyzer.load_errors.items()},
+            'in_flight': in_flight,
+            'coalesced': coalesced,
+            'cache': analyzer.result_cache.stats(),
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+    def _load(self, spec: Dict[str, Any]) -> BatchRunner:
+        return BatchRunner.from_spec(spec, result_cache=ResultCache(self.cache_entries))
+
+    def _finish(self, key: Tuple, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints of an AnalysisService:
+    POST /query with a batch spec query, GET /status, and POST /reload with an optional {"files": [...]}.
+    """
+    service: AnalysisService = None
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._respond(200, json.dumps(self.service.status()))
+        else:
+            self._respond(404, json.dumps({'error': f'Unknown path {self.path}'}))
+
+    def do_POST(self):
+        try:
+            body = self._read_body()
+            if self.path == '/query':
+                result = BatchRunner.flatten(self.service.query(body))
+                self._respond(200, '{"result": ' + result.to_json(orient='records', date_format='iso') + '}')
+            elif self.path == '/reload':
+                self._respond(200, json.dumps({'generation': self.service.reload(body.get('files'))}))
+            else:
+                self._respond(404, json.dumps({'error': f'Unknown path {self.path}'}))
+        except ValueError as e:
+            # Malformed JSON, unknown query types and invalid arguments
+            self._respond(400, json.dumps({'error': str(e)}))
+        except Exception as e:
+            self._respond(500, json.dumps({'error': f'{type(e).__name__}: {e}'}))
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return body
+
+    def _respond(self, status: int, body: str):
+        payload = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: AnalysisService, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """HTTP server for service on host:port, or on the Unix socket socket_path when given."""
+    handler = type('RequestHandler', (_RequestHandler,), {'service': service})
+    if socket_path is None:
+        return ThreadingHTTPServer((host, port), handler)
+    # A socket left behind by a previous run would make the bind fail; anything else at the path is left alone
+    if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+        os.remove(socket_path)
+    return _UnixHTTPServer(socket_path, handler)
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from data.matrix import PnLMatrix
+
+
+class WalkForward:
+    """
+    Lookback sweeps and walk-forward optimization over per-date cumulative P/L sums of a PnLMatrix.
+    The sums are built once per (trading date, day of week, stop loss, strategy type), so the totals of any
+    window are a difference of two rows and any number of windows is evaluated in a few array operations.
+    Setups are chosen like Optimizer.find_optimal_setup: the most profitable cell per weekday, or
+    'Exclude' when even that cell lost money.
+    """
+
+    def __init__(self, matrix: PnLMatrix):
+        self.days_of_week = PnLMatrix.DAYS_OF_WEEK
+        weekday_rows = np.flatnonzero(matrix.weekdays >= 0)
+        self.dates = matrix.dates[weekday_rows]
+        self.setups: List[Tuple[str, str]] = list(matrix.setups)
+
+        # Daily P/L per setup, placed under the weekday of its date
+        daily = np.zeros((len(self.dates), len(self.days_of_week), len(self.setups)))
+        daily[np.arange(len(self.dates)), matrix.weekdays[weekday_rows]] = np.nan_to_num(matrix.values[weekday_rows])
+
+        # cumulative[i] holds the totals of the first i trading dates
+        self.cumulative = np.concatenate([np.zeros((1,) + daily.shape[1:]), np.cumsum(daily, axis=0)])
+
+    def window_totals(self, start: int, stop: int) -> np.ndarray:
+        """Totals per (day of week, setup) over trading dates [start, stop); both may be arrays of windows."""
+        return self.cumulative[stop] - self.cumulative[start]
+
+    def lookback_sweep(self, lookbacks: List[int], as_of: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Optimal setup for each lookback window ending at as_of (the latest date by default)."""
+        end = len(self.dates) - 1 if as_of is None else int(np.searchsorted(self.dates, np.datetime64(as_of), side='right')) - 1
+        if end < 0 or not self.setups:
+            return self._empty_result(test_days=None)
+        anchors = np.full(len(lookbacks), end)
+        return self._evaluate(np.asarray(lookbacks), anchors, test_days=None)
+
+    def walk_forward(self, lookbacks: List[int], test_days: int = 30, step_days: Optional[int] = None, max_workers: Optional[int] = None, chunk_size: int = 10000) -> pd.DataFrame:
+        """
+        Re-optimize every step_days (test_days by default) on each lookback and score the chosen setup on the
+        following test_days. Anchors start once the longest lookback has full history.
+        Windows are evaluated in chunks of chunk_size, spread over max_workers threads when given.
+        """
+        if not self.setups:
+            return self._empty_result(test_days)
+        step_days = step_days or test_days
+        first = self.dates[0] + np.timedelta64(max(lookbacks), 'D')
+        anchor_dates = np.arange(first, self.dates[-1], np.timedelta64(step_days, 'D'))
+        # Last trading date on or before each anchor date
+        anchors = np.searchsorted(self.dates, anchor_dates, side='right') - 1
+        anchors = np.unique(anchors[anchors >= 0])
+
+        window_lookbacks = np.repeat(np.asarray(lookbacks), len(anchors))
+        window_anchors = np.tile(anchors, len(lookbacks))
+        chunks = [
+            (window_lookbacks[start:start + chunk_size], window_anchors[start:start + chunk_size])
+            for start in range(0, len(window_anchors), chunk_size)
+        ]
+        if not chunks:
+            return self._empty_result(test_days)
+
+        if max_workers is None:
+            results = [self._evaluate(chunk_lookbacks, chunk_anchors, test_days) for chunk_lookbacks, chunk_anchors in chunks]
+        else:
+            # The array work releases the GIL, so threads spread chunks across cores without copying the sums
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(lambda chunk: self._evaluate(chunk[0], chunk[1], test_days), chunks))
+
+        return pd.concat(results, ignore_index=True)
+
+    def _evaluate(self, lookbacks: np.ndarray, anchors: np.ndarray, test_days: Optional[int]) -> pd.DataFrame:
+        """Choose a setup per weekday for every (lookback, anchor) window and score it out of sample."""
+        train_start_dates = self.dates[anchors] - lookbacks.astype('timedelta64[D]')
+        train_starts = np.searchsorted(self.dates, train_start_dates, side='left')
+        in_sample = self.window_totals(train_starts, anchors + 1)
+
+        best = in_sample.argmax(axis=2)
+        best_profit = np.take_along_axis(in_sample, best[..., None], axis=2)[..., 0]
+        excluded = best_profit < 0
+
+        result = {
+            'Lookback Days': np.repeat(lookbacks, len(self.days_of_week)),
+            'Train Start': np.repeat(self.dates[train_starts], len(self.days_of_week)),
+            'Train End': np.repeat(self.dates[anchors], len(self.days_of_week)),
+        }
+        if test_days is not None:
+            test_ends = np.searchsorted(self.dates, self.dates[anchors] + np.timedelta64(test_days, 'D'), side='right')
+            out_of_sample = self.window_totals(anchors + 1, test_ends)
+            oos_profit = np.take_along_axis(out_of_sample, best[..., None], axis=2)[..., 0]
+            result['Test End'] = np.repeat(self.dates[test_ends - 1], len(self.days_of_week))
+
+        setups = self.setups + [('Exclude', 'Exclude')]
+        chosen = np.where(excluded, len(self.setups), best).ravel()
+        result['Day'] = np.tile(self.days_of_week, len(anchors))
+        result['Optimal Stop Loss'] = [setups[idx][0] for idx in chosen]
+        result['Optimal Strategy Type'] = [setups[idx][1] for idx in chosen]
+        result['In-Sample Profit'] = np.where(excluded, 0.0, best_profit).ravel()
+        if test_days is not None:
+            result['Out-of-Sample Profit'] = np.where(excluded, 0.0, oos_profit).ravel()
+
+        return pd.DataFrame(result)
+
+    def _empty_result(self, test_days: Optional[int]) -> pd.DataFrame:
+        columns = ['Lookback Days', 'Train Start', 'Train End', 'Day', 'Optimal Stop Loss', 'Optimal Strategy Type', 'In-Sample Profit']
+        if test_days is not None:
+            columns = columns[:3] + ['Test End'] + columns[3:] + ['Out-of-Sample Profit']
+        return pd.DataFrame(columns=columns)
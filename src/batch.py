@@ -0,0 +1,26 @@
+import argparse
+import sys
+from analysis.batch import BatchRunner
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run every analysis in a spec file against one load of the report data.')
+    parser.add_argument('spec', help='JSON file listing the report files and the queries to run')
+    parser.add_argument('--output', default='batch_results.parquet', help='Where to write all results (.parquet or .feather)')
+    parser.add_argument('--max-workers', type=int, default=None, help='Run independent query groups on this many threads')
+    args = parser.parse_args()
+
+    spec = BatchRunner.read_spec(args.spec)
+    runner = BatchRunner.from_spec(spec, args.max_workers)
+    results, errors = runner.run(spec.get('queries', []))
+
+    BatchRunner.write_results(results, args.output)
+    print(f"{len(results)} results written to {args.output}")
+
+    for name, error in errors.items():
+        print(f"Query '{name}' failed: {error}")
+    if errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
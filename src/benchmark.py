@@ -0,0 +1,36 @@
+import argparse
+import sys
+from benchmarks.suite import BASELINE_PATH, SIZES, compare, read_json, run, write_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and measure peak memory of the analysis pipeline on synthetic AlgoTest reports.')
+    parser.add_argument('--sizes', nargs='+', default=['small', 'medium'], choices=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_results.json', help='Where to write the results as JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Stored results to compare against (default: src/benchmarks/baseline.json)')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Time or memory ratio above which a result is a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    write_json(results, args.output)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        write_json(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = read_json(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return
+
+    comparison = compare(results, baseline, args.threshold)
+    print(comparison.to_string(index=False))
+    if comparison['Regression'].any():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
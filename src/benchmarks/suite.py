@@ -0,0 +1,113 @@
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from analysis.analyzer import BacktestAnalyzer
+from analysis.montecarlosim import MonteCarloSimulator
+from benchmarks.synthetic import generate_reports
+
+
+# Stored results benchmark.py compares against by default, kept next to this module so it is found from any directory
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Data sizes as (years, stop loss levels, strategies)
+SIZES: Dict[str, Dict[str, Any]] = {
+    'small': {'years': 1, 'stop_losses': 5, 'strategies': 1},
+    'medium': {'years': 4, 'stop_losses': 10, 'strategies': 2},
+    'large': {'years': 8, 'stop_losses': 20, 'strategies': 4},
+}
+
+
+def measure(func: Callable, repeat: int = 3) -> Dict[str, float]:
+    """Best wall time over repeat runs, then the tracemalloc peak of one more run measured on its own."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': min(timings), 'peak_bytes': peak}
+
+
+def benchmark_size(name: str, years: float, stop_losses: int, strategies: int, repeat: int = 3, simulations: int = 10000) -> List[Dict[str, Any]]:
+    with tempfile.TemporaryDirectory() as data_dir:
+        file_paths = generate_reports(
+            data_dir, years=years,
+            stop_losses=[f'{10 * (i + 1)}p' for i in range(stop_losses)],
+            strategies=[f'strategy{i}' for i in range(strategies)],
+        )
+
+        analyzer = BacktestAnalyzer(file_paths)
+        operations = {
+            'load_and_process_data': analyzer.load_and_process_data,
+            'analyze': lambda: analyzer.analyze(365),
+            'generate_pivot_table': lambda: analyzer.generate_pivot_table(365),
+            'generate_summary': lambda: analyzer.generate_summary(365),
+            'time_based_performance_breakdown': lambda: analyzer.time_based_performance_breakdown(365, 'M'),
+            'find_optimal_setup': lambda: analyzer.optimizer.find_optimal_setup(365),
+            'run_simulation': lambda: MonteCarloSimulator(analyzer, simulations, seed=0).run_simulation(365),
+        }
+
+        results = []
+        for operation, func in operations.items():
+            # Loading runs first so every later operation sees the loaded data
+            measurement = measure(func, repeat)
+            results.append({'size': name, 'rows': len(analyzer.all_data), 'operation': operation, **measurement})
+        return results
+
+
+def run(sizes: List[str], repeat: int = 3) -> Dict[str, Any]:
+    results = []
+    for name in sizes:
+        results.extend(benchmark_size(name, repeat=repeat, **SIZES[name]))
+
+    return {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 1.25, min_seconds: float = 0.005) -> pd.DataFrame:
+    """
+    Ratio of current to baseline time and peak memory per (size, operation); Regression marks ratios above threshold.
+    Timings under min_seconds in the baseline are too noisy to flag on time alone.
+    """
+    keys = ['size', 'operation']
+    merged = pd.DataFrame(current['results']).merge(pd.DataFrame(baseline['results']), on=keys, suffixes=('', '_baseline'))
+    merged['time_ratio'] = merged['seconds'] / merged['seconds_baseline']
+    merged['memory_ratio'] = merged['peak_bytes'] / merged['peak_bytes_baseline']
+    slower = (merged['time_ratio'] > threshold) & (merged['seconds_baseline'] >= min_seconds)
+    merged['Regression'] = slower | (merged['memory_ratio'] > threshold)
+    return merged[keys + ['seconds', 'seconds_baseline', 'time_ratio', 'peak_bytes', 'peak_bytes_baseline', 'memory_ratio', 'Regression']]
+
+
+def write_json(results: Dict[str, Any], path: str):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+
+def read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
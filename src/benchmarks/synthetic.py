@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+
+COLUMNS = ['Index', 'Entry Date', 'Entry Time', 'Exit Date', 'Exit Time', 'Type', 'Strike', 'B/S', 'Qty',
+           'Entry Price', 'Exit Price', 'Vix', 'P/L']
+
+
+def generate_reports(output_dir: str, years: float = 1, stop_losses: Optional[List[str]] = None, strategies: Optional[List[str]] = None,
+                     legs: int = 2, underlying: str = 'banknifty', entry_time: str = '920', exit_time: str = '320',
+                     start_date: str = '2020-01-01', seed: int = 0) -> List[str]:
+    """
+    Write one AlgoTest-format report per (strategy, stop loss) and return their paths.
+    Each trading day has a summary row (null Type) followed by one row per leg, and files are named
+    <underlying>_<strategy>_<entry>_<exit>_<stop loss>.csv so DataLoader.extract_details can parse them.
+    """
+    stop_losses = stop_losses or ['10p', '20p', '30p', '40p', '50p']
+    strategies = strategies or ['atm']
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start_date, periods=int(years * 252)).strftime('%Y-%m-%d').to_numpy()
+    os.makedirs(output_dir, exist_ok=True)
+
+    file_paths = []
+    for strategy in strategies:
+        for stop_loss in stop_losses:
+            file_path = os.path.join(output_dir, f'{underlying}_{strategy}_{entry_time}_{exit_time}_{stop_loss}.csv')
+            _report_frame(dates, legs, rng).to_csv(file_path, index=False)
+            file_paths.append(file_path)
+    return file_paths
+
+
+def _report_frame(dates: np.ndarray, legs: int, rng: np.random.Generator) -> pd.DataFrame:
+    num_days = len(dates)
+    leg_pl = np.round(rng.normal(25, 300, size=(num_days, legs)), 2)
+    strikes = np.round(rng.normal(40000, 2000, size=num_days) / 100) * 100
+    entry_prices = np.round(rng.uniform(50, 300, size=(num_days, legs)), 2)
+    exit_prices = np.round(entry_prices - leg_pl / 15, 2)
+
+    # Row k of a day is its summary row for k == 0 and leg k otherwise
+    rows_per_day = legs + 1
+    day = np.repeat(np.arange(num_days), rows_per_day)
+    leg = np.tile(np.arange(rows_per_day), num_days)
+    is_leg = leg > 0
+    leg_idx = np.maximum(leg - 1, 0)
+
+    leg_types = np.array(['CE', 'PE'])[leg_idx % 2]
+    summary_pl = np.round(leg_pl.sum(axis=1), 2)
+
+    return pd.DataFrame({
+        'Index': np.where(is_leg, (day + 1).astype(str).astype(object) + '.' + leg.astype(str), (day + 1).astype(str)),
+        'Entry Date': dates[day],
+        'Entry Time': '9:20:00 AM',
+        'Exit Date': dates[day],
+        'Exit Time': '3:20:00 PM',
+        'Type': np.where(is_leg, leg_types, None),
+        'Strike': np.where(is_leg, strikes[day], np.nan),
+        'B/S': np.where(is_leg, 'Sell', None),
+        'Qty': np.where(is_leg, 15, np.nan),
+        'Entry Price': np.where(is_leg, entry_prices[day, leg_idx], np.nan),
+        'Exit Price': np.where(is_leg, exit_prices[day, leg_idx], np.nan),
+        'Vix': np.where(is_leg, np.nan, np.round(rng.uniform(10, 25, size=num_days)[day], 2)),
+        'P/L': np.where(is_leg, leg_pl[day, leg_idx], summary_pl[day]),
+    }, columns=COLUMNS)
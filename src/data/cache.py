@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, List, Optional
+import pandas as pd
+
+
+class DataCache:
+    """
+    On-disk cache of parsed report files, stored as uncompressed Feather (Arrow IPC) so warm loads are memory-mapped.
+    Entries are keyed by the source path, size, modification time and a hash of its contents,
+    and the least recently used entries are evicted once the cache grows past max_bytes.
+    """
+
+    SUFFIX = '.feather'
+
+    def __init__(self, cache_dir: str = '.backtest_cache', max_bytes: Optional[int] = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Content hashes already computed in this process, keyed by (path, size, mtime)
+        self._content_hashes: Dict[tuple, str] = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, file_path: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """Return the cached DataFrame for file_path loaded with columns, or None if there is no valid entry."""
+        import pyarrow.feather as feather
+
+        entry = self._entry_path(file_path, columns)
+        if not os.path.exists(entry):
+            return None
+        try:
+            df = feather.read_table(entry, memory_map=True).to_pandas()
+        except (OSError, ValueError):
+            # Corrupt or partially written entry, drop it and fall back to the CSV
+            self._remove(entry)
+            return None
+        # Mark the entry as recently used for eviction
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return df
+
+    def put(self, file_path: str, df: pd.DataFrame, columns: Optional[List[str]] = None):
+        """Store df as the cached result for file_path loaded with columns, replacing stale entries for the same path."""
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        entry = self._entry_path(file_path, columns)
+        self._invalidate_prefix(self._path_hash(file_path), keep=entry, version=self._version_hash(file_path))
+
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            feather.write_feather(pa.Table.from_pandas(df, preserve_index=True), tmp_path, compression='uncompressed')
+            os.replace(tmp_path, entry)
+        finally:
+            self._remove(tmp_path)
+
+        self._evict()
+
+    def invalidate(self, file_path: Optional[str] = None):
+        """Force invalidation of the entries for file_path, or of the whole cache if no path is given."""
+        self._invalidate_prefix(self._path_hash(file_path) if file_path is not None else '')
+        self._content_hashes.clear()
+
+    def size(self) -> int:
+        """Total size of the cached entries in bytes."""
+        return sum(os.path.getsize(path) for path in self._entries())
+
+    def _entry_path(self, file_path: str, columns: Optional[List[str]] = None) -> str:
+        # Loads of the same file version with different column selections are cached side by side
+        selection = hashlib.blake2b(repr(columns).encode(), digest_size=4).hexdigest()
+        return os.path.join(self.cache_dir, f'{self._path_hash(file_path)}-{self._version_hash(file_path)}-{selection}{self.SUFFIX}')
+
+    def _version_hash(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        version = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if version not in self._content_hashes:
+            self._content_hashes[version] = self._content_hash(file_path)
+
+        key = hashlib.blake2b(digest_size=16)
+        key.update(f'{stat.st_size}:{stat.st_mtime_ns}:'.encode())
+        key.update(self._content_hashes[version].encode())
+        return key.hexdigest()
+
+    @staticmethod
+    def _path_hash(file_path: str) -> str:
+        return hashlib.blake2b(os.path.abspath(file_path).encode(), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _entries(self) -> list:
+        return [
+            os.path.join(self.cache_dir, name)
+            for name in os.listdir(self.cache_dir)
+            if name.endswith(self.SUFFIX)
+        ]
+
+    def _invalidate_prefix(self, prefix: str, keep: Optional[str] = None, version: Optional[str] = None):
+        """Remove entries whose name starts with prefix, except keep and other selections of the current version."""
+        for path in self._entries():
+            name = os.path.basename(path)
+            if not name.startswith(prefix) or path == keep:
+                continue
+            if version is not None and name.startswith(f'{prefix}-{version}-'):
+                continue
+            self._remove(path)
+
+    def _evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Removed concurrently by another loader
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
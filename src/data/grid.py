@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from data.matrix import PnLMatrix
+
+
+class ParameterGrid:
+    """
+    Precomputed aggregates over the parameter grid of the loaded reports: one cell per combination of
+    dimension values that has a report (e.g. stop loss x strategy type x entry time x exit time), plus the day of week.
+    Daily P/L sums and trade counts of every cell are stored as cumulative sums over the dates of each weekday,
+    so the totals of any lookback window are two row lookups per weekday. Slicing, aggregating and taking the argmax
+    over any subset of dimensions then works on the (weekday, cell) totals, whose size doesn't depend on the number of trades.
+    Weekend dates are left out, like in Optimizer.
+    """
+
+    DAY_COLUMN = 'Day of Week'
+    STATISTICS = ('sum', 'mean', 'count')
+
+    def __init__(self, data: pd.DataFrame, dimensions: List[str]):
+        self.days_of_week = PnLMatrix.DAYS_OF_WEEK
+        self.dimensions = [dim for dim in dimensions if dim in data.columns and dim != self.DAY_COLUMN]
+        data = data[data['Entry Date'].notna()]
+
+        date_codes, dates = pd.factorize(data['Entry Date'], sort=True)
+        cell_codes, cells = pd.factorize(pd.MultiIndex.from_arrays([data[dim] for dim in self.dimensions]))
+        # Values of each dimension and the code of every cell's value in them
+        self.levels: Dict[str, pd.Index] = {}
+        self.cell_codes: Dict[str, np.ndarray] = {}
+        for position, dim in enumerate(self.dimensions):
+            # A missing value is a level of its own rather than code -1, which would index the last level
+            self.cell_codes[dim], self.levels[dim] = pd.factorize(cells.get_level_values(position), sort=True, use_na_sentinel=False)
+        self.levels[self.DAY_COLUMN] = pd.Index(self.days_of_week)
+        self.num_cells = len(cells)
+
+        size = len(dates) * self.num_cells
+        flat = date_codes * self.num_cells + cell_codes
+        pl = np.bincount(flat, weights=data['P/L'].to_numpy(dtype=float), minlength=size).reshape(len(dates), self.num_cells)
+        trades = np.bincount(flat, minlength=size).reshape(len(dates), self.num_cells)
+
+        # Rows ordered by weekday, then date, so each weekday is a contiguous block in date order
+        dates = np.asarray(dates.to_numpy(), dtype='datetime64[ns]')
+        weekdays = PnLMatrix.weekday_positions(dates)
+        rows = np.flatnonzero(weekdays >= 0)
+        rows = rows[np.argsort(weekdays[rows], kind='stable')]
+        self.dates = dates[rows]
+        self.blocks = np.searchsorted(weekdays[rows], np.arange(len(self.days_of_week) + 1))
+        self.latest_date = self.dates.max() if len(self.dates) else None
+
+        # cumulative_*[i] holds the totals of the first i rows
+        self.cumulative_pl = np.concatenate([np.zeros((1, self.num_cells)), np.cumsum(pl[rows], axis=0)])
+        self.cumulative_trades = np.concatenate([np.zeros((1, self.num_cells), dtype=np.int64), np.cumsum(trades[rows], axis=0)])
+
+    def window_totals(self, x: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """P/L sums and trade counts of every (weekday, cell) over the last x days, as weekday x cell arrays."""
+        starts = self.blocks[:-1].copy()
+        stops = self.blocks[1:]
+        if x is not None and self.latest_date is not None:
+            cutoff = self.latest_date - pd.Timedelta(days=x).to_timedelta64()
+            for day_idx in range(len(self.days_of_week)):
+                starts[day_idx] += np.searchsorted(self.dates[starts[day_idx]:stops[day_idx]], cutoff, side='left')
+        return self.cumulative_pl[stops] - self.cumulative_pl[starts], self.cumulative_trades[stops] - self.cumulative_trades[starts]
+
+    def aggregate(self, by: List[str], x: Optional[int] = None, select: Optional[Dict[str, List]] = None, statistic: str = 'sum') -> pd.Series:
+        """
+        P/L over the last x days grouped by the dimensions in by ('Day of Week' included), adding up every other
+        dimension. select maps a dimension to the values to keep. statistic is the 'sum' or 'mean' of P/L per trade,
+        or the 'count' of trades. Groups without trades are left out.
+        """
+        if statistic not in self.STATISTICS:
+            raise ValueError(f"Invalid statistic '{statistic}'. Use one of {list(self.STATISTICS)}.")
+        self._check_dimensions(list(by) + list(select or {}))
+
+        pl, trades = self.window_totals(x)
+        keep = self._selected(select)
+        codes = self._group_codes(by)
+        num_groups = int(np.prod([len(self.levels[dim]) for dim in by]))
+
+        sums = np.bincount(codes[keep], weights=pl[keep], minlength=num_groups)
+        counts = np.bincount(codes[keep], weights=trades[keep], minlength=num_groups)
+        if statistic == 'sum':
+            values = sums
+        elif statistic == 'count':
+            values = counts
+        else:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = sums / counts
+
+        groups = np.flatnonzero(counts > 0)
+        index = self._group_index(by, groups)
+        return pd.Series(values[groups], index=index, name=statistic)
+
+    def argmax(self, over: List[str], by: Optional[List[str]] = None, x: Optional[int] = None, select: Optional[Dict[str, List]] = None, statistic: str = 'sum') -> pd.DataFrame:
+        """
+        For every combination of the by dimensions (default 'Day of Week'), the combination of the over dimensions
+        with the highest statistic over the last x days, adding up the dimensions in neither.
+        Returns one row per by combination with the winning values and the statistic.
+        """
+        by = [self.DAY_COLUMN] if by is None else list(by)
+        overlap = set(over) & set(by)
+        if overlap:
+            raise ValueError(f"Dimensions {sorted(overlap)} can't be both aggregated over and grouped by.")
+        totals = self.aggregate(by + list(over), x, select, statistic)
+        if statistic == 'mean':
+            totals = totals.dropna()
+        if totals.empty:
+            return pd.DataFrame(columns=by + list(over) + [statistic])
+
+        frame = totals.reset_index()
+        best = frame.groupby(by, observed=True, sort=True)[statistic].idxmax() if by else [frame[statistic].idxmax()]
+        return frame.loc[best].reset_index(drop=True)
+
+    def _check_dimensions(self, dimensions: List[str]):
+        unknown = [dim for dim in dimensions if dim not in self.levels]
+        if unknown:
+            raise ValueError(f"Unknown grid dimensions {unknown}. Use any of {list(self.levels)}.")
+
+    def _dimension_codes(self, dim: str) -> np.ndarray:
+        """Code of dim's value for every (weekday, cell) entry of the window totals."""
+        if dim == self.DAY_COLUMN:
+            return np.repeat(np.arange(len(self.days_of_week)), self.num_cells).reshape(len(self.days_of_week), self.num_cells)
+        return np.broadcast_to(self.cell_codes[dim], (len(self.days_of_week), self.num_cells))
+
+    def _selected(self, select: Optional[Dict[str, List]]) -> np.ndarray:
+        keep = np.ones((len(self.days_of_week), self.num_cells), dtype=bool)
+        for dim, values in (select or {}).items():
+            keep &= np.isin(self._dimension_codes(dim), self.levels[dim].get_indexer(list(values)))
+        return keep
+
+    def _group_codes(self, by: List[str]) -> np.ndarray:
+        codes = np.zeros((len(self.days_of_week), self.num_cells), dtype=np.int64)
+        for dim in by:
+            codes = codes * len(self.levels[dim]) + self._dimension_codes(dim)
+        return codes
+
+    def _group_index(self, by: List[str], groups: np.ndarray) -> pd.Index:
+        if not by:
+            return pd.RangeIndex(len(groups))
+        shape = tuple(len(self.levels[dim]) for dim in by)
+        positions = np.unravel_index(groups, shape)
+        return pd.MultiIndex.from_arrays([self.levels[dim][position] for dim, position in zip(by, positions)], names=by)
@@ -0,0 +1,92 @@
+import copy
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+
+class DataIndex:
+    """
+    Filter index over a loaded DataFrame, built once per load.
+    Rows are kept in Entry Date order so a lookback window is a searchsorted slice, and each value of the
+    dimension columns has a precomputed row bitmap in the same order. Filters AND/negate the bitmaps
+    only inside the window, so the cost of a query follows the size of the window rather than the table.
+    """
+
+    def __init__(self, data: pd.DataFrame, dimension_columns: Tuple[str, ...] = ('Day of Week', 'Stop Loss %', 'Strategy Type')):
+        dates = data['Entry Date'].to_numpy()
+        self.num_rows = len(data)
+        self.order = np.argsort(dates, kind='stable')
+        self.dates = dates[self.order]
+        # NaT sorts last and never falls inside a lookback window
+        self.num_dated = self.num_rows - int(np.isnat(self.dates).sum())
+
+        self.bitmaps: Dict[str, Dict[object, np.ndarray]] = {}
+        for col in dimension_columns:
+            if col not in data.columns:
+                continue
+            codes, uniques = pd.factorize(data[col].to_numpy()[self.order])
+            self.bitmaps[col] = {value: codes == code for code, value in enumerate(uniques)}
+
+    def append(self, data: pd.DataFrame) -> 'DataIndex':
+        """
+        Index over the indexed rows followed by data's rows, equal to rebuilding it over both. Only the new rows are
+        sorted and factorized; they are merged into the date order and bitmaps by copying the existing arrays.
+        """
+        dates = data['Entry Date'].to_numpy(dtype='datetime64[ns]')
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+        # Ties go after the existing rows, which come first in row order; NaT goes after every existing row
+        positions = np.where(np.isnat(dates), self.num_rows, np.searchsorted(self.dates[:self.num_dated], dates, side='right'))
+
+        index = copy.copy(self)
+        index.num_rows = self.num_rows + len(data)
+        index.order = np.insert(self.order, positions, self.num_rows + order)
+        index.dates = np.insert(self.dates, positions, dates)
+        index.num_dated = self.num_dated + int((~np.isnat(dates)).sum())
+        index.bitmaps = {}
+        for col, bitmaps in self.bitmaps.items():
+            codes, uniques = pd.factorize(data[col].to_numpy()[order])
+            new_bitmaps = {value: codes == code for code, value in enumerate(uniques)}
+            absent = np.zeros(len(data), dtype=bool)
+            index.bitmaps[col] = {
+                value: np.insert(bitmaps.get(value, np.zeros(self.num_rows, dtype=bool)), positions, new_bitmaps.get(value, absent))
+                for value in dict.fromkeys(list(bitmaps) + list(uniques))
+            }
+        return index
+
+    def rows(self, x: Optional[int] = None, filters: Optional[Dict[str, Tuple[Optional[List], bool]]] = None) -> np.ndarray:
+        """
+        Positions, in original row order, of the rows in the last x days that pass filters.
+        filters maps a dimension column to (values, include); values of None means no filter on that column.
+        """
+        start, stop = self._window(x)
+
+        mask = None
+        for col, (values, include) in (filters or {}).items():
+            if values is None:
+                continue
+            col_mask = self._match(col, values, start, stop)
+            if not include:
+                col_mask = ~col_mask
+            mask = col_mask if mask is None else mask & col_mask
+
+        positions = np.arange(start, stop) if mask is None else start + np.flatnonzero(mask)
+        # Restore the original row order so results match boolean-mask filtering
+        return np.sort(self.order[positions])
+
+    def _window(self, x: Optional[int]) -> Tuple[int, int]:
+        if x is None:
+            return 0, self.num_rows
+        if self.num_dated == 0:
+            return 0, 0
+        latest_date = self.dates[self.num_dated - 1]
+        cutoff = latest_date - pd.Timedelta(days=x).to_timedelta64()
+        return int(np.searchsorted(self.dates[:self.num_dated], cutoff, side='left')), self.num_dated
+
+    def _match(self, col: str, values: List, start: int, stop: int) -> np.ndarray:
+        mask = np.zeros(stop - start, dtype=bool)
+        bitmaps = self.bitmaps[col]
+        for value in values:
+            if value in bitmaps:
+                mask |= bitmaps[value][start:stop]
+        return mask
@@ -1,21 +1,188 @@
+import contextlib
+import io
+import os
+import numpy as np
 import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from instrumentation.core import instrumented
+from data.cache import DataCache
 
 
 class DataLoader:
+    # Explicit types for the report columns, so every chunk of a streamed file parses to the same dtypes
+    CSV_DTYPES = {
+        'Index': 'float64',
+        'Entry Date': 'object',
+        'Entry Time': 'object',
+        'Exit Date': 'object',
+        'Exit Time': 'object',
+        'Type': 'object',
+        'Strike': 'float64',
+        'B/S': 'object',
+        'Qty': 'float64',
+        'Entry Price': 'float64',
+        'Exit Price': 'float64',
+        'Vix': 'float64',
+        'P/L': 'float64',
+    }
+
+    @staticmethod
+    @instrumented
+    def load_csv(file_path: str, cache: Optional[DataCache] = None, refresh: bool = False, columns: Optional[List[str]] = None, chunksize: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """
+        Load a report CSV, reading it from the cache when one is given and refresh is not forced.
+        If columns is given only those CSV columns are parsed ('Entry Date' and 'Type' are always read).
+        If chunksize is given the file is streamed chunksize rows at a time and the per-strike rows are
+        dropped from each chunk as it is read, so memory stays close to the size of the filtered result;
+        the file is read twice, once to count the rows that are kept.
+        If end is given only the first end bytes are parsed, e.g. complete_size() taken before a file is read,
+        so rows written while it is being read are left for load_csv_tail().
+        """
+        # The cache holds whole files, so it can only serve or store a parse that reaches the end of the file
+        use_cache = cache is not None and (end is None or end == os.path.getsize(file_path))
+        if use_cache and not refresh:
+            df = cache.get(file_path, columns)
+            if df is not None:
+                return df
+
+        if chunksize is None:
+            df = DataLoader._parse_csv(file_path, columns, end)
+        else:
+            df = DataLoader._parse_csv_chunked(file_path, columns, chunksize, end)
+
+        if use_cache and (end is None or end == os.path.getsize(file_path)):
+            cache.put(file_path, df, columns)
+        return df
+
+    @staticmethod
+    def complete_size(file_path: str) -> int:
+        """Bytes of file_path up to the end of its last complete line; a line still being written is not counted."""
+        with open(file_path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            while position > 0:
+                start = max(0, position - 65536)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    return start + newline + 1
+                position = start
+        return 0
+
+    @staticmethod
+    @instrumented
+    def load_csv_tail(file_path: str, offset: int, columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, int]:
+        """
+        Parse only the rows appended to file_path after byte offset.
+        Returns the new rows and the offset to resume from; a trailing partial line is left for the next call.
+        """
+        header = pd.read_csv(file_path, nrows=0).columns.tolist()
+        usecols = DataLoader._usecols(columns)
+
+        with open(file_path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+
+        end = tail.rfind(b'\n') + 1
+        if end == 0:
+            empty = pd.DataFrame(columns=header)
+            return DataLoader._prepare(empty if usecols is None else empty[usecols]), offset
+
+        df = pd.read_csv(io.BytesIO(tail[:end]), names=header, header=None, usecols=usecols)
+        return DataLoader._prepare(df), offset + end
+
+    @staticmethod
+    def _open(file_path: str, end: Optional[int]):
+        """file_path itself for pandas to open, or a binary file object reading only its first end bytes."""
+        if end is None:
+            return contextlib.nullcontext(file_path)
+        return io.BufferedReader(_HeadReader(open(file_path, 'rb'), end))
+
+    @staticmethod
+    @instrumented
+    def _parse_csv(file_path: str, columns: Optional[List[str]] = None, end: Optional[int] = None) -> pd.DataFrame:
+        with DataLoader._open(file_path, end) as source:
+            return DataLoader._prepare(pd.read_csv(source, usecols=DataLoader._usecols(columns)))
+
+    @staticmethod
+    @instrumented
+    def _parse_csv_chunked(file_path: str, columns: Optional[List[str]], chunksize: int, end: Optional[int] = None) -> pd.DataFrame:
+        usecols = DataLoader._usecols(columns)
+        # A first pass over the Type column counts the rows that are kept, so each column is allocated once and
+        # every chunk is copied straight into its slice; keeping the chunks to concatenate would need twice the result
+        with DataLoader._open(file_path, end) as source, pd.read_csv(source, usecols=['Type'], dtype=DataLoader.CSV_DTYPES, chunksize=chunksize) as reader:
+            num_rows = sum(int(chunk['Type'].isna().sum()) for chunk in reader)
+
+        data = None
+        position = 0
+        with DataLoader._open(file_path, end) as source, pd.read_csv(source, usecols=usecols, dtype=DataLoader.CSV_DTYPES, chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk = DataLoader._prepare(chunk)
+                if data is None:
+                    data = {col: np.empty(num_rows, dtype=dtype) for col, dtype in chunk.dtypes.items()}
+                for col, values in data.items():
+                    if chunk[col].dtype != values.dtype:
+                        # Only columns without an explicit type can change type between chunks
+                        data[col] = values = values.astype(np.result_type(values.dtype, chunk[col].dtype))
+                    values[position:position + len(chunk)] = chunk[col].to_numpy()
+                position += len(chunk)
+
+        if data is None:
+            # Header only: there are no chunks, but the columns are still needed
+            with DataLoader._open(file_path, end) as source:
+                return DataLoader._prepare(pd.read_csv(source, usecols=usecols, dtype=DataLoader.CSV_DTYPES, nrows=0))
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _usecols(columns: Optional[List[str]]) -> Optional[List[str]]:
+        if columns is None:
+            return None
+        # Entry Date and Type are always needed to derive the day of week and drop the per-strike rows
+        return list(dict.fromkeys(['Entry Date', 'Type'] + list(columns)))
+
     @staticmethod
-    def load_csv(file_path: str) -> pd.DataFrame:
-        df = pd.read_csv(file_path)
-        df["Entry Date"] = pd.to_datetime(df["Entry Date"], format='%Y-%m-%d')
-        df["Day of Week"] = df["Entry Date"].dt.day_name()
+    def _prepare(df: pd.DataFrame) -> pd.DataFrame:
         # filtering on Type = Null so that we don't consider individual strike data
+        # Done first so dates are only parsed for the rows that are kept
         df = df[pd.isna(df['Type'])]
-        return df
+        entry_date = pd.to_datetime(df["Entry Date"], format='%Y-%m-%d')
+        return df.assign(**{"Entry Date": entry_date, "Day of Week": entry_date.dt.day_name()})
 
     @staticmethod
     def extract_details(file_name: str) -> tuple:
+        parameters = DataLoader.extract_parameters(file_name)
+        return parameters['Strategy Type'], parameters['Stop Loss %']
+
+    @staticmethod
+    def extract_parameters(file_name: str) -> Dict[str, str]:
+        """Backtest parameters encoded in a report name like banknifty_atm_920_320_10p.csv, keyed by their all_data column."""
         parts = file_name.split("_")
-        strategy_type = parts[1]
-        stop_loss = parts[-1].replace(".csv", "")
-        entry_time = parts[2]
-        exit_time = parts[3]
-        return strategy_type, stop_loss
+        return {
+            'Strategy Type': parts[1],
+            'Strategy Entry': parts[2],
+            'Strategy Exit': parts[3],
+            'Stop Loss %': parts[-1].replace(".csv", ""),
+        }
+
+
+class _HeadReader(io.RawIOBase):
+    """Raw reader over the first limit bytes of a binary file, which it closes when closed."""
+
+    def __init__(self, file, limit: int):
+        self._file = file
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._file.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from typing import List, Optional, Tuple
+
+
+class PnLMatrix:
+    """
+    Dense daily P/L matrix, built once per load: one row per trading date (sorted) and one column per
+    setup, a (stop loss, strategy type) pair by default. values holds the summed P/L of a setup's trades on each date and NaN
+    where the setup didn't trade; it is a contiguous float64 array, so a metric over every setup is a
+    handful of column-wise array operations.
+    """
+
+    DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+    SETUP_COLUMNS = ['Stop Loss %', 'Strategy Type']
+
+    def __init__(self, values: np.ndarray, dates: np.ndarray, setups: List[Tuple], setup_columns: Optional[List[str]] = None):
+        self.values = np.ascontiguousarray(values, dtype=float)
+        self.dates = dates
+        self.setups = setups
+        # Report columns the values of each setup tuple come from
+        self.setup_columns = setup_columns or self.SETUP_COLUMNS
+        # Row of every date and column of every setup
+        self.date_index = pd.Index(dates)
+        self.setup_index = {setup: column for column, setup in enumerate(setups)}
+        self.weekdays = PnLMatrix.weekday_positions(dates)
+
+    @staticmethod
+    def weekday_positions(dates: np.ndarray) -> np.ndarray:
+        """Position of each date's weekday in DAYS_OF_WEEK, -1 for weekend dates."""
+        return pd.DatetimeIndex(dates).day_name().map({day: idx for idx, day in enumerate(PnLMatrix.DAYS_OF_WEEK)}).fillna(-1).to_numpy(dtype=np.int64)
+
+    @staticmethod
+    def from_data(data: pd.DataFrame, setup_columns: Optional[List[str]] = None) -> 'PnLMatrix':
+        """
+        Pivot prepared report rows into the matrix; rows without an Entry Date are left out.
+        Setups are (stop loss, strategy type) unless setup_columns names others, e.g. to keep every report apart.
+        """
+        data = data[data['Entry Date'].notna()]
+        date_codes, dates = pd.factorize(data['Entry Date'], sort=True)
+        setup_columns = setup_columns or PnLMatrix.SETUP_COLUMNS
+        setup_codes, setups = pd.factorize(pd.MultiIndex.from_arrays([data[col] for col in setup_columns]))
+
+        cells = date_codes * len(setups) + setup_codes
+        size = len(dates) * len(setups)
+        values = np.bincount(cells, weights=data['P/L'].to_numpy(dtype=float), minlength=size).reshape(len(dates), len(setups))
+        traded = np.bincount(cells, minlength=size).reshape(len(dates), len(setups)) > 0
+        values[~traded] = np.nan
+
+        return PnLMatrix(values, np.asarray(dates.to_numpy(), dtype='datetime64[ns]'), [tuple(setup) for setup in setups], setup_columns)
+
+    def append(self, data: pd.DataFrame) -> 'PnLMatrix':
+        """
+        Matrix of the rows it was built from followed by data's rows, equal to from_data over both. New dates and
+        setups add rows and columns, and only data's P/L is summed, into the cells in row order like from_data.
+        """
+        data = data[data['Entry Date'].notna()]
+        dates = np.union1d(self.dates, data['Entry Date'].to_numpy(dtype='datetime64[ns]'))
+        setup_keys = pd.MultiIndex.from_arrays([data[col] for col in self.setup_columns])
+        setups = self.setups + [tuple(setup) for setup in pd.unique(setup_keys) if tuple(setup) not in self.setup_index]
+        setup_index = {setup: column for column, setup in enumerate(setups)}
+
+        values = np.full((len(dates), len(setups)), np.nan)
+        values[np.ix_(np.searchsorted(dates, self.dates), np.arange(len(self.setups)))] = self.values
+        rows = np.searchsorted(dates, data['Entry Date'].to_numpy(dtype='datetime64[ns]'))
+        columns = np.array([setup_index[tuple(setup)] for setup in setup_keys], dtype=np.int64)
+        # Cells traded for the first time start from zero
+        values[rows, columns] = np.nan_to_num(values[rows, columns])
+        np.add.at(values, (rows, columns), data['P/L'].to_numpy(dtype=float))
+
+        return PnLMatrix(values, dates, setups, self.setup_columns)
+
+    @property
+    def traded(self) -> np.ndarray:
+        return ~np.isnan(self.values)
+
+    def window(self, x: Optional[int] = None) -> 'PnLMatrix':
+        """The rows of the last x days, counted back from the latest date like DataProcessor.filter_last_x_days."""
+        if x is None or not len(self.dates):
+            return self
+        cutoff = self.dates[-1] - pd.Timedelta(days=x).to_timedelta64()
+        start = int(np.searchsorted(self.dates, cutoff, side='left'))
+        return PnLMatrix(self.values[start:], self.dates[start:], self.setups, self.setup_columns)
+
+    def active(self) -> 'PnLMatrix':
+        """Only the setups with at least one trade."""
+        columns = np.flatnonzero(self.traded.any(axis=0))
+        if len(columns) == len(self.setups):
+            return self
+        return PnLMatrix(self.values[:, columns], self.dates, [self.setups[column] for column in columns], self.setup_columns)
+
+    def column(self, setup: Tuple[str, str]) -> np.ndarray:
+        return self.values[:, self.setup_index[setup]]
+
+    def to_frame(self) -> pd.DataFrame:
+        """The matrix as a DataFrame indexed by date with one column per setup."""
+        return pd.DataFrame(self.values, index=self.date_index, columns=pd.MultiIndex.from_tuples(self.setups, names=self.setup_columns))
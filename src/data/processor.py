@@ -1,15 +1,30 @@
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from typing import List, Optional
+from instrumentation.core import instrumented
+from data.index import DataIndex
 
 
 class DataProcessor:
     @staticmethod
-    def filter_last_x_days(data: pd.DataFrame, x: int) -> pd.DataFrame:
+    @instrumented
+    def filter_last_x_days(data: pd.DataFrame, x: Optional[int], index: Optional[DataIndex] = None) -> pd.DataFrame:
+        """Rows from the last x days (all rows if x is None). index must have been built from data."""
+        if x is None:
+            return data
+        if index is not None:
+            return data.take(index.rows(x))
         latest_date = data['Entry Date'].max()
         return data[data['Entry Date'] >= (latest_date - pd.Timedelta(days=x))]
     
     @staticmethod
-    def filter_days_and_stoploss(df: pd.DataFrame, days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True) -> pd.DataFrame:
+    @instrumented
+    def filter_days_and_stoploss(df: pd.DataFrame, days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, index: Optional[DataIndex] = None) -> pd.DataFrame:
+        """Include or exclude days of the week and stop losses. index must have been built from df."""
+        if index is not None:
+            return df.take(index.rows(filters=DataProcessor._index_filters(days, stoploss, include_days, include_stoploss)))
+
         if days is not None:
             if include_days:
                 df = df[df['Day of Week'].isin(days)]
@@ -23,3 +38,75 @@ class DataProcessor:
                 df = df[~df['Stop Loss %'].isin(stoploss)]
         
         return df
+
+    @staticmethod
+    @instrumented
+    def filter_for_analysis(data: pd.DataFrame, x: Optional[int], days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None, include_days: bool = True, include_stoploss: bool = True, index: Optional[DataIndex] = None) -> pd.DataFrame:
+        """Apply the lookback window and the day/stop loss filters together, in a single index query if an index is given."""
+        if index is None:
+            return DataProcessor.filter_days_and_stoploss(DataProcessor.filter_last_x_days(data, x), days, stoploss, include_days, include_stoploss)
+        return data.take(index.rows(x, DataProcessor._index_filters(days, stoploss, include_days, include_stoploss)))
+
+    @staticmethod
+    def _index_filters(days: Optional[List[str]], stoploss: Optional[List[str]], include_days: bool, include_stoploss: bool) -> dict:
+        return {'Day of Week': (days, include_days), 'Stop Loss %': (stoploss, include_stoploss)}
+
+    @staticmethod
+    @instrumented
+    def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenate frames with identical columns into a new frame with a fresh RangeIndex.
+        Each output column is allocated once and every piece is copied straight into its slice.
+        """
+        columns = frames[0].columns
+        if any(not frame.columns.equals(columns) for frame in frames[1:]):
+            return pd.concat(frames, ignore_index=True)
+
+        lengths = [len(frame) for frame in frames]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        data = {}
+        for col in columns:
+            pieces = [frame[col] for frame in frames]
+            dtype = pieces[0].dtype
+            if all(isinstance(piece.dtype, pd.CategoricalDtype) for piece in pieces):
+                # Merge the dictionaries and remap codes instead of decoding to strings
+                data[col] = union_categoricals(pieces, sort_categories=True)
+                continue
+            if not isinstance(dtype, np.dtype) or any(piece.dtype != dtype for piece in pieces[1:]):
+                # Mixed or extension dtypes need pandas to work out the combined type
+                data[col] = pd.concat(pieces, ignore_index=True)
+                continue
+            values = np.empty(offsets[-1], dtype=dtype)
+            for piece, start, stop in zip(pieces, offsets[:-1], offsets[1:]):
+                values[start:stop] = piece.to_numpy()
+            data[col] = values
+
+        return pd.DataFrame(data, columns=columns, copy=False)
+
+    @staticmethod
+    @instrumented
+    def compact(df: pd.DataFrame, dimension_columns: List[str], drop_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Reduce the memory footprint of df: dimension columns become categoricals (with sorted categories,
+        so grouping order is unchanged), integer columns are downcast to the smallest type that holds them,
+        and drop_columns are removed. Float columns keep full precision so results are unaffected.
+        """
+        df = df.drop(columns=[col for col in drop_columns or [] if col in df.columns])
+        for col in df.columns:
+            if col in dimension_columns:
+                if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype('category')
+            elif pd.api.types.is_integer_dtype(df[col].dtype):
+                df[col] = pd.to_numeric(df[col], downcast='integer')
+        return df
+
+    @staticmethod
+    def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+        """Memory used by each column of df, including the contents of object columns."""
+        usage = df.memory_usage(deep=True, index=True)
+        report = pd.DataFrame({
+            'Dtype': [str(df.index.dtype)] + [str(dtype) for dtype in df.dtypes],
+            'Bytes': usage.to_numpy(),
+        }, index=usage.index)
+        report.loc['Total'] = ['', usage.sum()]
+        return report
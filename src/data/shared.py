@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+class SharedDataHandle:
+    """
+    Picklable description of a SharedDataset: its directory and, per column, the array dtype and length plus the
+    categories of dictionary-encoded columns. Its size doesn't depend on the number of rows.
+    """
+
+    def __init__(self, directory: str, columns: List[Tuple[str, str, int, Optional[pd.CategoricalDtype]]]):
+        self.directory = directory
+        self.columns = columns
+
+
+class SharedDataset:
+    """
+    Columns of a DataFrame in memory-mapped files that worker processes read without each getting a pickled copy.
+    Numeric and datetime columns are written as they are, categorical and string columns as dictionary codes whose
+    categories travel in the handle. The files go to /dev/shm where it exists, so they are shared memory, not disk.
+    create() writes the files once and owns them: close(), leaving a with block, garbage collection or interpreter
+    exit deletes them. attach(handle) maps them read-only in any process; its views stay valid after the files
+    are deleted, until they are released themselves.
+    """
+
+    SHM_DIR = '/dev/shm'
+    PREFIX = 'backtest-shared-'
+
+    def __init__(self, handle: SharedDataHandle):
+        self.handle = handle
+        self._finalizer = weakref.finalize(self, shutil.rmtree, handle.directory, ignore_errors=True)
+
+    @classmethod
+    def create(cls, data: pd.DataFrame, columns: Optional[List[str]] = None) -> 'SharedDataset':
+        directory = tempfile.mkdtemp(prefix=cls.PREFIX, dir=cls.SHM_DIR if os.path.isdir(cls.SHM_DIR) else None)
+        try:
+            specs = []
+            for position, col in enumerate(columns or list(data.columns)):
+                values, categories = cls._encode(data[col])
+                if len(values):
+                    mapped = np.memmap(cls._path(directory, position), dtype=values.dtype, mode='w+', shape=values.shape)
+                    mapped[:] = values
+                    mapped.flush()
+                specs.append((col, values.dtype.str, len(values), categories))
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return cls(SharedDataHandle(directory, specs))
+
+    @classmethod
+    def attach(cls, handle: SharedDataHandle) -> pd.DataFrame:
+        """Read-only DataFrame over the shared columns; nothing is copied."""
+        columns = {}
+        for position, (col, dtype, length, categories) in enumerate(handle.columns):
+            values = np.memmap(cls._path(handle.directory, position), dtype=dtype, mode='r', shape=(length,)) if length else np.empty(0, dtype=dtype)
+            columns[col] = values if categories is None else pd.Categorical.from_codes(values, dtype=categories)
+        return pd.DataFrame(columns, copy=False)
+
+    def frame(self) -> pd.DataFrame:
+        return self.attach(self.handle)
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        """Delete the files. Processes that attached keep their views."""
+        self._finalizer()
+
+    def __enter__(self) -> 'SharedDataset':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def map(self, function: Callable, tasks: Iterable[tuple], max_workers: Optional[int] = None) -> List[Any]:
+        """
+        function(data, *task) for every task on a pool of max_workers processes, results in task order.
+        Every worker attaches once when it starts, so only the handle and the tasks are pickled.
+        function must be defined at module level.
+        """
+        tasks = list(tasks)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_worker, initargs=(self.handle,)) as pool:
+            return list(pool.map(_run_in_worker, [function] * len(tasks), tasks))
+
+    @staticmethod
+    def _encode(series: pd.Series) -> Tuple[np.ndarray, Optional[pd.CategoricalDtype]]:
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series.cat.codes.to_numpy(), series.dtype
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            categorical = pd.Categorical(series)
+            return categorical.codes, categorical.dtype
+        values = series.to_numpy()
+        if values.dtype == object:
+            raise ValueError(f"Column '{series.name}' of dtype {series.dtype} can't be shared.")
+        return values, None
+
+    @staticmethod
+    def _path(directory: str, position: int) -> str:
+        # Positions rather than column names, which may contain path separators like 'P/L'
+        return os.path.join(directory, f'{position}.bin')
+
+
+# The DataFrame a pool worker attached to in its initializer
+_worker_data: Optional[pd.DataFrame] = None
+
+
+def _attach_worker(handle: SharedDataHandle):
+    global _worker_data
+    _worker_data = SharedDataset.attach(handle)
+
+
+def _run_in_worker(function: Callable, task: tuple) -> Any:
+    return function(_worker_data, *task)
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+from typing import Dict, List, Optional
+import pandas as pd
+from instrumentation.core import instrumented
+from data.loader import DataLoader
+
+
+class PartitionedStore:
+    """
+    Persistent Parquet dataset of prepared report rows, partitioned by strategy type, stop loss and entry month.
+    Rows are written in Entry Date order, so row group statistics bound the dates they hold. Reads push the
+    lookback, stop loss and day of week filters into the scan: only the matching partitions and row groups
+    are read, through memory-mapped files.
+    """
+
+    # Report column -> partition field in the directory layout (strategy=atm/stop_loss=10p/month=2023-01)
+    PARTITION_FIELDS = {'Strategy Type': 'strategy', 'Stop Loss %': 'stop_loss'}
+    MONTH_FIELD = 'month'
+    META_FILE = '_store.json'
+
+    def __init__(self, root: str, row_group_size: int = 64 * 1024):
+        self.root = root
+        self.row_group_size = row_group_size
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def version(self) -> int:
+        """Incremented by every write, so results computed from older contents can be told apart."""
+        return self._read_meta().get('version', 0)
+
+    @property
+    def latest_date(self) -> Optional[pd.Timestamp]:
+        latest_date = self._read_meta().get('latest_date')
+        return pd.Timestamp(latest_date) if latest_date else None
+
+    @instrumented
+    def ingest(self, file_paths: List[str], chunksize: Optional[int] = None):
+        """
+        Load report CSVs and write them, replacing the stored months of each (strategy type, stop loss) they contain.
+        Reports of the same (strategy type, stop loss), e.g. other entry and exit times, share partitions and are written together.
+        """
+        partitions: Dict[tuple, List[str]] = {}
+        for file_path in file_paths:
+            partitions.setdefault(DataLoader.extract_details(os.path.basename(file_path)), []).append(file_path)
+
+        for partition_files in partitions.values():
+            frames = [DataLoader.load_csv(file_path, chunksize=chunksize).assign(**DataLoader.extract_parameters(os.path.basename(file_path))) for file_path in partition_files]
+            self.write(pd.concat(frames, ignore_index=True))
+
+    @instrumented
+    def write(self, df: pd.DataFrame):
+        """Write prepared rows (including 'Strategy Type' and 'Stop Loss %'), replacing every partition they touch."""
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        if df.empty:
+            return
+        df = df.sort_values('Entry Date', kind='stable').reset_index(drop=True)
+        partition_values = {field: df[col].astype(str) for col, field in self.PARTITION_FIELDS.items()}
+        partition_values[self.MONTH_FIELD] = df['Entry Date'].dt.strftime('%Y-%m').fillna('none')
+        table = pa.Table.from_pandas(df.drop(columns=list(self.PARTITION_FIELDS)).assign(**partition_values), preserve_index=False)
+
+        ds.write_dataset(
+            table, self.root, format='parquet', partitioning=self._partitioning(),
+            existing_data_behavior='delete_matching', basename_template='part-{i}.parquet',
+            max_rows_per_group=self.row_group_size, min_rows_per_group=min(self.row_group_size, len(table)),
+        )
+        self._update_meta(self._partition_dates(df['Entry Date'], partition_values))
+
+    @instrumented
+    def append(self, df: pd.DataFrame):
+        """Add rows to the partitions they belong to, keeping the rows already stored there."""
+        if df.empty:
+            return
+        stored = self.read(stoploss=df['Stop Loss %'].astype(str).unique().tolist(), months=df['Entry Date'].dt.strftime('%Y-%m').unique().tolist())
+        stored = stored[stored['Strategy Type'].isin(df['Strategy Type'].astype(str).unique())]
+        self.write(pd.concat([stored, df[stored.columns] if not stored.empty else df], ignore_index=True))
+
+    @instrumented
+    def read(self, days: Optional[int] = None, exclude_include_days: Optional[List[str]] = None, stoploss: Optional[List[str]] = None,
+             include_days: bool = True, include_stoploss: bool = True, columns: Optional[List[str]] = None, months: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Rows of the last days days (relative to the latest stored date) that pass the day of week and stop loss
+        filters, with the same meaning as DataProcessor.filter_for_analysis. Rows come back in Entry Date order.
+        If columns is given only those stored columns are read, plus the partition columns.
+        """
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        from pyarrow.fs import LocalFileSystem
+
+        dataset = self._dataset(ds, LocalFileSystem(use_mmap=True))
+        if dataset is None:
+            return pd.DataFrame(columns=(columns or []) + list(self.PARTITION_FIELDS))
+
+        predicates = []
+        if days is not None:
+            latest_date = self.latest_date
+            if latest_date is None:
+                return self.read(columns=columns).iloc[0:0]
+            cutoff = latest_date - pd.Timedelta(days=days)
+            # The month partitions prune whole directories, the date bound prunes row groups by their statistics
+            predicates.append(ds.field(self.MONTH_FIELD) >= cutoff.strftime('%Y-%m'))
+            predicates.append(ds.field('Entry Date') >= pa.scalar(cutoff.to_datetime64(), pa.timestamp('ns')))
+        if stoploss is not None:
+            predicates.append(self._membership(ds.field(self.PARTITION_FIELDS['Stop Loss %']), [str(value) for value in stoploss], include_stoploss))
+        if exclude_include_days is not None:
+            predicates.append(self._membership(ds.field('Day of Week'), list(exclude_include_days), include_days))
+        if months is not None:
+            predicates.append(ds.field(self.MONTH_FIELD).isin(months))
+
+        fields = None
+        if columns is not None:
+            stored = set(dataset.schema.names)
+            fields = [col for col in dict.fromkeys(list(columns) + ['Entry Date']) if col in stored and col not in self.PARTITION_FIELDS]
+            fields += list(self.PARTITION_FIELDS.values())
+
+        predicate = None
+        for condition in predicates:
+            predicate = condition if predicate is None else predicate & condition
+        df = dataset.to_table(columns=fields, filter=predicate).to_pandas()
+
+        df = df.rename(columns={field: col for col, field in self.PARTITION_FIELDS.items()}).drop(columns=[self.MONTH_FIELD], errors='ignore')
+        return df.sort_values('Entry Date', kind='stable').reset_index(drop=True)
+
+    @staticmethod
+    def _membership(field, values: List, include: bool):
+        condition = field.isin(values)
+        return condition if include else ~condition
+
+    def _partitioning(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        fields = list(self.PARTITION_FIELDS.values()) + [self.MONTH_FIELD]
+        return ds.partitioning(pa.schema([(field, pa.string()) for field in fields]), flavor='hive')
+
+    def _dataset(self, ds, filesystem=None):
+        if not any(entry.is_dir() for entry in os.scandir(self.root)):
+            return None
+        return ds.dataset(self.root, format='parquet', partitioning=self._partitioning(), filesystem=filesystem)
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(os.path.join(self.root, self.META_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _partition_dates(self, dates: pd.Series, partition_values: Dict[str, pd.Series]) -> Dict[str, Optional[str]]:
+        """Latest Entry Date of every partition the rows belong to, keyed by the partition's directory."""
+        fields = list(self.PARTITION_FIELDS.values()) + [self.MONTH_FIELD]
+        keys = partition_values[fields[0]].str.cat([partition_values[field] for field in fields[1:]], sep='/')
+        latest = dates.groupby(keys.to_numpy()).max()
+        return {key: date.isoformat() if pd.notna(date) else None for key, date in latest.items()}
+
+    def _update_meta(self, partition_dates: Dict[str, Optional[str]]):
+        """
+        Record the latest stored date and bump the version; written atomically next to the data.
+        The latest date of every partition is kept in the metadata, so a write only has to look at its own rows:
+        it replaces the partitions it touches, whose entries are overwritten, and the rest stay as they were.
+        """
+        import pyarrow.dataset as ds
+
+        meta = self._read_meta()
+        if 'partition_dates' in meta or not meta:
+            stored_dates = {**meta.get('partition_dates', {}), **partition_dates}
+        else:
+            # Stores written before the metadata held partition dates are scanned once
+            fields = list(self.PARTITION_FIELDS.values()) + [self.MONTH_FIELD]
+            stored = self._dataset(ds).to_table(columns=['Entry Date'] + fields).to_pandas()
+            stored_dates = self._partition_dates(stored['Entry Date'], {field: stored[field].astype(str) for field in fields})
+        dates = [date for date in stored_dates.values() if date is not None]
+        meta = {'version': meta.get('version', 0) + 1, 'latest_date': max(dates, key=pd.Timestamp) if dates else None, 'partition_dates': stored_dates}
+
+        # The dot prefix keeps the temporary file out of dataset discovery
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.', suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.root, self.META_FILE))
@@ -0,0 +1,235 @@
+import functools
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import pandas as pd
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    seconds: float
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    peak_bytes: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _State:
+    """Process-wide instrumentation switches. Everything is off by default."""
+    enabled = False
+    trace_memory = False
+    # Whether enable() started tracemalloc, so disable() stops it again
+    started_tracemalloc = False
+    # tracemalloc's peak is process-wide and every stage resets it, so only this thread's stages record peaks
+    memory_thread: Optional[int] = None
+    sinks: List[Any] = []
+    # Number of active profile() blocks, whose profilers are sinks of their own thread only (local.sinks)
+    profiling = 0
+    profiling_lock = threading.Lock()
+    local = threading.local()
+
+
+def enable(trace_memory: bool = False):
+    """
+    Start recording stages; with trace_memory each stage also records its tracemalloc peak.
+    tracemalloc has a single process-wide peak, so only stages on the calling thread record one, and it includes
+    memory other threads allocated meanwhile.
+    """
+    _State.trace_memory = trace_memory
+    if trace_memory:
+        _State.memory_thread = threading.get_ident()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _State.started_tracemalloc = True
+    _State.enabled = True
+
+
+def disable():
+    """Stop recording stages, and stop tracemalloc if enable() started it."""
+    _State.enabled = False
+    _State.trace_memory = False
+    if _State.started_tracemalloc:
+        tracemalloc.stop()
+        _State.started_tracemalloc = False
+
+
+def is_enabled() -> bool:
+    return _State.enabled
+
+
+def add_sink(sink):
+    """Register a sink; it is called with every completed StageRecord."""
+    _State.sinks = _State.sinks + [sink]
+
+
+def remove_sink(sink):
+    _State.sinks = [registered for registered in _State.sinks if registered is not sink]
+
+
+def _thread_sinks() -> List[Any]:
+    return getattr(_State.local, 'sinks', [])
+
+
+def _recording() -> bool:
+    """Whether stages on this thread are recorded: everywhere once enabled, else inside a profile() block of this thread."""
+    return _State.enabled or (_State.profiling > 0 and bool(_thread_sinks()))
+
+
+class _NullStage:
+    """Shared no-op stage handed out while instrumentation is disabled."""
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name: str, rows_in: Optional[int]):
+        self.record = StageRecord(name, 0.0, rows_in)
+        self.rows_out = None
+
+    def __enter__(self):
+        if _State.trace_memory and threading.get_ident() == _State.memory_thread:
+            self._enter_memory_frame()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.seconds = time.perf_counter() - self._start
+        self.record.rows_out = self.rows_out
+        if _State.trace_memory:
+            self._exit_memory_frame()
+        sinks = _State.sinks if _State.enabled else []
+        for sink in sinks + _thread_sinks():
+            sink(self.record)
+        return False
+
+    def _enter_memory_frame(self):
+        frames = _memory_frames()
+        current, peak = tracemalloc.get_traced_memory()
+        if frames:
+            # Keep the enclosing stage's peak so far before resetting it for this one
+            frames[-1]['peak'] = max(frames[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+        frames.append({'start': current, 'peak': current})
+
+    def _exit_memory_frame(self):
+        frames = _memory_frames()
+        if not frames or not tracemalloc.is_tracing():
+            return
+        frame = frames.pop()
+        peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        self.record.peak_bytes = peak - frame['start']
+        if frames:
+            frames[-1]['peak'] = max(frames[-1]['peak'], peak)
+
+
+def _memory_frames() -> List[Dict[str, int]]:
+    if not hasattr(_State.local, 'frames'):
+        _State.local.frames = []
+    return _State.local.frames
+
+
+def stage(name: str, rows_in: Optional[int] = None):
+    """Context manager timing a block as stage name; set .rows_out on the returned object to record output rows."""
+    if not _recording():
+        return _NULL_STAGE
+    return _Stage(name, rows_in)
+
+
+def count_rows(obj: Any) -> Optional[int]:
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, tuple) and obj:
+        return count_rows(obj[0])
+    if hasattr(obj, 'obj') and isinstance(getattr(obj, 'obj'), (pd.DataFrame, pd.Series)):
+        # groupby objects
+        return len(obj.obj)
+    return None
+
+
+def instrumented(func: Callable) -> Callable:
+    """Record every call of func as a stage named after its qualified name."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _recording():
+            return func(*args, **kwargs)
+
+        rows_in = next((rows for rows in map(count_rows, args) if rows is not None), None)
+        with _Stage(name, rows_in) as current:
+            result = func(*args, **kwargs)
+            current.rows_out = count_rows(result)
+        return result
+
+    return wrapper
+
+
+class Profiler:
+    """Collects the stage records of a profile() block."""
+
+    def __init__(self):
+        self.records: List[StageRecord] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, record: StageRecord):
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> pd.DataFrame:
+        """Calls, wall time, rows and peak memory per stage, slowest first."""
+        if not self.records:
+            return pd.DataFrame(columns=['calls', 'total_seconds', 'mean_seconds', 'rows_in', 'rows_out', 'peak_bytes'])
+        records = pd.DataFrame([record.to_dict() for record in self.records])
+        summary = records.groupby('stage').agg(
+            calls=('seconds', 'size'),
+            total_seconds=('seconds', 'sum'),
+            mean_seconds=('seconds', 'mean'),
+            rows_in=('rows_in', 'sum'),
+            rows_out=('rows_out', 'sum'),
+            peak_bytes=('peak_bytes', 'max'),
+        )
+        return summary.sort_values('total_seconds', ascending=False)
+
+
+@contextmanager
+def profile(trace_memory: bool = False) -> Iterator[Profiler]:
+    """
+    Profile the calls made inside the block on the calling thread: with profile() as profiler: ...; profiler.summary()
+    Stages of other threads are not collected, and the sinks registered with add_sink() only receive stages once enable() is called.
+    """
+    was_tracing_memory, memory_thread = _State.trace_memory, _State.memory_thread
+    started_tracemalloc = trace_memory and not tracemalloc.is_tracing()
+
+    profiler = Profiler()
+    sinks = _thread_sinks()
+    _State.local.sinks = sinks + [profiler]
+    if trace_memory or was_tracing_memory:
+        _State.trace_memory = True
+        _State.memory_thread = threading.get_ident()
+        if started_tracemalloc:
+            tracemalloc.start()
+    with _State.profiling_lock:
+        _State.profiling += 1
+    try:
+        yield profiler
+    finally:
+        with _State.profiling_lock:
+            _State.profiling -= 1
+        _State.local.sinks = sinks
+        _State.trace_memory, _State.memory_thread = was_tracing_memory, memory_thread
+        if started_tracemalloc:
+            tracemalloc.stop()
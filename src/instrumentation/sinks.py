@@ -0,0 +1,41 @@
+import json
+import logging
+import threading
+from typing import Callable
+from instrumentation.core import StageRecord
+
+
+class LoggingSink:
+    """Log every stage at the given level."""
+
+    def __init__(self, logger: logging.Logger = logging.getLogger('backtest.instrumentation'), level: int = logging.INFO):
+        self.logger = logger
+        self.level = level
+
+    def __call__(self, record: StageRecord):
+        self.logger.log(self.level, "%s took %.6fs (rows in: %s, rows out: %s, peak bytes: %s)",
+                        record.stage, record.seconds, record.rows_in, record.rows_out, record.peak_bytes)
+
+
+class JsonFileSink:
+    """Append every stage to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record: StageRecord):
+        line = json.dumps(record.to_dict())
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+class CallbackSink:
+    """Pass every stage to an arbitrary callable."""
+
+    def __init__(self, callback: Callable[[StageRecord], None]):
+        self.callback = callback
+
+    def __call__(self, record: StageRecord):
+        self.callback(record)
@@ -1,8 +1,59 @@
 from abc import ABC, abstractmethod
+from typing import Any, List
+import numpy as np
 import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy, SeriesGroupBy
 
 class Metric(ABC):
+    # Report columns the metric reads; compact loading parses only these
+    required_columns: List[str] = ['P/L']
+    # Whether the metric has an accumulator (init/update/merge/result), and whether remove can take trades back out of it
+    streaming: bool = False
+    invertible: bool = False
+
     @abstractmethod
     def calculate(self, df: pd.DataFrame) -> float:
         pass
-    
\ No newline at end of file
+
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        """
+        Calculate the metric for every group at once, returning one value per group in group order.
+        Subclasses override this with a vectorized implementation; the default calls calculate on each group.
+        """
+        return pd.Series([self.calculate(group) for _, group in grouped], index=grouped.size().index, dtype=float)
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        """
+        Calculate the metric for every column of a dates x setups P/L matrix (NaN where a setup has no trade),
+        treating each column's trades in date order like calculate treats a DataFrame's rows.
+        Subclasses override this with a single pass over all columns; the default calls calculate on each column.
+        """
+        return np.array([self.calculate(pd.DataFrame({'P/L': column[~np.isnan(column)]})) for column in values.T], dtype=float)
+
+    @staticmethod
+    def group_like(grouped: DataFrameGroupBy, values: pd.Series) -> SeriesGroupBy:
+        """Group a Series aligned with grouped.obj (e.g. a masked P/L column) into the same groups."""
+        return values.groupby(grouped.ngroup())
+
+    def init(self) -> Any:
+        """
+        Accumulator state of no trades. States are immutable values: update appends one trade in O(1),
+        merge combines the states of two consecutive runs of trades, and result turns a state into the value
+        calculate returns for those trades. Streaming metrics override all four (and remove if invertible).
+        """
+        raise NotImplementedError(f"{type(self).__name__} has no accumulator.")
+
+    def update(self, state: Any, pl: float) -> Any:
+        """State with one more trade at the end."""
+        raise NotImplementedError(f"{type(self).__name__} has no accumulator.")
+
+    def remove(self, state: Any, pl: float) -> Any:
+        """State without its oldest trade, whose P/L is pl. Only invertible metrics support this."""
+        raise NotImplementedError(f"{type(self).__name__} can't remove trades from its accumulator.")
+
+    def merge(self, left: Any, right: Any) -> Any:
+        """State of the trades of left followed by the trades of right."""
+        raise NotImplementedError(f"{type(self).__name__} has no accumulator.")
+
+    def result(self, state: Any) -> float:
+        raise NotImplementedError(f"{type(self).__name__} has no accumulator.")
@@ -1,63 +1,251 @@
 from metrics.base import Metric
+import math
+import warnings
+from typing import Tuple
+import numpy as np
 import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy
 
 
 
 class TotalProfit(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         return df['P/L'].sum()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        return grouped['P/L'].sum()
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        return np.nansum(values, axis=0)
+
+    def init(self) -> float:
+        return 0.0
+
+    def update(self, state: float, pl: float) -> float:
+        return state + pl
+
+    def remove(self, state: float, pl: float) -> float:
+        return state - pl
+
+    def merge(self, left: float, right: float) -> float:
+        return left + right
+
+    def result(self, state: float) -> float:
+        return state
+
     def is_higher_better(self) -> bool:
         return True
     
 class AverageProfit(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         return df['P/L'].mean()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        return grouped['P/L'].mean()
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings():
+            # Setups without trades have no average, like the mean of an empty Series
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmean(values, axis=0)
+
+    # State: (trades, total P/L)
+    def init(self) -> Tuple[int, float]:
+        return 0, 0.0
+
+    def update(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return state[0] + 1, state[1] + pl
+
+    def remove(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return state[0] - 1, state[1] - pl if state[0] > 1 else 0.0
+
+    def merge(self, left: Tuple[int, float], right: Tuple[int, float]) -> Tuple[int, float]:
+        return left[0] + right[0], left[1] + right[1]
+
+    def result(self, state: Tuple[int, float]) -> float:
+        return state[1] / state[0] if state[0] else math.nan
+
     def is_higher_better(self) -> bool:
         return True
 
 class WinPercentage(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         if df.empty:
             return 0.0
         winning_trades = df[df['P/L'] > 0]
         return (len(winning_trades) / len(df)) * 100
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        # The mean of the win flags is the share of winning trades
+        return self.group_like(grouped, grouped.obj['P/L'] > 0).mean() * 100
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        trades = (~np.isnan(values)).sum(axis=0)
+        wins = (values > 0).sum(axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(trades > 0, wins / trades * 100, 0.0)
+
+    # State: (trades, winning trades)
+    def init(self) -> Tuple[int, int]:
+        return 0, 0
+
+    def update(self, state: Tuple[int, int], pl: float) -> Tuple[int, int]:
+        return state[0] + 1, state[1] + (pl > 0)
+
+    def remove(self, state: Tuple[int, int], pl: float) -> Tuple[int, int]:
+        return state[0] - 1, state[1] - (pl > 0)
+
+    def merge(self, left: Tuple[int, int], right: Tuple[int, int]) -> Tuple[int, int]:
+        return left[0] + right[0], left[1] + right[1]
+
+    def result(self, state: Tuple[int, int]) -> float:
+        return state[1] / state[0] * 100 if state[0] else 0.0
+
     def is_higher_better(self) -> bool:
         return True
 
 class AverageProfitOnWinningTrades(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         winning_trades = df[df['P/L'] > 0]
         if winning_trades.empty:
             return 0.0
         return winning_trades['P/L'].mean()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        pl = grouped.obj['P/L']
+        return self.group_like(grouped, pl.where(pl > 0)).mean().fillna(0.0)
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        wins = values > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(wins.any(axis=0), np.where(wins, values, 0).sum(axis=0) / wins.sum(axis=0), 0.0)
+
+    # State: (winning trades, their total P/L)
+    def init(self) -> Tuple[int, float]:
+        return 0, 0.0
+
+    def update(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return (state[0] + 1, state[1] + pl) if pl > 0 else state
+
+    def remove(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return (state[0] - 1, state[1] - pl if state[0] > 1 else 0.0) if pl > 0 else state
+
+    def merge(self, left: Tuple[int, float], right: Tuple[int, float]) -> Tuple[int, float]:
+        return left[0] + right[0], left[1] + right[1]
+
+    def result(self, state: Tuple[int, float]) -> float:
+        return state[1] / state[0] if state[0] else 0.0
+
     def is_higher_better(self) -> bool:
         return True
 
 class AverageLossOnLosingTrades(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         losing_trades = df[df['P/L'] < 0]
         if losing_trades.empty:
             return 0.0
         return losing_trades['P/L'].mean()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        pl = grouped.obj['P/L']
+        return self.group_like(grouped, pl.where(pl < 0)).mean().fillna(0.0)
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        losses = values < 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(losses.any(axis=0), np.where(losses, values, 0).sum(axis=0) / losses.sum(axis=0), 0.0)
+
+    # State: (losing trades, their total P/L)
+    def init(self) -> Tuple[int, float]:
+        return 0, 0.0
+
+    def update(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return (state[0] + 1, state[1] + pl) if pl < 0 else state
+
+    def remove(self, state: Tuple[int, float], pl: float) -> Tuple[int, float]:
+        return (state[0] - 1, state[1] - pl if state[0] > 1 else 0.0) if pl < 0 else state
+
+    def merge(self, left: Tuple[int, float], right: Tuple[int, float]) -> Tuple[int, float]:
+        return left[0] + right[0], left[1] + right[1]
+
+    def result(self, state: Tuple[int, float]) -> float:
+        return state[1] / state[0] if state[0] else 0.0
+
     def is_higher_better(self) -> bool:
         return False  # For losses, a higher (less negative) number is better
 
 class MaxProfitInSingleTrade(Metric):
+    streaming = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         return df['P/L'].max()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        return grouped['P/L'].max()
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmax(values, axis=0)
+
+    # State: the largest P/L so far (max keeps it when compared with a missing P/L, like Series.max skips them)
+    def init(self) -> float:
+        return -math.inf
+
+    def update(self, state: float, pl: float) -> float:
+        return max(state, pl)
+
+    def merge(self, left: float, right: float) -> float:
+        return max(left, right)
+
+    def result(self, state: float) -> float:
+        return state if state != -math.inf else math.nan
+
     def is_higher_better(self) -> bool:
         return True
     
 class MaxLossInSingleTrade(Metric):
+    streaming = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         return df['P/L'].min()
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        return grouped['P/L'].min()
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmin(values, axis=0)
+
+    # State: the smallest P/L so far
+    def init(self) -> float:
+        return math.inf
+
+    def update(self, state: float, pl: float) -> float:
+        return min(state, pl)
+
+    def merge(self, left: float, right: float) -> float:
+        return min(left, right)
+
+    def result(self, state: float) -> float:
+        return state if state != math.inf else math.nan
+
     def is_higher_better(self) -> bool:
         return False
-    
\ No newline at end of file
+    
@@ -1,23 +1,167 @@
 from metrics.base import Metric
+import math
+import warnings
+from typing import Optional, Tuple
+import numpy as np
 import pandas as pd
+from pandas.core.groupby import DataFrameGroupBy
+
+
+def _trade_returns(values: np.ndarray) -> np.ndarray:
+    """Return of each trade relative to the previous trade of its column, NaN elsewhere (pct_change of a column's trades)."""
+    traded = ~np.isnan(values)
+    positions = np.where(traded, np.arange(len(values))[:, None], -1)
+    # Row of the previous trade in the same column, -1 before the first one
+    previous = np.vstack([np.full((1, values.shape[1]), -1), np.maximum.accumulate(positions, axis=0)[:-1]])
+    previous_pl = np.take_along_axis(values, np.maximum(previous, 0), axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(traded & (previous >= 0), values / previous_pl - 1, np.nan)
+
+
+# Running moments of a sample: (count, total, sum of squared deviations from the mean). The mean is kept as
+# total / count like Series.mean, so an infinite return makes it infinite rather than undefined.
+Moments = Tuple[int, float, float]
+_NO_MOMENTS: Moments = (0, 0.0, 0.0)
+
+
+def _mean(moments: Moments) -> float:
+    return moments[1] / moments[0] if moments[0] else math.nan
+
+
+def _add_moment(moments: Moments, value: float) -> Moments:
+    """Welford's update of the moments with one more value."""
+    count, total, m2 = moments
+    delta = value - (total / count if count else 0.0)
+    count, total = count + 1, total + value
+    return count, total, m2 + delta * (value - total / count)
+
+
+def _merge_moments(left: Moments, right: Moments) -> Moments:
+    """Moments of two samples combined (Chan et al.'s parallel form of Welford's update)."""
+    if not left[0]:
+        return right
+    if not right[0]:
+        return left
+    count = left[0] + right[0]
+    delta = _mean(right) - _mean(left)
+    return count, left[1] + right[1], left[2] + right[2] + delta ** 2 * left[0] * right[0] / count
+
+
+def _std(moments: Moments) -> float:
+    """Sample standard deviation (ddof=1), NaN for fewer than two values like Series.std."""
+    count, _, m2 = moments
+    return math.sqrt(m2 / (count - 1)) if count > 1 else math.nan
+
+
+def _trade_return(previous: float, pl: float) -> float:
+    """Return of a trade relative to the previous one, like pct_change: NaN for 0/0, infinite for x/0."""
+    if previous == 0:
+        return math.copysign(math.inf, pl) * math.copysign(1, previous) if pl != 0 else math.nan
+    return pl / previous - 1
 
 
 class RewardToRiskRatio(Metric):
+    streaming = True
+    invertible = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         total_profit = df[df['P/L'] > 0]['P/L'].sum()
         total_loss = abs(df[df['P/L'] < 0]['P/L'].sum())
         return total_profit / total_loss if total_loss != 0 else float('inf')
+
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        pl = grouped.obj['P/L']
+        total_profit = self.group_like(grouped, pl.where(pl > 0)).sum()
+        total_loss = self.group_like(grouped, pl.where(pl < 0)).sum().abs()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (total_profit / total_loss).where(total_loss != 0, float('inf'))
     
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        total_profit = np.where(values > 0, values, 0).sum(axis=0)
+        total_loss = np.abs(np.where(values < 0, values, 0).sum(axis=0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total_loss != 0, total_profit / total_loss, float('inf'))
+
+    # State: (winning trades, their total P/L, losing trades, their total P/L). The counts make a side whose
+    # trades have all been removed exactly zero again instead of leaving rounding residue behind.
+    def init(self) -> Tuple[int, float, int, float]:
+        return 0, 0.0, 0, 0.0
+
+    def update(self, state: Tuple[int, float, int, float], pl: float) -> Tuple[int, float, int, float]:
+        wins, total_profit, losses, total_loss = state
+        if pl > 0:
+            return wins + 1, total_profit + pl, losses, total_loss
+        if pl < 0:
+            return wins, total_profit, losses + 1, total_loss + pl
+        return state
+
+    def remove(self, state: Tuple[int, float, int, float], pl: float) -> Tuple[int, float, int, float]:
+        wins, total_profit, losses, total_loss = state
+        if pl > 0:
+            return wins - 1, total_profit - pl if wins > 1 else 0.0, losses, total_loss
+        if pl < 0:
+            return wins, total_profit, losses - 1, total_loss - pl if losses > 1 else 0.0
+        return state
+
+    def merge(self, left: Tuple[int, float, int, float], right: Tuple[int, float, int, float]) -> Tuple[int, float, int, float]:
+        return tuple(a + b for a, b in zip(left, right))
+
+    def result(self, state: Tuple[int, float, int, float]) -> float:
+        total_loss = abs(state[3])
+        return state[1] / total_loss if total_loss != 0 else float('inf')
+
     def is_higher_better(self) -> bool:
         return True
 
 class MaxDrawdown(Metric):
+    streaming = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         cumulative = df['P/L'].cumsum()
         running_max = cumulative.cummax()
         drawdown = running_max - cumulative
         return drawdown.max()
+
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        cumulative = grouped['P/L'].cumsum()
+        running_max = self.group_like(grouped, cumulative).cummax()
+        drawdown = running_max - cumulative
+        return self.group_like(grouped, drawdown).max()
     
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        traded = ~np.isnan(values)
+        cumulative = np.nancumsum(values, axis=0)
+        # The running peak starts at the first trade, like cummax over the trades only
+        running_max = np.maximum.accumulate(np.where(traded, cumulative, -np.inf), axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmax(np.where(traded, running_max - cumulative, np.nan), axis=0)
+
+    # State: (trades, total P/L, highest and lowest cumulative P/L, max drawdown). Two runs of trades combine
+    # in O(1): the worst drawdown across them falls from the first run's peak to the second run's trough.
+    def init(self) -> Tuple[int, float, float, float, float]:
+        return 0, 0.0, -math.inf, math.inf, math.nan
+
+    def update(self, state: Tuple[int, float, float, float, float], pl: float) -> Tuple[int, float, float, float, float]:
+        return self.merge(state, (1, pl, pl, pl, 0.0))
+
+    def merge(self, left: Tuple[int, float, float, float, float], right: Tuple[int, float, float, float, float]) -> Tuple[int, float, float, float, float]:
+        if not left[0]:
+            return right
+        if not right[0]:
+            return left
+        count, total, high, low, drawdown = left
+        return (
+            count + right[0],
+            total + right[1],
+            max(high, total + right[2]),
+            min(low, total + right[3]),
+            max(drawdown, right[4], high - (total + right[3])),
+        )
+
+    def result(self, state: Tuple[int, float, float, float, float]) -> float:
+        return state[4]
+
     def is_higher_better(self) -> bool:
         return False  # For losses, a higher (less negative) number is better
     
@@ -27,6 +171,8 @@ class SharpeRatio(Metric):
     It’s calculated as the average return (or profit) minus the risk-free rate, 
     divided by the standard deviation of the returns."""
 
+    streaming = True
+
     def __init__(self, risk_free_rate: float = 0.074):
         self.risk_free_rate = risk_free_rate
 
@@ -38,6 +184,50 @@ class SharpeRatio(Metric):
         excess_returns = daily_returns - self.risk_free_rate / 252  # Convert annual rate to daily
         return excess_returns.mean() / excess_returns.std() if excess_returns.std() != 0 else float('inf')
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        # Daily returns within each group; the first row of every group is NaN and skipped like dropna()
+        daily_returns = grouped.obj['P/L'] / grouped['P/L'].shift() - 1
+
+        excess_returns = self.group_like(grouped, daily_returns - self.risk_free_rate / 252)
+        mean, std = excess_returns.mean(), excess_returns.std()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (mean / std).where(std != 0, float('inf'))
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        excess_returns = _trade_returns(values) - self.risk_free_rate / 252
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean, std = np.nanmean(excess_returns, axis=0), np.nanstd(excess_returns, axis=0, ddof=1)
+            return np.where(std != 0, mean / std, float('inf'))
+
+    # State: (first P/L, last P/L, moments of the trade returns); returns across two runs of trades
+    # only add the one from the first run's last trade to the second run's first
+    def init(self) -> Tuple[Optional[float], Optional[float], Moments]:
+        return None, None, _NO_MOMENTS
+
+    def update(self, state: Tuple[Optional[float], Optional[float], Moments], pl: float) -> Tuple[Optional[float], Optional[float], Moments]:
+        first, last, moments = state
+        if last is None:
+            return pl, pl, moments
+        daily_return = _trade_return(last, pl)
+        # Undefined returns are dropped like dropna() does
+        return first, pl, moments if math.isnan(daily_return) else _add_moment(moments, daily_return)
+
+    def merge(self, left: Tuple[Optional[float], Optional[float], Moments], right: Tuple[Optional[float], Optional[float], Moments]) -> Tuple[Optional[float], Optional[float], Moments]:
+        if left[0] is None:
+            return right
+        if right[0] is None:
+            return left
+        moments = _merge_moments(left[2], right[2])
+        daily_return = _trade_return(left[1], right[0])
+        return left[0], right[1], moments if math.isnan(daily_return) else _add_moment(moments, daily_return)
+
+    def result(self, state: Tuple[Optional[float], Optional[float], Moments]) -> float:
+        moments = state[2]
+        std = _std(moments)
+        mean = _mean(moments) - self.risk_free_rate / 252
+        return mean / std if std != 0 else float('inf')
+
     def is_higher_better(self) -> bool:
         return True
 
@@ -47,6 +237,8 @@ class SortinoRatio(Metric):
     Unlike the Sharpe Ratio, which considers all volatility as risk, the Sortino Ratio focuses specifically on downside risk.
     """
     
+    streaming = True
+
     def __init__(self, risk_free_rate: float = 0.02):
         self.risk_free_rate = risk_free_rate
 
@@ -62,6 +254,52 @@ class SortinoRatio(Metric):
 
         return excess_returns.mean() / downside_deviation if downside_deviation != 0 else float('inf')
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        daily_returns = grouped.obj['P/L'] / grouped['P/L'].shift() - 1
+
+        downside_deviation = self.group_like(grouped, daily_returns.where(daily_returns < 0)).std()
+        excess_returns = self.group_like(grouped, daily_returns - self.risk_free_rate / 252).mean()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (excess_returns / downside_deviation).where(downside_deviation != 0, float('inf'))
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        daily_returns = _trade_returns(values)
+        with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            downside_deviation = np.nanstd(np.where(daily_returns < 0, daily_returns, np.nan), axis=0, ddof=1)
+            excess_returns = np.nanmean(daily_returns - self.risk_free_rate / 252, axis=0)
+            return np.where(downside_deviation != 0, excess_returns / downside_deviation, float('inf'))
+
+    # State: (first P/L, last P/L, moments of all trade returns, moments of the negative ones), merged like SharpeRatio's
+    def init(self) -> Tuple[Optional[float], Optional[float], Moments, Moments]:
+        return None, None, _NO_MOMENTS, _NO_MOMENTS
+
+    def update(self, state: Tuple[Optional[float], Optional[float], Moments, Moments], pl: float) -> Tuple[Optional[float], Optional[float], Moments, Moments]:
+        first, last, moments, downside = state
+        if last is None:
+            return pl, pl, moments, downside
+        return (first, pl) + self._add_return(moments, downside, _trade_return(last, pl))
+
+    def merge(self, left: Tuple[Optional[float], Optional[float], Moments, Moments], right: Tuple[Optional[float], Optional[float], Moments, Moments]) -> Tuple[Optional[float], Optional[float], Moments, Moments]:
+        if left[0] is None:
+            return right
+        if right[0] is None:
+            return left
+        moments, downside = _merge_moments(left[2], right[2]), _merge_moments(left[3], right[3])
+        return (left[0], right[1]) + self._add_return(moments, downside, _trade_return(left[1], right[0]))
+
+    def result(self, state: Tuple[Optional[float], Optional[float], Moments, Moments]) -> float:
+        _, _, moments, downside = state
+        downside_deviation = _std(downside)
+        excess_returns = _mean(moments) - self.risk_free_rate / 252
+        return excess_returns / downside_deviation if downside_deviation != 0 else float('inf')
+
+    @staticmethod
+    def _add_return(moments: Moments, downside: Moments, daily_return: float) -> Tuple[Moments, Moments]:
+        if math.isnan(daily_return):
+            return moments, downside
+        return _add_moment(moments, daily_return), _add_moment(downside, daily_return) if daily_return < 0 else downside
+
     def is_higher_better(self) -> bool:
         return True
 
@@ -71,6 +309,8 @@ class CalmarRatio(Metric):
     It is designed to evaluate the return of an investment in relation to the risk of significant declines in value.
     """
     
+    streaming = True
+
     def calculate(self, df: pd.DataFrame) -> float:
         # Calculate the annualized return
         cumulative_return = (1 + df['P/L'].sum()) ** (252 / len(df)) - 1
@@ -80,5 +320,44 @@ class CalmarRatio(Metric):
 
         return cumulative_return / abs(max_drawdown) if max_drawdown != 0 else float('inf')
 
+    def calculate_grouped(self, grouped: DataFrameGroupBy) -> pd.Series:
+        total_profit = self.group_like(grouped, grouped.obj['P/L']).sum()
+        trades = self.group_like(grouped, grouped.obj['P/L']).size()
+        with np.errstate(over='ignore', invalid='ignore'):
+            cumulative_return = (1 + total_profit) ** (252 / trades) - 1
+
+        max_drawdown = MaxDrawdown().calculate_grouped(grouped)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (cumulative_return / max_drawdown.abs()).where(max_drawdown != 0, float('inf'))
+
+    def calculate_array(self, values: np.ndarray) -> np.ndarray:
+        trades = (~np.isnan(values)).sum(axis=0)
+        with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+            cumulative_return = (1 + np.nansum(values, axis=0)) ** (252 / trades) - 1
+
+        max_drawdown = MaxDrawdown().calculate_array(values)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            calmar = np.where(max_drawdown != 0, cumulative_return / np.abs(max_drawdown), float('inf'))
+        # A setup without trades has no annualized return
+        return np.where(trades > 0, calmar, np.nan)
+
+    # State: MaxDrawdown's state, which also holds the number of trades and their total P/L
+    def init(self) -> Tuple[int, float, float, float, float]:
+        return MaxDrawdown().init()
+
+    def update(self, state: Tuple[int, float, float, float, float], pl: float) -> Tuple[int, float, float, float, float]:
+        return MaxDrawdown().update(state, pl)
+
+    def merge(self, left: Tuple[int, float, float, float, float], right: Tuple[int, float, float, float, float]) -> Tuple[int, float, float, float, float]:
+        return MaxDrawdown().merge(left, right)
+
+    def result(self, state: Tuple[int, float, float, float, float]) -> float:
+        trades, total_profit, _, _, max_drawdown = state
+        if not trades:
+            return math.nan
+        with np.errstate(over='ignore', invalid='ignore'):
+            cumulative_return = (1 + np.float64(total_profit)) ** (252 / trades) - 1
+        return cumulative_return / abs(max_drawdown) if max_drawdown != 0 else float('inf')
+
     def is_higher_better(self) -> bool:
         return True
@@ -0,0 +1,27 @@
+import argparse
+from analysis.batch import BatchRunner
+from analysis.server import AnalysisService, make_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve analyses of one load of the report data to local clients over HTTP/JSON.')
+    parser.add_argument('spec', help='JSON file listing the report files (as for batch.py; queries are ignored)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--socket', default=None, help='Listen on this Unix socket instead of host and port')
+    parser.add_argument('--max-workers', type=int, default=4, help='Run up to this many queries at once')
+    args = parser.parse_args()
+
+    service = AnalysisService(BatchRunner.read_spec(args.spec), args.max_workers)
+    server = make_server(service, args.host, args.port, args.socket)
+    print(f"Serving {len(service.spec['files'])} report files on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from benchmarks.synthetic import generate_reports  # noqa: E402
+from analysis.analyzer import BacktestAnalyzer  # noqa: E402
+
+STOP_LOSSES = ['10p', '20p', '30p']
+STRATEGIES = ['atm', 'otm']
+
+
+@pytest.fixture(scope='session')
+def report_files(tmp_path_factory):
+    """One year of synthetic reports for every (strategy, stop loss) pair."""
+    return generate_reports(str(tmp_path_factory.mktemp('reports')), years=1, stop_losses=STOP_LOSSES, strategies=STRATEGIES, seed=1)
+
+
+@pytest.fixture
+def analyzer(report_files):
+    analyzer = BacktestAnalyzer(report_files)
+    analyzer.load_and_process_data()
+    return analyzer
+
+
+@pytest.fixture(scope='session')
+def later_report_files(tmp_path_factory):
+    """The same reports for the quarter after report_files, to append."""
+    return generate_reports(str(tmp_path_factory.mktemp('later_reports')), years=0.25, stop_losses=STOP_LOSSES, strategies=STRATEGIES, start_date='2021-01-01', seed=2)
+
+
+@pytest.fixture
+def later_data(later_report_files):
+    analyzer = BacktestAnalyzer(later_report_files)
+    analyzer.load_and_process_data()
+    return analyzer.all_data
@@ -0,0 +1,163 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from data.loader import DataLoader
+from metrics.profit_loss import TotalProfit
+
+GROUP_COLUMNS = ['Day of Week', 'Stop Loss %', 'Strategy Type']
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_load_matches_serial_load(analyzer, report_files, executor):
+    parallel = BacktestAnalyzer(report_files)
+    parallel.load_and_process_data(executor=executor, max_workers=2)
+
+    pd.testing.assert_frame_equal(parallel.all_data, analyzer.all_data)
+    assert parallel.total_days == analyzer.total_days
+    assert parallel.load_errors == {}
+
+
+def test_parallel_load_reports_failed_files(analyzer, report_files, tmp_path):
+    missing = str(tmp_path / 'banknifty_atm_920_320_90p.csv')
+    parallel = BacktestAnalyzer(report_files + [missing])
+    parallel.load_and_process_data(executor='thread', max_workers=2)
+
+    assert list(parallel.load_errors) == [missing]
+    pd.testing.assert_frame_equal(parallel.all_data, analyzer.all_data)
+
+
+def test_invalid_executor_is_rejected(report_files):
+    with pytest.raises(ValueError, match='Invalid executor'):
+        BacktestAnalyzer(report_files).load_and_process_data(executor='fork')
+
+
+def copy_reports(report_files, directory):
+    os.makedirs(directory, exist_ok=True)
+    return [shutil.copy(file_path, directory) for file_path in report_files]
+
+
+def append_report_rows(file_paths, later_report_files):
+    """Append the rows (without the header) of each later report to the report of the same name."""
+    later = {os.path.basename(file_path): file_path for file_path in later_report_files}
+    for file_path in file_paths:
+        with open(later[os.path.basename(file_path)], 'rb') as f:
+            rows = f.read().split(b'\n', 1)[1]
+        with open(file_path, 'ab') as f:
+            f.write(rows)
+
+
+def sorted_rows(data: pd.DataFrame) -> pd.DataFrame:
+    return data.sort_values(list(data.columns)).reset_index(drop=True)
+
+
+def test_refresh_matches_a_fresh_load_of_the_grown_files(report_files, later_report_files, tmp_path):
+    file_paths = copy_reports(report_files, tmp_path / 'reports')
+    analyzer = BacktestAnalyzer(file_paths)
+    analyzer.load_and_process_data()
+    loaded_rows = len(analyzer.all_data)
+
+    append_report_rows(file_paths, later_report_files)
+    new_rows = analyzer.refresh()
+    expected = BacktestAnalyzer(file_paths)
+    expected.load_and_process_data()
+
+    assert new_rows == len(expected.all_data) - loaded_rows
+    pd.testing.assert_frame_equal(sorted_rows(analyzer.all_data), sorted_rows(expected.all_data))
+    assert analyzer.total_days == expected.total_days
+    assert analyzer.refresh() == 0
+
+
+def test_rows_appended_during_the_load_are_read_once(report_files, later_report_files, tmp_path, monkeypatch):
+    file_paths = copy_reports(report_files, tmp_path / 'reports')
+    parse_csv = DataLoader._parse_csv
+
+    def parse_while_appending(file_path, columns=None, end=None):
+        # A writer appends to the report after its size was taken but before it is parsed
+        append_report_rows([file_path], later_report_files)
+        return parse_csv(file_path, columns, end)
+
+    monkeypatch.setattr(DataLoader, '_parse_csv', staticmethod(parse_while_appending))
+    analyzer = BacktestAnalyzer(file_paths)
+    analyzer.load_and_process_data()
+    monkeypatch.undo()
+
+    analyzer.refresh()
+    expected = BacktestAnalyzer(file_paths)
+    expected.load_and_process_data()
+
+    pd.testing.assert_frame_equal(sorted_rows(analyzer.all_data), sorted_rows(expected.all_data))
+
+
+def test_a_partly_written_line_is_left_for_refresh(report_files, tmp_path):
+    file_path, = copy_reports(report_files[:1], tmp_path / 'reports')
+    with open(file_path, 'rb') as f:
+        # Each trade is a summary row followed by its two legs, and only summary rows are kept
+        last_row = f.read().rstrip(b'\n').split(b'\n')[-3]
+    with open(file_path, 'ab') as f:
+        f.write(last_row[:10])
+
+    analyzer = BacktestAnalyzer([file_path])
+    analyzer.load_and_process_data()
+    loaded_rows = len(analyzer.all_data)
+    with open(file_path, 'ab') as f:
+        f.write(last_row[10:] + b'\n')
+
+    assert analyzer.refresh() == 1
+    assert len(analyzer.all_data) == loaded_rows + 1
+
+
+@pytest.mark.parametrize('query', [
+    lambda analyzer: analyzer.analyze(90),
+    lambda analyzer: analyzer.analyze(365, ['Monday'], ['30p'], include_days=False, metric_name='Win %'),
+    lambda analyzer: analyzer.generate_summary(180),
+    lambda analyzer: analyzer.generate_pivot_table(60),
+    lambda analyzer: analyzer.optimize(365),
+])
+def test_compact_analyses_match_full_analyses(analyzer, report_files, query):
+    compact = BacktestAnalyzer(report_files, compact=True)
+    compact.load_and_process_data()
+
+    # Dimension values come back as categories, but every label and number is the same
+    pd.testing.assert_frame_equal(query(compact), query(analyzer), check_dtype=False, check_categorical=False, check_index_type=False)
+
+
+def test_compact_mode_keeps_only_needed_columns(analyzer, report_files):
+    compact = BacktestAnalyzer(report_files, compact=True)
+    compact.load_and_process_data()
+
+    assert set(compact.all_data.columns) < set(analyzer.all_data.columns)
+    assert (compact.all_data.dtypes[BacktestAnalyzer.DIMENSION_COLUMNS] == 'category').all()
+    assert compact.memory_report().loc['Total', 'Bytes'] < analyzer.memory_report().loc['Total', 'Bytes'] / 10
+
+
+@pytest.mark.parametrize('period', ['W', 'M', 'Q', 'Y'])
+def test_rollup_matches_groupby_on_period(analyzer, period):
+    data = analyzer.all_data
+    grouped = data.groupby(GROUP_COLUMNS + [data['Entry Date'].dt.to_period(period).astype(str).rename('Period')], observed=True)
+    expected = analyzer.metrics_calculator.calculate_grouped_metrics(grouped)
+
+    result = analyzer.time_based_performance_rollup(periods=['M', period]).loc[period]
+    result = result.reorder_levels(GROUP_COLUMNS + ['Period']).sort_index()
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('days', [None, 30])
+def test_live_summary_matches_generate_summary_after_appends(analyzer, later_data, days):
+    pd.testing.assert_frame_equal(analyzer.live_summary(days), analyzer.generate_summary(days), check_exact=False, rtol=1e-7)
+
+    for rows in np.array_split(np.arange(len(later_data)), 5):
+        analyzer.append(later_data.iloc[rows])
+        pd.testing.assert_frame_equal(analyzer.live_summary(days), analyzer.generate_summary(days), check_exact=False, rtol=1e-7)
+
+
+def test_live_summary_picks_up_added_metrics(analyzer):
+    analyzer.live_summary(30)
+    analyzer.metrics_calculator.add_metric('Total Profit (copy)', TotalProfit())
+
+    summary = analyzer.live_summary(30)
+
+    pd.testing.assert_series_equal(summary['Total Profit (copy)'], summary['Total Profit'], check_names=False)
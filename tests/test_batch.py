@@ -0,0 +1,68 @@
+import json
+import pandas as pd
+import pytest
+from analysis.batch import BatchRunner
+
+QUERIES = [
+    {'type': 'analyze', 'name': 'year', 'days': 365},
+    {'type': 'summary', 'name': 'year summary', 'days': 365},
+    {'type': 'pivot', 'name': 'quarter', 'days': 90, 'stoploss': ['30p'], 'include_stoploss': False},
+    {'type': 'optimize', 'days': 180},
+    {'type': 'time_breakdown', 'days': 365, 'period': 'M'},
+    {'type': 'monte_carlo', 'days': 365, 'num_simulations': 200, 'seed': 0},
+]
+
+
+def direct_results(analyzer):
+    return {
+        'year': analyzer.analyze(365),
+        'year summary': analyzer.generate_summary(365),
+        'quarter': analyzer.generate_pivot_table(90, stoploss=['30p'], include_stoploss=False),
+        'optimize_3': analyzer.optimize(180),
+        'time_breakdown_4': analyzer.time_based_performance_breakdown(365, 'M'),
+    }
+
+
+@pytest.mark.parametrize('max_workers', [None, 3])
+def test_batch_results_match_direct_calls(analyzer, max_workers):
+    results, errors = BatchRunner(analyzer, max_workers).run(QUERIES)
+
+    assert errors == {}
+    assert list(results) == [query.get('name', f"{query['type']}_{position}") for position, query in enumerate(QUERIES)]
+    for name, expected in direct_results(analyzer).items():
+        pd.testing.assert_frame_equal(results[name], expected)
+    assert len(results['monte_carlo_5']) == 1
+
+
+def test_failed_queries_are_collected(analyzer):
+    queries = [{'type': 'analyze', 'name': 'bad', 'days': 365, 'metric_name': 'No Such Metric'}, {'type': 'analyze', 'name': 'good', 'days': 365}]
+    results, errors = BatchRunner(analyzer).run(queries)
+
+    assert list(errors) == ['bad']
+    pd.testing.assert_frame_equal(results['good'], analyzer.analyze(365))
+
+
+@pytest.mark.parametrize('query, message', [
+    ({'type': 'plot', 'days': 30}, 'Invalid query type'),
+    ({'type': 'analyze', 'lookback': 30}, 'Invalid arguments'),
+])
+def test_invalid_queries_are_rejected(analyzer, query, message):
+    with pytest.raises(ValueError, match=message):
+        BatchRunner(analyzer).run([query])
+
+
+def test_duplicate_names_are_rejected(analyzer):
+    with pytest.raises(ValueError, match='Duplicate query name'):
+        BatchRunner(analyzer).run([{'type': 'analyze', 'name': 'a', 'days': 30}, {'type': 'summary', 'name': 'a', 'days': 30}])
+
+
+def test_written_results_read_back_per_query(analyzer, report_files, tmp_path):
+    spec_path = tmp_path / 'spec.json'
+    spec_path.write_text(json.dumps({'files': report_files, 'queries': QUERIES[:3]}))
+    spec = BatchRunner.read_spec(str(spec_path))
+    results, _ = BatchRunner.from_spec(spec).run(spec['queries'])
+
+    BatchRunner.write_results(results, str(tmp_path / 'results.parquet'))
+    written = pd.read_parquet(tmp_path / 'results.parquet')
+
+    assert written.groupby('Query', sort=False).size().to_dict() == {name: len(result) for name, result in results.items()}
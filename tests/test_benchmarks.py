@@ -0,0 +1,25 @@
+import copy
+import os
+from benchmarks.suite import BASELINE_PATH, compare, read_json
+
+
+def test_committed_baseline_is_found_from_any_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    baseline = read_json(BASELINE_PATH)
+
+    assert os.path.isabs(BASELINE_PATH)
+    assert {result['size'] for result in baseline['results']} == {'small', 'medium'}
+
+
+def test_compare_flags_slower_and_larger_operations():
+    baseline = read_json(BASELINE_PATH)
+    current = copy.deepcopy(baseline)
+    slower, larger = current['results'][0], current['results'][1]
+    slower['seconds'] = max(slower['seconds'], 0.005) * 2
+    larger['peak_bytes'] *= 2
+
+    comparison = compare(current, baseline)
+
+    flagged = comparison[comparison['Regression']]
+    assert set(zip(flagged['size'], flagged['operation'])) == {(slower['size'], slower['operation']), (larger['size'], larger['operation'])}
+    assert not compare(baseline, baseline)['Regression'].any()
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from data.cache import DataCache
+from data.loader import DataLoader
+
+
+def assert_same_rows(result: pd.DataFrame, expected: pd.DataFrame):
+    # Feather reads missing strings back as None where the CSV parser gives NaN
+    pd.testing.assert_frame_equal(result.fillna(np.nan), expected.fillna(np.nan))
+
+
+def test_cached_load_matches_parse(report_files, tmp_path):
+    cache = DataCache(str(tmp_path / 'cache'))
+    parsed = DataLoader.load_csv(report_files[0])
+
+    cold = DataLoader.load_csv(report_files[0], cache)
+    warm = DataLoader.load_csv(report_files[0], cache)
+
+    assert_same_rows(cold, parsed)
+    assert_same_rows(warm, parsed)
+    assert len(os.listdir(cache.cache_dir)) == 1
+
+
+def test_cache_keeps_column_selections_apart(report_files, tmp_path):
+    cache = DataCache(str(tmp_path / 'cache'))
+    DataLoader.load_csv(report_files[0], cache)
+
+    selected = DataLoader.load_csv(report_files[0], cache, columns=['P/L'])
+
+    assert list(selected.columns) == ['Entry Date', 'Type', 'P/L', 'Day of Week']
+    assert_same_rows(DataLoader.load_csv(report_files[0], cache), DataLoader.load_csv(report_files[0]))
+
+
+def test_changed_file_is_parsed_again(report_files, tmp_path):
+    file_path = str(tmp_path / os.path.basename(report_files[0]))
+    with open(report_files[0]) as source, open(file_path, 'w') as target:
+        target.write(source.read())
+    cache = DataCache(str(tmp_path / 'cache'))
+    before = DataLoader.load_csv(file_path, cache)
+
+    with open(file_path, 'a') as f:
+        f.write('999,2021-06-01,9:20:00 AM,2021-06-01,3:20:00 PM,,,,,,,15.0,123.45\n')
+    after = DataLoader.load_csv(file_path, cache)
+
+    assert len(after) == len(before) + 1
+    assert after['P/L'].iloc[-1] == 123.45
+    # The stale entry of the old version is replaced, not kept next to the new one
+    assert len(os.listdir(cache.cache_dir)) == 1
+
+
+def test_corrupt_entry_falls_back_to_the_csv(report_files, tmp_path):
+    cache = DataCache(str(tmp_path / 'cache'))
+    DataLoader.load_csv(report_files[0], cache)
+    entry, = os.listdir(cache.cache_dir)
+    with open(os.path.join(cache.cache_dir, entry), 'wb') as f:
+        f.write(b'not feather')
+
+    assert_same_rows(DataLoader.load_csv(report_files[0], cache), DataLoader.load_csv(report_files[0]))
+
+
+def test_cache_evicts_least_recently_used_entries(report_files, tmp_path):
+    cache = DataCache(str(tmp_path / 'cache'), max_bytes=None)
+    DataLoader.load_csv(report_files[0], cache)
+    entry_size = cache.size()
+
+    cache.max_bytes = int(entry_size * 2.5)
+    for file_path in report_files[1:4]:
+        DataLoader.load_csv(file_path, cache)
+
+    assert cache.size() <= cache.max_bytes
+    assert cache.get(report_files[0]) is None
+    assert cache.get(report_files[3]) is not None
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 100, 10 ** 6])
+@pytest.mark.parametrize('columns', [None, ['P/L']])
+def test_chunked_parse_matches_whole_file_parse(report_files, chunksize, columns):
+    expected = DataLoader.load_csv(report_files[0], columns=columns)
+    result = DataLoader.load_csv(report_files[0], columns=columns, chunksize=chunksize)
+
+    pd.testing.assert_frame_equal(result, expected.reset_index(drop=True))
+
+
+def test_chunked_parse_of_header_only_file(report_files, tmp_path):
+    file_path = str(tmp_path / os.path.basename(report_files[0]))
+    with open(report_files[0]) as source, open(file_path, 'w') as target:
+        target.write(source.readline())
+
+    result = DataLoader.load_csv(file_path, chunksize=10)
+
+    assert result.empty
+    assert list(result.columns) == list(DataLoader.load_csv(report_files[0]).columns)
+
+
+@pytest.mark.parametrize('chunksize', [None, 10])
+def test_parse_up_to_end_matches_tail_split(report_files, chunksize):
+    with open(report_files[0], 'rb') as f:
+        content = f.read()
+    # Stop in the middle of a line: only the complete lines before it belong to the head
+    end = content.index(b'\n', len(content) // 2) + 1
+
+    head = DataLoader.load_csv(report_files[0], chunksize=chunksize, end=end)
+    tail, offset = DataLoader.load_csv_tail(report_files[0], end)
+
+    assert offset == len(content)
+    expected = DataLoader.load_csv(report_files[0]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(pd.concat([head, tail], ignore_index=True), expected)
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_parallel_chunked_load_matches_serial_load(analyzer, report_files, executor):
+    parallel = BacktestAnalyzer(report_files, chunksize=50)
+    parallel.load_and_process_data(executor=executor, max_workers=2)
+
+    pd.testing.assert_frame_equal(parallel.all_data, analyzer.all_data)
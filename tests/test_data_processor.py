@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data.index import DataIndex
+from data.matrix import PnLMatrix
+from data.processor import DataProcessor
+
+DIMENSION_COLUMNS = ('Day of Week', 'Stop Loss %', 'Strategy Type', 'Strategy Entry', 'Strategy Exit')
+
+
+def shuffled_parts(data: pd.DataFrame, parts: int):
+    """data in random row order, with a few undated rows, split into parts."""
+    data = data.sample(frac=1, random_state=0).reset_index(drop=True)
+    data.loc[:2, 'Entry Date'] = pd.NaT
+    return [data.iloc[rows] for rows in np.array_split(np.arange(len(data)), parts)]
+
+
+@pytest.mark.parametrize('x, days, stoploss, include_days, include_stoploss', [
+    (None, None, None, True, True),
+    (30, None, None, True, True),
+    (90, ['Monday', 'Friday'], None, True, True),
+    (180, ['Monday'], ['10p'], False, True),
+    (365, None, ['20p', '30p'], True, False),
+])
+def test_index_filter_matches_mask_filter(analyzer, x, days, stoploss, include_days, include_stoploss):
+    data = analyzer.all_data
+    index = DataIndex(data, DIMENSION_COLUMNS)
+
+    result = DataProcessor.filter_for_analysis(data, x, days, stoploss, include_days, include_stoploss, index)
+    expected = DataProcessor.filter_for_analysis(data, x, days, stoploss, include_days, include_stoploss)
+
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_appended_index_matches_rebuilt_index(analyzer, later_data):
+    data = analyzer.all_data
+    index = DataIndex(data, DIMENSION_COLUMNS)
+    for part in shuffled_parts(later_data, 4):
+        data = DataProcessor.concat_frames([data, part[data.columns]])
+        index = index.append(part)
+        expected = DataIndex(data, DIMENSION_COLUMNS)
+
+        assert (index.num_rows, index.num_dated) == (expected.num_rows, expected.num_dated)
+        np.testing.assert_array_equal(index.order, expected.order)
+        np.testing.assert_array_equal(index.dates, expected.dates)
+        assert index.bitmaps.keys() == expected.bitmaps.keys()
+        for col, bitmaps in expected.bitmaps.items():
+            assert index.bitmaps[col].keys() == bitmaps.keys()
+            for value, bitmap in bitmaps.items():
+                np.testing.assert_array_equal(index.bitmaps[col][value], bitmap)
+
+
+def test_appended_matrix_matches_rebuilt_matrix(analyzer, later_data):
+    data = analyzer.all_data
+    # Start without one setup so appending has to add its column
+    data = data[data['Stop Loss %'] != '30p']
+    matrix = PnLMatrix.from_data(data)
+    for part in shuffled_parts(later_data, 3):
+        data = pd.concat([data, part], ignore_index=True)
+        matrix = matrix.append(part)
+        expected = PnLMatrix.from_data(data)
+
+        assert matrix.setups == expected.setups
+        np.testing.assert_array_equal(matrix.dates, expected.dates)
+        np.testing.assert_array_equal(matrix.values, expected.values)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from data.grid import ParameterGrid
+
+
+def by_key(series: pd.Series) -> dict:
+    """Values keyed by their index labels as strings, so one-level MultiIndexes and categories compare to plain indexes."""
+    return {tuple(map(str, key if isinstance(key, tuple) else (key,))): value for key, value in series.items()}
+
+
+def grouped_pl(data: pd.DataFrame, by, days=None) -> pd.Series:
+    """Reference for ParameterGrid.aggregate: P/L summed with a groupby over the window's weekday rows."""
+    if days is not None:
+        data = data[data['Entry Date'] >= data['Entry Date'].max() - pd.Timedelta(days=days)]
+    data = data[data['Entry Date'].dt.dayofweek < 5]
+    return data.groupby(by, observed=True, dropna=False)['P/L'].sum()
+
+
+@pytest.mark.parametrize('by', [['Day of Week'], ['Strategy Entry'], ['Stop Loss %', 'Strategy Type'], ['Day of Week', 'Strategy Exit']])
+@pytest.mark.parametrize('days', [None, 60])
+def test_aggregate_matches_groupby(analyzer, by, days):
+    result = analyzer.parameter_grid().aggregate(by, days)
+    expected = grouped_pl(analyzer.all_data, by, days)
+
+    assert by_key(result) == pytest.approx(by_key(expected))
+
+
+def test_rows_without_a_value_form_their_own_level(analyzer):
+    data = analyzer.all_data.copy()
+    data.loc[data['Stop Loss %'] == '30p', 'Strategy Entry'] = None
+    grid = ParameterGrid(data, BacktestAnalyzer.GRID_COLUMNS)
+
+    result = grid.aggregate(['Strategy Entry'])
+    expected = grouped_pl(data, ['Strategy Entry'])
+
+    assert result.index.get_level_values(0).isna().sum() == 1
+    assert by_key(result) == pytest.approx(by_key(expected))
+    assert grid.aggregate(['Strategy Entry'], select={'Strategy Entry': [np.nan]}).sum() == pytest.approx(expected[expected.index.isna()].sum())
+
+
+def test_append_without_entry_and_exit_takes_them_from_the_report(analyzer, report_files, later_data):
+    expected = BacktestAnalyzer(report_files)
+    expected.load_and_process_data()
+    expected.append(later_data)
+
+    rows = analyzer.append(later_data.drop(columns=['Strategy Entry', 'Strategy Exit']))
+
+    assert rows == len(later_data)
+    pd.testing.assert_frame_equal(analyzer.all_data, expected.all_data)
+    pd.testing.assert_series_equal(analyzer.parameter_grid().aggregate(['Strategy Entry']), expected.parameter_grid().aggregate(['Strategy Entry']))
+
+
+def test_append_without_entry_and_exit_rejects_ambiguous_reports(report_files, later_data, tmp_path):
+    other_entry = str(tmp_path / 'banknifty_atm_930_320_10p.csv')
+    with open(report_files[0]) as source, open(other_entry, 'w') as target:
+        target.write(source.read())
+    analyzer = BacktestAnalyzer(report_files + [other_entry])
+    analyzer.load_and_process_data()
+    rows = len(analyzer.all_data)
+
+    with pytest.raises(ValueError, match="match 2 loaded reports"):
+        analyzer.append(later_data.drop(columns=['Strategy Entry', 'Strategy Exit']))
+    assert len(analyzer.all_data) == rows
@@ -0,0 +1,90 @@
+import threading
+import tracemalloc
+import pytest
+from instrumentation import core
+
+
+@core.instrumented
+def work(rows: int) -> list:
+    return list(range(rows))
+
+
+@pytest.fixture(autouse=True)
+def disabled():
+    yield
+    core.disable()
+
+
+def test_disabled_instrumentation_records_nothing():
+    records = []
+    core.add_sink(records.append)
+    try:
+        work(3)
+        with core.stage('block') as block:
+            block.rows_out = 3
+    finally:
+        core.remove_sink(records.append)
+
+    assert records == []
+    assert core.stage('block') is core._NULL_STAGE
+
+
+def test_enabled_instrumentation_records_stages_until_disabled():
+    records = []
+    core.add_sink(records.append)
+    try:
+        core.enable()
+        work(3)
+        core.disable()
+        work(3)
+    finally:
+        core.remove_sink(records.append)
+
+    assert [record.stage for record in records] == ['work']
+
+
+@pytest.mark.skipif(tracemalloc.is_tracing(), reason='tracemalloc already started outside the test')
+def test_disable_stops_tracemalloc_started_by_enable():
+    core.enable(trace_memory=True)
+    assert tracemalloc.is_tracing()
+    core.disable()
+    assert not tracemalloc.is_tracing()
+
+
+@pytest.mark.skipif(tracemalloc.is_tracing(), reason='tracemalloc already started outside the test')
+def test_profile_records_peaks_and_restores_state():
+    with core.profile(trace_memory=True) as profiler:
+        work(100000)
+
+    summary = profiler.summary()
+    assert summary.loc['work', 'calls'] == 1
+    assert summary.loc['work', 'peak_bytes'] > 0
+    assert not core.is_enabled() and not tracemalloc.is_tracing()
+    assert core.stage('block') is core._NULL_STAGE
+
+
+def test_profile_ignores_other_threads():
+    inside, done = threading.Event(), threading.Event()
+
+    @core.instrumented
+    def other_work():
+        return None
+
+    def other_thread():
+        inside.wait()
+        while not done.is_set():
+            other_work()
+
+    thread = threading.Thread(target=other_thread)
+    thread.start()
+    try:
+        with core.profile() as profiler:
+            inside.set()
+            for _ in range(50):
+                work(10)
+    finally:
+        done.set()
+        thread.join()
+
+    assert set(profiler.summary().index) == {'work'}
+    assert profiler.summary().loc['work', 'calls'] == 50
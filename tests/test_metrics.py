@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from analysis.calculator import MetricsCalculator
+
+GROUP_COLUMNS = ['Day of Week', 'Stop Loss %', 'Strategy Type']
+
+
+def per_group_metrics(calculator: MetricsCalculator, grouped) -> pd.DataFrame:
+    """Every metric of every group computed one group at a time, the reference for the vectorized paths."""
+    return pd.DataFrame({key: calculator.calculate_metrics(group) for key, group in grouped}).T.astype(float)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_grouped_metrics_match_per_group_calculate(report_files, compact):
+    analyzer = BacktestAnalyzer(report_files, compact=compact)
+    analyzer.load_and_process_data()
+    calculator = MetricsCalculator(None)
+    grouped = analyzer.all_data.groupby(GROUP_COLUMNS, observed=True)
+
+    result = calculator.calculate_grouped_metrics(grouped)
+    expected = per_group_metrics(calculator, grouped)
+    # Groups come in the same sorted order; only the index type differs for categorical keys
+    assert [tuple(map(str, key)) for key in result.index] == [tuple(map(str, key)) for key in expected.index]
+
+    expected.index = result.index
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-9)
+
+
+def test_array_metrics_match_calculate_per_column(analyzer):
+    calculator = MetricsCalculator(None)
+    matrix = analyzer.pnl_matrix
+
+    result = calculator.calculate_array_metrics(matrix.values)
+    for column in range(len(matrix.setups)):
+        trades = pd.DataFrame({'P/L': matrix.values[:, column], 'Entry Date': matrix.dates}).dropna()
+        expected = calculator.calculate_metrics(trades)
+        np.testing.assert_allclose(result.iloc[column].to_numpy(dtype=float), np.array(list(expected.values()), dtype=float), rtol=1e-9)
+
+
+@pytest.mark.parametrize('chunks', [1, 7])
+def test_accumulator_matches_grouped_metrics(analyzer, chunks):
+    calculator = MetricsCalculator(None)
+    accumulator = calculator.accumulator(GROUP_COLUMNS)
+    for rows in np.array_split(np.arange(len(analyzer.all_data)), chunks):
+        accumulator.add(analyzer.all_data.iloc[rows])
+
+    expected = calculator.calculate_grouped_metrics(analyzer.all_data.groupby(GROUP_COLUMNS, observed=True))
+
+    pd.testing.assert_frame_equal(accumulator.metrics_frame(), expected, check_exact=False, rtol=1e-7)
+
+
+def test_merged_accumulators_match_one_accumulator(analyzer):
+    calculator = MetricsCalculator(None)
+    half = len(analyzer.all_data) // 2
+    merged = calculator.accumulator(GROUP_COLUMNS)
+    merged.add(analyzer.all_data.iloc[:half])
+    other = calculator.accumulator(GROUP_COLUMNS)
+    other.add(analyzer.all_data.iloc[half:])
+    merged.merge(other)
+
+    expected = calculator.calculate_grouped_metrics(analyzer.all_data.groupby(GROUP_COLUMNS, observed=True))
+
+    pd.testing.assert_frame_equal(merged.metrics_frame(), expected, check_exact=False, rtol=1e-7)
+
+
+def test_added_metric_is_calculated(analyzer):
+    calculator = MetricsCalculator(['Total Profit'])
+    calculator.add_metric('Max Drawdown', MetricsCalculator(None).metrics['Max Drawdown'])
+
+    assert list(calculator.calculate_metrics(analyzer.all_data)) == ['Total Profit', 'Max Drawdown']
+    assert calculator.version == 1
+
+
+def test_bootstrap_is_reproducible_and_independent_of_batching(analyzer):
+    calculator = MetricsCalculator(None)
+    grouped = analyzer.all_data.groupby(GROUP_COLUMNS, observed=True)
+
+    samples = calculator.bootstrap_grouped_metrics(grouped, num_resamples=50, seed=3)
+    again = calculator.bootstrap_grouped_metrics(grouped, num_resamples=50, seed=3)
+    batched = calculator.bootstrap_grouped_metrics(grouped, num_resamples=50, seed=3, max_rows=len(analyzer.all_data) * 7)
+
+    for name, values in samples.items():
+        assert values.shape == (50, grouped.ngroups)
+        np.testing.assert_array_equal(again[name], values)
+        np.testing.assert_allclose(batched[name], values, rtol=1e-9)
+
+
+def test_bootstrap_resamples_stay_within_each_group(analyzer):
+    calculator = MetricsCalculator(['Total Profit', 'Max Profit in Single Trade', 'Max Loss in Single Trade'])
+    grouped = analyzer.all_data.groupby(GROUP_COLUMNS, observed=True)
+    samples = calculator.bootstrap_grouped_metrics(grouped, num_resamples=200, seed=0)
+    pl = grouped['P/L']
+
+    # Every resample only draws the group's own trades
+    assert (samples['Max Profit in Single Trade'] <= pl.max().to_numpy()).all()
+    assert (samples['Max Loss in Single Trade'] >= pl.min().to_numpy()).all()
+    # Total profit resamples are centred on the group's total
+    np.testing.assert_allclose(samples['Total Profit'].mean(axis=0), pl.sum().to_numpy(), atol=(5 * pl.std() * pl.size() ** 0.5 / 200 ** 0.5).max())
+
+
+def test_confidence_intervals_bracket_the_estimate(analyzer):
+    result = analyzer.analyze(365, metric_name='Total Profit', confidence_interval=0.95, num_resamples=500, seed=0)
+
+    lower, upper = result['Total Profit 95.0% CI Lower'], result['Total Profit 95.0% CI Upper']
+    assert (lower <= result['Total Profit']).all() and (result['Total Profit'] <= upper).all()
+    assert result['Prob. Beats Runner-Up'].between(0, 1).all()
+    pd.testing.assert_frame_equal(result, analyzer.analyze(365, metric_name='Total Profit', confidence_interval=0.95, num_resamples=500, seed=0))
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.montecarlosim import MonteCarloSimulator
+
+
+def test_simulation_is_reproducible_for_a_seed(analyzer):
+    first, first_stats = MonteCarloSimulator(analyzer, num_simulations=500, chunk_size=128, seed=3).run_simulation(20)
+    second, second_stats = MonteCarloSimulator(analyzer, num_simulations=500, chunk_size=128, seed=3).run_simulation(20)
+    other, _ = MonteCarloSimulator(analyzer, num_simulations=500, chunk_size=128, seed=4).run_simulation(20)
+
+    pd.testing.assert_frame_equal(first, second)
+    assert first_stats == second_stats
+    assert len(first) == 500
+    assert not first.equals(other)
+
+
+def test_threaded_simulation_matches_serial(analyzer):
+    simulator = MonteCarloSimulator(analyzer, num_simulations=1000, chunk_size=100, seed=5)
+
+    serial, _ = simulator.run_simulation(30)
+    threaded, _ = simulator.run_simulation(30, executor='thread', max_workers=4)
+
+    pd.testing.assert_frame_equal(threaded, serial)
+
+
+def test_shared_memory_simulation_matches_in_process(analyzer):
+    simulator = MonteCarloSimulator(analyzer, num_simulations=1000, chunk_size=100, seed=5)
+
+    serial, serial_stats = simulator.run_simulation(30)
+    shared, shared_stats = simulator.run_simulation(30, executor='process', max_workers=2)
+
+    pd.testing.assert_frame_equal(shared, serial)
+    assert shared_stats == serial_stats
+
+
+def test_shared_memory_grouped_simulation_matches_in_process(analyzer):
+    simulator = MonteCarloSimulator(analyzer, num_simulations=200, chunk_size=64, seed=1)
+
+    serial, serial_summary = simulator.run_grouped_simulation(10)
+    shared, shared_summary = simulator.run_grouped_simulation(10, executor='process', max_workers=2)
+
+    pd.testing.assert_frame_equal(shared, serial)
+    pd.testing.assert_frame_equal(shared_summary, serial_summary)
+
+
+def test_simulated_profit_follows_the_trade_distribution(analyzer):
+    returns = analyzer.all_data['P/L'].to_numpy()
+    results, stats = MonteCarloSimulator(analyzer, num_simulations=4000, chunk_size=1000, seed=0).run_simulation(25)
+
+    # The mean of 4000 sums of 25 draws is within a few standard errors of 25 times the trade mean
+    standard_error = returns.std() * np.sqrt(25 / 4000)
+    assert stats['Mean Total Profit'] == pytest.approx(25 * returns.mean(), abs=5 * standard_error)
+    assert (results['Max Drawdown'] >= 0).all()
+    assert (results['Final Equity'] == results['Total Profit']).all()
+
+
+def test_grouped_simulation_has_one_summary_per_group(analyzer):
+    results, summary = MonteCarloSimulator(analyzer, num_simulations=200, chunk_size=64, seed=1).run_grouped_simulation(10)
+
+    groups = analyzer.all_data.groupby(MonteCarloSimulator.GROUP_COLUMNS, observed=True).ngroups
+    assert len(summary) == groups
+    assert len(results) == 200 * groups
+    assert not summary[MonteCarloSimulator.GROUP_COLUMNS].duplicated().any()
@@ -0,0 +1,45 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.optimizer import Optimizer
+from data.processor import DataProcessor
+
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+
+
+def exhaustive_setup_profits(data: pd.DataFrame) -> np.ndarray:
+    """Total profit of every weekday setup, each day picking a (stop loss, strategy type) cell or nothing."""
+    totals = data.groupby(['Day of Week', 'Stop Loss %', 'Strategy Type'], observed=True)['P/L'].sum()
+    cells = list(itertools.product(data['Stop Loss %'].unique(), data['Strategy Type'].unique()))
+    options = [[totals.get((day,) + cell, 0.0) for cell in cells] + [0.0] for day in DAYS_OF_WEEK]
+    return np.array([sum(choice) for choice in itertools.product(*options)])
+
+
+@pytest.mark.parametrize('days', [None, 30, 120, 365])
+def test_optimal_setup_matches_exhaustive_search(analyzer, days):
+    window = DataProcessor.filter_last_x_days(analyzer.all_data, days)
+
+    result = analyzer.optimizer.find_optimal_setup(days)
+
+    assert result['total_profit'] == pytest.approx(exhaustive_setup_profits(window).max())
+    chosen = [(day, cell) for day, cell in result['setup'].items() if cell != Optimizer.EXCLUDE]
+    profit = sum(window.loc[(window['Day of Week'] == day) & (window['Stop Loss %'] == cell[0]) & (window['Strategy Type'] == cell[1]), 'P/L'].sum() for day, cell in chosen)
+    assert profit == pytest.approx(result['total_profit'])
+
+
+@pytest.mark.parametrize('days', [None, 60])
+def test_top_setups_match_exhaustive_ranking(analyzer, days):
+    window = DataProcessor.filter_last_x_days(analyzer.all_data, days)
+    expected = np.sort(exhaustive_setup_profits(window))[::-1][:20]
+
+    result = analyzer.optimizer.find_top_setups(days, 20)
+
+    np.testing.assert_allclose([setup['total_profit'] for setup in result], expected)
+
+
+def test_optimal_setup_of_empty_window_excludes_every_day(analyzer):
+    result = Optimizer(analyzer.all_data.iloc[0:0]).find_optimal_setup()
+
+    assert result['total_profit'] == 0
+    assert result['setup'] == {day: Optimizer.EXCLUDE for day in reversed(DAYS_OF_WEEK)}
@@ -0,0 +1,76 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.pareto import ParetoOptimizer
+from data.matrix import PnLMatrix
+
+
+def setups_of(front: pd.DataFrame) -> set:
+    """Every setup of a find_front result as its (stop loss, strategy type) per weekday."""
+    return {tuple(zip(rows['Optimal Stop Loss'], rows['Optimal Strategy Type'])) for _, rows in front.groupby('Setup')}
+
+
+@pytest.fixture
+def small_grid(analyzer) -> PnLMatrix:
+    """One strategy's stop losses: 4 options a weekday, few enough setups to enumerate."""
+    return PnLMatrix.from_data(analyzer.all_data[analyzer.all_data['Strategy Type'] == 'atm'])
+
+
+def exhaustive_front(optimizer: ParetoOptimizer, days: int, objectives) -> set:
+    """Pareto front of every possible setup, enumerated."""
+    matrix = optimizer.matrix.window(days).active()
+    options = matrix.setups + [ParetoOptimizer.EXCLUDE]
+    choices = np.array(list(itertools.product(range(len(options)), repeat=len(PnLMatrix.DAYS_OF_WEEK))))
+    values = optimizer._evaluate_blocks(matrix.values, matrix.weekdays, choices, objectives, len(choices))
+    scores = optimizer._oriented(values, objectives)
+    # A setup is on the front when no other setup is at least as good on every objective and better on one
+    front = [
+        row for row in range(len(choices))
+        if not ((scores >= scores[row]).all(axis=1) & (scores > scores[row]).any(axis=1)).any()
+    ]
+    return {tuple(options[option] for option in choices[row]) for row in front}
+
+
+@pytest.mark.parametrize('objectives', [['Total Profit', 'Max Drawdown'], ['Total Profit', 'Sharpe Ratio']])
+def test_unpruned_beam_finds_the_exhaustive_front(small_grid, objectives):
+    optimizer = ParetoOptimizer(small_grid)
+    cells = len(small_grid.setups) + 1
+    # A beam as wide as every partial setup of four weekdays never prunes
+    front = optimizer.find_front(180, objectives, beam_width=cells ** 4)
+
+    assert setups_of(front) == exhaustive_front(optimizer, 180, objectives)
+
+
+def test_narrow_beam_returns_a_non_dominated_front(analyzer):
+    front = ParetoOptimizer(analyzer.pnl_matrix).find_front(180, beam_width=5)
+    values = front.groupby('Setup')[['Total Profit', 'Max Drawdown']].first().to_numpy()
+    scores = np.column_stack([values[:, 0], -values[:, 1]])
+
+    for score in scores:
+        assert not ((scores >= score).all(axis=1) & (scores > score).any(axis=1)).any()
+
+
+def test_constraints_bound_every_setup(analyzer):
+    front = ParetoOptimizer(analyzer.pnl_matrix).find_front(365, constraints={'Max Drawdown': 3000})
+
+    assert (front['Max Drawdown'] <= 3000).all()
+
+
+def test_polish_handles_thousands_of_cells():
+    # Far more cells than fit in an int64 code per setup; only one cell trades profitably on each weekday
+    dates = pd.bdate_range('2021-01-04', periods=10).to_numpy()
+    num_cells = 7000
+    pl = -1 - np.random.default_rng(0).random((len(dates), num_cells))
+    best = [11, 2222, 3333, 4444, 6999]
+    for row, weekday in enumerate(PnLMatrix.weekday_positions(dates)):
+        pl[row, best[weekday]] = 100.0
+    optimizer = ParetoOptimizer(PnLMatrix(pl, dates, [(f'{cell}p', 'atm') for cell in range(num_cells)]))
+    weekdays = optimizer.matrix.weekdays
+
+    choices = np.full((1, 5), num_cells)
+    choices, values = optimizer._admissible(pl, weekdays, choices, {}, block=10 ** 6)
+    choices, values = optimizer._polish(pl, weekdays, choices, values, ['Total Profit'], {}, 10 ** 6, max_rounds=10)
+
+    assert choices.tolist() == [best]
+    assert values['Total Profit'].tolist() == [1000.0]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.plotting import Plotter
+
+
+def period_totals(num_periods: int, num_setups: int, freq: str = 'M', seed: int = 0) -> pd.DataFrame:
+    """Total profit per (period, strategy type, stop loss), the shape of time_based_performance_breakdown."""
+    rng = np.random.default_rng(seed)
+    periods = pd.period_range('2015-01-01', periods=num_periods, freq=freq)
+    setups = [(f'strategy{setup % 3}', f'{10 * (setup // 3 + 1)}p') for setup in range(num_setups)]
+    return pd.DataFrame([
+        {'Period': period, 'Strategy Type': strategy_type, 'Stop Loss %': stop_loss, 'Total Profit': rng.normal(scale=setup + 1)}
+        for period in periods for setup, (strategy_type, stop_loss) in enumerate(setups)
+    ])
+
+
+@pytest.mark.parametrize('num_values, max_points', [(10, 20), (1000, 3), (1000, 50), (10_000, 301)])
+def test_minmax_indices_keep_the_ends_and_extremes(num_values, max_points):
+    values = np.random.default_rng(num_values).normal(size=num_values).cumsum()
+
+    keep = Plotter.minmax_indices(values, max_points)
+
+    assert len(keep) <= max_points and (np.diff(keep) > 0).all()
+    assert keep[0] == 0 and keep[-1] == num_values - 1
+    if max_points >= 4:
+        assert values.argmin() in keep and values.argmax() in keep
+
+
+def test_monthly_totals_keep_every_period():
+    traces = Plotter.performance_traces(period_totals(120, 12), max_points=20_000)
+
+    assert len(traces) == 12
+    assert all(len(periods) == 120 for _, periods, _ in traces)
+
+
+def test_setups_past_the_largest_are_summed_into_other():
+    df = period_totals(24, 60)
+
+    traces = Plotter.performance_traces(df, max_points=20_000, max_traces=10)
+
+    totals = df.groupby(['Strategy Type', 'Stop Loss %'])['Total Profit'].sum()
+    largest = totals.abs().sort_values(ascending=False).index[:9]
+    assert [name for name, _, _ in traces] == [f'{strategy_type} - {stop_loss}' for strategy_type, stop_loss in sorted(largest)] + ['Other']
+    # Nothing is dropped: the traces add up to every setup's profit
+    assert sum(total_profit.sum() for _, _, total_profit in traces) == pytest.approx(df['Total Profit'].sum())
+
+
+def test_dense_daily_series_are_thinned_within_max_points():
+    df = period_totals(3000, 30, freq='D')
+
+    traces = Plotter.performance_traces(df, max_points=2000)
+
+    assert len(traces) == Plotter.MAX_TRACES
+    assert sum(len(periods) for _, periods, _ in traces) <= 2000
+    # Each series is cut to its share of the points, but keeps its largest value
+    pivot = df.pivot_table(values='Total Profit', index='Period', columns=['Strategy Type', 'Stop Loss %'])
+    for name, _, total_profit in traces[:-1]:
+        assert total_profit.max() == pivot[tuple(name.split(' - '))].max()
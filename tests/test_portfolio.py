@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from analysis.portfolio import PortfolioOptimizer
+from data.matrix import PnLMatrix
+
+
+@pytest.mark.parametrize('objective', list(PortfolioOptimizer.OBJECTIVES))
+@pytest.mark.parametrize('k', [1, 2, 3])
+def test_portfolio_beam_matches_exhaustive_search(analyzer, objective, k):
+    optimizer = PortfolioOptimizer(PnLMatrix.from_data(analyzer.all_data, BacktestAnalyzer.GRID_COLUMNS))
+
+    exhaustive = optimizer.find_portfolios(k, objective, top=5)
+    # No candidate budget forces the beam; it is wide enough to keep every partial portfolio of 6 reports
+    beam = optimizer.find_portfolios(k, objective, top=5, beam_width=100, max_candidates=0)
+
+    if objective != 'Average Correlation' or k > 1:
+        assert len(exhaustive) == 5 * k
+    pd.testing.assert_frame_equal(beam, exhaustive, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize('columns', [[], ['Strategy Entry', 'Strategy Exit']])
+def test_appended_rows_stay_in_their_report(analyzer, report_files, later_data, columns):
+    analyzer.append(later_data.drop(columns=columns))
+
+    portfolios = analyzer.optimize_portfolio(2, top=20)
+    members = portfolios[BacktestAnalyzer.GRID_COLUMNS].astype(str).apply(tuple, axis=1)
+
+    assert analyzer.report_correlations().shape == (len(report_files), len(report_files))
+    assert not members.groupby(portfolios['Rank']).apply(lambda reports: reports.duplicated().any()).any()
+
+
+def test_reports_with_missing_parameters_are_not_split(analyzer, later_data):
+    # Rows written without their entry and exit time, e.g. by an older exporter
+    analyzer.all_data = pd.concat([analyzer.all_data, later_data.assign(**{'Strategy Entry': None, 'Strategy Exit': None})], ignore_index=True)
+
+    assert analyzer.report_correlations().shape == (6, 6)
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from analysis.result_cache import ResultCache
+from metrics.profit_loss import TotalProfit
+
+
+@pytest.fixture
+def cached_analyzer(report_files):
+    analyzer = BacktestAnalyzer(report_files, result_cache=ResultCache())
+    analyzer.load_and_process_data()
+    return analyzer
+
+
+def test_result_cache_keys():
+    # Filters are membership tests, dimensions shape the result
+    assert ResultCache.make_key('analyze', 0, {'stoploss': ['20p', '10p', '10p']}) == ResultCache.make_key('analyze', 0, {'stoploss': ['10p', '20p']})
+    assert ResultCache.make_key('analyze', 0, {'dimensions': ['Strategy Entry', 'Strategy Exit']}) != ResultCache.make_key('analyze', 0, {'dimensions': ['Strategy Exit', 'Strategy Entry']})
+
+
+@pytest.mark.parametrize('stoploss', [np.array(['20p', '10p']), pd.Index(['20p', '10p']), pd.Series(['20p', '10p'])])
+def test_array_filters_key_like_lists(cached_analyzer, stoploss):
+    key = ResultCache.make_key('analyze', 0, {'stoploss': stoploss})
+    assert key == ResultCache.make_key('analyze', 0, {'stoploss': ['10p', '20p']})
+
+    expected = cached_analyzer.analyze(90, stoploss=['10p', '20p'])
+    pd.testing.assert_frame_equal(cached_analyzer.analyze(90, stoploss=stoploss), expected)
+    assert cached_analyzer.result_cache.stats()['hits'] == 1
+
+
+def test_cached_results_follow_data_and_metrics(analyzer, cached_analyzer, later_data):
+    first = cached_analyzer.generate_summary(30)
+    pd.testing.assert_frame_equal(cached_analyzer.generate_summary(30), first)
+    assert cached_analyzer.result_cache.stats()['hits'] == 1
+
+    cached_analyzer.metrics_calculator.add_metric('Total Profit (copy)', TotalProfit())
+    assert 'Total Profit (copy)' in cached_analyzer.generate_summary(30)
+
+    cached_analyzer.append(later_data)
+    analyzer.append(later_data)
+    pd.testing.assert_frame_equal(cached_analyzer.generate_summary(30).drop(columns=['Total Profit (copy)']), analyzer.generate_summary(30))
+    assert cached_analyzer.result_cache.stats()['hits'] == 1
+
+
+def test_analyzers_sharing_a_result_cache_get_their_own_results(report_files):
+    cache = ResultCache()
+    analyzers = [BacktestAnalyzer(files, result_cache=cache) for files in (report_files, report_files[:2])]
+    for analyzer in analyzers:
+        analyzer.load_and_process_data()
+    assert analyzers[0].data_version == analyzers[1].data_version
+
+    summaries = [analyzer.generate_summary(60) for analyzer in analyzers]
+
+    assert len(summaries[0]) > len(summaries[1])
+    assert cache.stats()['hits'] == 0
+
+
+def test_reloading_one_analyzer_keeps_the_entries_of_another(report_files):
+    cache = ResultCache()
+    first, second = BacktestAnalyzer(report_files, result_cache=cache), BacktestAnalyzer(report_files[:2], result_cache=cache)
+    first.load_and_process_data()
+    second.load_and_process_data()
+    first.generate_summary(60)
+
+    second.load_and_process_data()
+    first.generate_summary(60)
+
+    assert cache.stats()['hits'] == 1
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = ResultCache(max_entries=2)
+    frames = {key: pd.DataFrame({'P/L': [float(key)]}) for key in range(3)}
+    cache.put(0, frames[0])
+    cache.put(1, frames[1])
+    cache.get(0)
+    cache.put(2, frames[2])
+
+    assert cache.get(1) is None
+    pd.testing.assert_frame_equal(cache.get(0), frames[0])
+    assert cache.stats()['evictions'] == 1
@@ -0,0 +1,99 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytest
+from analysis.server import AnalysisService, make_server
+
+
+def test_service_coalesces_identical_queries(report_files):
+    service = AnalysisService({'files': report_files}, max_workers=2)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    run_query = service.runner.run_query
+
+    def blocked_run_query(query):
+        calls.append(query)
+        started.set()
+        release.wait(10)
+        return run_query(query)
+
+    service.runner.run_query = blocked_run_query
+    query = {'type': 'summary', 'days': 30}
+    results = []
+    clients = [threading.Thread(target=lambda: results.append(service.query(query))) for _ in range(2)]
+    try:
+        clients[0].start()
+        assert started.wait(10)
+        clients[1].start()
+        for _ in range(1000):
+            if service.status()['coalesced']:
+                break
+            threading.Event().wait(0.01)
+        release.set()
+        for client in clients:
+            client.join(10)
+    finally:
+        release.set()
+        service.shutdown()
+
+    assert len(calls) == 1
+    assert service.status()['coalesced'] == 1
+    assert service.status()['in_flight'] == 0
+    pd.testing.assert_frame_equal(results[0], results[1])
+
+
+def test_service_answers_from_reloaded_data(report_files):
+    service = AnalysisService({'files': report_files}, max_workers=2)
+    try:
+        query = {'type': 'summary', 'days': 30}
+        before = service.query(query)
+        service.query(query)
+        assert service.status()['cache']['hits'] == 1
+
+        assert service.reload(report_files[:2]) == 1
+        after = service.query(query)
+    finally:
+        service.shutdown()
+
+    assert set(before['Stop Loss %']) == {'10p', '20p', '30p'}
+    assert set(after['Stop Loss %']) == {'10p', '20p'} and set(after['Strategy Type']) == {'atm'}
+    assert service.status()['files'] == report_files[:2]
+
+
+@pytest.fixture
+def http_service(report_files):
+    service = AnalysisService({'files': report_files}, max_workers=2)
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    service.shutdown()
+
+
+def post(url: str, body) -> dict:
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method='POST')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def test_http_query_returns_the_service_result(http_service, analyzer):
+    service, url = http_service
+    rows = post(url + '/query', {'type': 'analyze', 'days': 365})['result']
+
+    expected = analyzer.analyze(365)
+    assert [row['Stop Loss %'] for row in rows] == expected['Stop Loss %'].tolist()
+    assert [row['Total Profit'] for row in rows] == pytest.approx(expected['Total Profit'].tolist())
+    with urllib.request.urlopen(url + '/status', timeout=10) as response:
+        assert json.loads(response.read())['rows'] == len(analyzer.all_data)
+
+
+@pytest.mark.parametrize('body', [{'type': 'plot'}, {'type': 'analyze', 'lookback': 30}, ['analyze']])
+def test_http_invalid_queries_get_400(http_service, body):
+    _, url = http_service
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post(url + '/query', body)
+    assert error.value.code == 400
@@ -0,0 +1,37 @@
+import os
+import numpy as np
+import pandas as pd
+from data.shared import SharedDataset
+
+
+def profit_of_rows(data: pd.DataFrame, start: int, stop: int) -> float:
+    return float(data['P/L'].iloc[start:stop].sum())
+
+
+def test_shared_frame_matches_all_data(analyzer):
+    shared = analyzer.shared_data()
+    frame = shared.frame()
+
+    # String dimensions come back as categoricals with the same values
+    expected = analyzer.all_data[frame.columns].astype({col: 'category' for col in analyzer.DIMENSION_COLUMNS if col in frame.columns})
+    pd.testing.assert_frame_equal(frame, expected.reset_index(drop=True), check_categorical=False)
+    assert analyzer.shared_data() is shared
+
+
+def test_process_map_reads_the_shared_rows(analyzer):
+    bounds = np.linspace(0, len(analyzer.all_data), 5, dtype=int)
+    tasks = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    result = analyzer.process_map(profit_of_rows, tasks, max_workers=2)
+
+    np.testing.assert_allclose(result, [analyzer.all_data['P/L'].iloc[start:stop].sum() for start, stop in tasks])
+
+
+def test_closing_deletes_the_files(analyzer):
+    shared = SharedDataset.create(analyzer.all_data[['P/L', 'Stop Loss %']])
+    frame = shared.frame()
+    shared.close()
+
+    assert shared.closed and not os.path.exists(shared.handle.directory)
+    # Views taken before closing stay readable
+    assert frame['P/L'].sum() == analyzer.all_data['P/L'].sum()
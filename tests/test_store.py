@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from analysis.analyzer import BacktestAnalyzer
+from data.processor import DataProcessor
+from data.store import PartitionedStore
+
+COMPARED_COLUMNS = ['Entry Date', 'Day of Week', 'Stop Loss %', 'Strategy Type', 'P/L']
+
+
+@pytest.fixture
+def store(report_files, tmp_path):
+    store = PartitionedStore(str(tmp_path / 'store'), row_group_size=100)
+    store.ingest(report_files)
+    return store
+
+
+def same_rows(result: pd.DataFrame, expected: pd.DataFrame):
+    """Rows compared as sets: the store returns them in Entry Date order, with partition columns as strings."""
+    def normalized(data):
+        data = data[COMPARED_COLUMNS].astype({'Day of Week': str, 'Stop Loss %': str, 'Strategy Type': str})
+        return data.sort_values(COMPARED_COLUMNS).reset_index(drop=True)
+    pd.testing.assert_frame_equal(normalized(result), normalized(expected))
+
+
+@pytest.mark.parametrize('days, exclude_include_days, stoploss, include_days, include_stoploss', [
+    (None, None, None, True, True),
+    (30, None, None, True, True),
+    (90, ['Monday', 'Friday'], None, True, True),
+    (180, ['Monday'], ['10p'], False, True),
+    (365, None, ['20p', '30p'], True, False),
+])
+def test_store_pushdown_matches_in_memory_filter(analyzer, store, days, exclude_include_days, stoploss, include_days, include_stoploss):
+    result = store.read(days, exclude_include_days, stoploss, include_days, include_stoploss)
+    expected = DataProcessor.filter_for_analysis(analyzer.all_data, days, exclude_include_days, stoploss, include_days, include_stoploss)
+
+    same_rows(result, expected)
+    assert result['Entry Date'].is_monotonic_increasing
+
+
+@pytest.mark.parametrize('query', [
+    lambda analyzer: analyzer.analyze(90),
+    lambda analyzer: analyzer.analyze(365, ['Monday'], ['30p'], include_days=False),
+    lambda analyzer: analyzer.generate_summary(180),
+    lambda analyzer: analyzer.generate_pivot_table(60),
+    lambda analyzer: analyzer.optimize(365),
+])
+def test_analyses_on_the_store_match_loaded_data(analyzer, store, query):
+    on_store = BacktestAnalyzer([], store=store)
+
+    pd.testing.assert_frame_equal(query(on_store), query(analyzer), check_dtype=False, check_categorical=False, check_index_type=False)
+
+
+def test_append_keeps_stored_rows_and_moves_latest_date(analyzer, store, later_data):
+    version = store.version
+    store.append(later_data)
+
+    same_rows(store.read(), pd.concat([analyzer.all_data, later_data], ignore_index=True))
+    assert store.latest_date == later_data['Entry Date'].max()
+    assert store.version == version + 1
+
+
+def test_latest_date_follows_rewritten_partitions(analyzer, store):
+    latest = analyzer.all_data['Entry Date'].max()
+    assert store.latest_date == latest
+
+    # Rewriting the last month of every setup without its final day moves the latest date back
+    last_month = analyzer.all_data[analyzer.all_data['Entry Date'].dt.to_period('M') == latest.to_period('M')]
+    store.write(last_month[last_month['Entry Date'] < latest])
+
+    assert store.latest_date == last_month.loc[last_month['Entry Date'] < latest, 'Entry Date'].max()
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+
+def brute_force_window(data: pd.DataFrame, start, end, day: str) -> pd.Series:
+    """Total P/L per (stop loss, strategy type) of one weekday over entry dates [start, end]."""
+    window = data[(data['Entry Date'] >= start) & (data['Entry Date'] <= end) & (data['Day of Week'] == day)]
+    return window.groupby(['Stop Loss %', 'Strategy Type'], observed=True)['P/L'].sum()
+
+
+def expected_choice(totals: pd.Series):
+    """Best profit and cell, like Optimizer.find_optimal_setup: 'Exclude' when even the best cell lost money."""
+    if totals.empty or totals.max() < 0:
+        return 0.0, ('Exclude', 'Exclude')
+    return totals.max(), totals.idxmax()
+
+
+@pytest.mark.parametrize('lookbacks', [[30], [7, 90, 365]])
+def test_lookback_sweep_matches_brute_force(analyzer, lookbacks):
+    data = analyzer.all_data
+    latest = data['Entry Date'].max()
+    result = analyzer.lookback_sweep(lookbacks)
+
+    assert len(result) == 5 * len(lookbacks)
+    for row in result.to_dict('records'):
+        totals = brute_force_window(data, latest - pd.Timedelta(days=row['Lookback Days']), latest, row['Day'])
+        profit, cell = expected_choice(totals)
+
+        assert row['In-Sample Profit'] == pytest.approx(profit)
+        # Ties may pick another cell, but never a worse one
+        chosen = (row['Optimal Stop Loss'], row['Optimal Strategy Type'])
+        assert chosen == cell or totals.get(chosen) == pytest.approx(profit)
+
+
+def test_walk_forward_matches_brute_force(analyzer):
+    data = analyzer.all_data
+    result = analyzer.walk_forward([30, 60], test_days=20)
+
+    assert set(result['Lookback Days']) == {30, 60}
+    for row in result.to_dict('records'):
+        train_end = row['Train End']
+        totals = brute_force_window(data, train_end - pd.Timedelta(days=row['Lookback Days']), train_end, row['Day'])
+        profit, _ = expected_choice(totals)
+        chosen = (row['Optimal Stop Loss'], row['Optimal Strategy Type'])
+        assert row['In-Sample Profit'] == pytest.approx(profit)
+
+        test = brute_force_window(data, train_end + pd.Timedelta(days=1), row['Test End'], row['Day'])
+        assert row['Out-of-Sample Profit'] == pytest.approx(0.0 if chosen == ('Exclude', 'Exclude') else test.get(chosen, 0.0))
+
+
+def test_walk_forward_threads_match_serial(analyzer):
+    serial = analyzer.walk_forward([30, 90], test_days=10)
+    walk_forward = analyzer._get_walk_forward()
+    threaded = walk_forward.walk_forward([30, 90], test_days=10, max_workers=4, chunk_size=7)
+
+    pd.testing.assert_frame_equal(threaded, serial)